@@ -0,0 +1,75 @@
+"""
+热度解析基准 - 对比原有逐条re.search、预编译逐条解析和NumPy批量解析的耗时
+
+用法:
+    python -m benchmarks.bench_heat_normalize [--size 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from main.scraper.heat import normalize_heat_batch, parse_heat
+
+
+def legacy_extract_heat_value(heat_str):
+    """改造前的DataParser.extract_heat_value（每次调用re.search）"""
+    if isinstance(heat_str, int):
+        return heat_str
+    if not heat_str or not isinstance(heat_str, str):
+        return None
+    match = re.search(r'(\d+\.?\d*)\s*([w万亿]?)', heat_str)
+    if not match:
+        return None
+    value = float(match.group(1))
+    unit = match.group(2)
+    if unit in ('万', 'w'):
+        value *= 10000
+    elif unit == '亿':
+        value *= 100000000
+    return int(value)
+
+
+def build_values(size: int):
+    makers = [
+        lambda: f"{random.uniform(1, 9999):.1f}万",
+        lambda: f"{random.uniform(1, 9):.2f}亿",
+        lambda: str(random.randint(1, 10 ** 6)),
+        lambda: random.randint(1, 10 ** 6),
+        lambda: f"{random.randint(1, 999)}w热度",
+        lambda: '暂无',
+    ]
+    return [random.choice(makers)() for _ in range(size)]
+
+
+def _best(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热度解析耗时对比")
+    parser.add_argument('--size', type=int, default=100000, help="热度值数量")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数（取最好成绩）")
+    args = parser.parse_args()
+
+    random.seed(0)
+    values = build_values(args.size)
+    assert normalize_heat_batch(values).to_list() == [legacy_extract_heat_value(v) for v in values]
+
+    legacy = _best(lambda: [legacy_extract_heat_value(v) for v in values], args.repeat)
+    scalar = _best(lambda: [parse_heat(v) for v in values], args.repeat)
+    batch = _best(lambda: normalize_heat_batch(values), args.repeat)
+    print(f"{args.size} 个热度值")
+    print(f"原有逐条解析   {legacy:8.1f} ms")
+    print(f"预编译逐条解析 {scalar:8.1f} ms  ({legacy / scalar:.2f}x)")
+    print(f"NumPy批量解析  {batch:8.1f} ms  ({legacy / batch:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
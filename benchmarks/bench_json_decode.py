@@ -0,0 +1,91 @@
+"""
+JSON解码基准 - 按平台对比字符串化列表响应的解码耗时
+
+用各平台field_mapping构造与线上结构一致的响应（外层信封 + data.list中的JSON字符串），比较：
+  baseline    标准库 json.loads(str) 解码外层 + json.loads 解码data.list（原有路径）
+  codec       json_codec 直接解码响应字节 + 解码data.list（安装orjson时为orjson）
+  incremental json_codec.iter_json_array 逐项解码data.list
+
+用法:
+    python -m benchmarks.bench_json_decode [--items 50] [--bilibili-items 500] [--repeat 200]
+"""
+
+import argparse
+import json
+import random
+import string
+import time
+
+from config.platform_config import PLATFORM_CONFIG
+from main.scraper import json_codec
+
+
+def _random_text(length: int) -> str:
+    return ''.join(random.choices(string.ascii_letters + '热搜话题新闻视频评论', k=length))
+
+
+def build_payload(platform_code: str, items: int) -> bytes:
+    """构造单页接口响应的原始字节"""
+    field_map = PLATFORM_CONFIG[platform_code]['field_mapping']
+    rows = []
+    for idx in range(items):
+        row = {
+            field_map['title']: _random_text(24),
+            field_map['heat']: f"{random.randint(1, 9999)}.{random.randint(0, 9)}万",
+            field_map['url']: f"item{idx}{_random_text(8)}",
+            field_map['tag']: _random_text(4),
+            # 线上数据还带有若干未使用的字段
+            'desc': _random_text(80),
+            'cover': f"https://example.com/{_random_text(16)}.jpg",
+            'stats': {'like': random.randint(0, 10 ** 6), 'reply': random.randint(0, 10 ** 4)},
+        }
+        rows.append(row)
+    envelope = {'code': 200, 'msg': 'ok', 'data': {'list': json.dumps(rows, ensure_ascii=False), 'total': items}}
+    return json.dumps(envelope, ensure_ascii=False).encode('utf-8')
+
+
+def _baseline(raw: bytes) -> int:
+    outer = json.loads(raw.decode('utf-8'))
+    return len(json.loads(outer['data']['list']))
+
+
+def _codec(raw: bytes) -> int:
+    outer = json_codec.loads(raw)
+    return len(json_codec.loads(outer['data']['list']))
+
+
+def _incremental(raw: bytes) -> int:
+    outer = json_codec.loads(raw)
+    return sum(1 for _ in json_codec.iter_json_array(outer['data']['list']))
+
+
+def _timeit(func, raw: bytes, repeat: int) -> float:
+    func(raw)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(raw)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按平台对比JSON解码耗时")
+    parser.add_argument('--items', type=int, default=50, help="普通平台每页条数")
+    parser.add_argument('--bilibili-items', type=int, default=500, help="bilibili每页条数（大页面）")
+    parser.add_argument('--repeat', type=int, default=200, help="每项重复次数")
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"JSON后端: {json_codec.get_backend()}")
+    print(f"{'平台':<12}{'大小KB':>8}{'baseline µs':>14}{'codec µs':>12}{'加速':>8}{'incremental µs':>17}")
+    for platform_code in PLATFORM_CONFIG:
+        items = args.bilibili_items if platform_code == 'bilibili' else args.items
+        raw = build_payload(platform_code, items)
+        base = _timeit(_baseline, raw, args.repeat)
+        codec = _timeit(_codec, raw, args.repeat)
+        incremental = _timeit(_incremental, raw, args.repeat)
+        print(f"{platform_code:<12}{len(raw) / 1024:>8.1f}{base:>14.1f}{codec:>12.1f}"
+              f"{base / codec:>7.2f}x{incremental:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+查询计划回归检查 - 在本地独立库中生成数百万行合成数据，对database_manager.py中的每条查询执行EXPLAIN
+
+以只读方式（写语句只记录不执行）调用DatabaseManager的各个查询方法，以及去重时间窗口和保留策略的扫描查询，
+收集实际发出的SQL后逐条EXPLAIN：
+  - 大表（hot_topics/topic_tags/tags/collection_logs）出现全表扫描（type=ALL）或全索引扫描（type=index）即失败，
+    ALLOWED_FULL_SCANS中列出的聚合/模糊搜索除外；
+  - 指定--baseline时与基线对比，所用索引变化或访问类型变差也视为失败（基线文件不存在时写入当前计划）。
+
+该脚本会删除并重建--database指定的库，不能指向生产库。
+
+用法:
+    python -m benchmarks.check_query_plans [--rows 2000000] [--database hot_topics_plan_check]
+    python -m benchmarks.check_query_plans --skip-load --baseline benchmarks/query_plans.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import mysql.connector
+
+from config.database_config import DATABASE_CONFIG
+from main.database.database_manager import DatabaseManager
+from main.database.retention import RetentionEngine
+from main.scraper.deduplicator import Deduplicator
+from main.scraper.topic import Topic
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), '..', 'main', 'database', 'database_init.sql')
+LARGE_TABLES = {'hot_topics', 'topic_tags', 'tags', 'collection_logs'}
+CATEGORIES = ('hot', 'realtime', 'tech', 'finance')
+PLATFORM_COUNT = 8
+TOPICS_PER_BOARD = 50
+
+# 按设计需要扫描全表/全索引的查询：全量聚合统计和前后模糊匹配的标题搜索
+ALLOWED_FULL_SCANS = {
+    'search_hot_topics': "LIKE '%关键词%' 无法使用B树索引",
+    'get_category_statistics': "按分类聚合全部话题",
+    'get_tag_statistics': "按标签聚合全部关联",
+}
+
+# 访问类型由好到差
+ACCESS_TYPES = ['system', 'const', 'eq_ref', 'ref', 'fulltext', 'ref_or_null', 'index_merge',
+                'unique_subquery', 'index_subquery', 'range', 'index', 'ALL']
+
+
+class RecordingDatabaseManager(DatabaseManager):
+    """记录每条发出的SQL；查询照常执行，写语句只记录不执行，合成数据保持不变"""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.scenario = ''
+        self.statements: List[Tuple[str, str, Optional[Tuple]]] = []
+
+    def execute_query(self, query, params=None):
+        self.statements.append((self.scenario, query, params))
+        return super().execute_query(query, params)
+
+    def _iter_rows(self, query, params, batch_size, dictionary):
+        self.statements.append((self.scenario, query, params))
+        return super()._iter_rows(query, params, batch_size, dictionary)
+
+    def execute_update(self, query, params=None):
+        self.statements.append((self.scenario, query, params))
+        return 0
+
+    def execute_many(self, query, params_list):
+        self.statements.append((self.scenario, query, params_list[0] if params_list else None))
+        return 0
+
+
+def _server_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: config[key] for key in ('host', 'port', 'user', 'password', 'charset')}
+
+
+def create_database(config: Dict[str, Any]) -> None:
+    """删除并重建检查用的库，按database_init.sql建表"""
+    with open(SCHEMA_FILE, 'rb') as f:
+        schema = f.read().decode('utf-16').replace('\r\n', '\n')
+    lines = [line for line in schema.split('\n') if not line.lstrip().startswith('--')]
+    statements = [stmt.strip() for stmt in '\n'.join(lines).split(';') if stmt.strip()]
+
+    connection = mysql.connector.connect(**_server_config(config))
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{config['database']}`")
+        cursor.execute(f"CREATE DATABASE `{config['database']}` DEFAULT CHARSET utf8mb4 COLLATE utf8mb4_unicode_ci")
+        cursor.execute(f"USE `{config['database']}`")
+        for statement in statements:
+            cursor.execute(statement)
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _insert_generated(db: DatabaseManager, insert: str, select: str, total: int, chunk: int) -> None:
+    """用递归CTE在服务端生成序号并分块INSERT ... SELECT，不经过Python逐行传输"""
+    db.execute_update("SET SESSION cte_max_recursion_depth = %s", (chunk + 1,))
+    for start in range(0, total, chunk):
+        end = min(total, start + chunk) - 1
+        db.execute_update(
+            f"{insert} WITH RECURSIVE seq (n) AS (SELECT %s UNION ALL SELECT n + 1 FROM seq WHERE n < %s) "
+            f"{select}", (start, end)
+        )
+        print(f"\r  {end + 1}/{total}", end='', flush=True)
+    print()
+
+
+def load_synthetic(db: DatabaseManager, rows: int, chunk: int = 100000) -> None:
+    """
+    生成合成数据：话题时间跨度180天，每个榜单只有最新的TOPICS_PER_BOARD条为活跃话题，
+    三分之一的话题带两个标签，采集日志数量为话题数的1/20
+    """
+    span = 180 * 24 * 3600
+    active_from = rows - PLATFORM_COUNT * len(CATEGORIES) * TOPICS_PER_BOARD
+    categories = ', '.join(f"'{c}'" for c in CATEGORIES)
+
+    print(f"生成 {rows} 条话题...")
+    _insert_generated(db, """
+        INSERT INTO hot_topics (platform_id, title, `rank`, heat_value, url, hash_id, category,
+                                first_seen_at, last_seen_at, rank_change, is_active)
+    """, f"""
+        SELECT 1 + n % {PLATFORM_COUNT}, CONCAT('合成话题 ', n), 1 + (n DIV {PLATFORM_COUNT * len(CATEGORIES)}) % {TOPICS_PER_BOARD},
+               n % 1000000, CONCAT('https://rebang.today/item/', n), UNHEX(MD5(CONCAT('plan-check-', n))),
+               ELT(1 + (n DIV {PLATFORM_COUNT}) % {len(CATEGORIES)}, {categories}),
+               NOW() - INTERVAL (FLOOR(({rows} - n) * {span} / {rows}) + 600) SECOND,
+               NOW() - INTERVAL FLOOR(({rows} - n) * {span} / {rows}) SECOND,
+               n % 7 - 3, n >= {active_from}
+        FROM seq
+    """, rows, chunk)
+
+    print("生成标签...")
+    _insert_generated(db, "INSERT INTO tags (name)", "SELECT CONCAT('标签', n) FROM seq", 5000, 5000)
+    print("生成话题标签关联...")
+    _insert_generated(db, "INSERT IGNORE INTO topic_tags (topic_id, tag_id)", """
+        SELECT t.id, 1 + (t.id + k.k * 2477) % 5000
+        FROM seq JOIN hot_topics t ON t.id = n * 3 + 1 JOIN (SELECT 0 AS k UNION ALL SELECT 1) k
+    """, rows // 3, chunk)
+
+    logs = max(1, rows // 20)
+    print(f"生成 {logs} 条采集日志...")
+    _insert_generated(db, """
+        INSERT INTO collection_logs (platform_id, status, total_count, success_count, error_count,
+                                     duplicate_count, start_time, end_time, created_at)
+    """, f"""
+        SELECT 1 + n % {PLATFORM_COUNT}, ELT(1 + n % 3, 'success', 'failed', 'partial'), 50, 45, 2, 3,
+               NOW() - INTERVAL (FLOOR(({logs} - n) * {span} / {logs}) + 5) SECOND,
+               NOW() - INTERVAL FLOOR(({logs} - n) * {span} / {logs}) SECOND,
+               NOW() - INTERVAL FLOOR(({logs} - n) * {span} / {logs}) SECOND
+        FROM seq
+    """, logs, chunk)
+
+    for table in ('hot_topics', 'tags', 'topic_tags', 'collection_logs'):
+        db.execute_query(f"ANALYZE TABLE {table}")
+
+
+def build_scenarios(db: RecordingDatabaseManager) -> List[Tuple[str, Callable[[], Any]]]:
+    """database_manager.py中的每个查询方法，以及去重和保留策略中的扫描查询"""
+    sample = db.execute_query("""
+        SELECT t.id, HEX(t.hash_id) AS hex_hash, t.category, p.code FROM hot_topics t
+        JOIN platforms p ON p.id = t.platform_id WHERE t.is_active = TRUE LIMIT 1
+    """)[0]
+    db.statements.clear()
+    platform, category, topic_id = sample['code'], sample['category'], sample['id']
+    deduplicator = Deduplicator()
+    deduplicator.db = db
+    retention = RetentionEngine(db=db)
+    topic = Topic(platform, category, 1, 1, '合成话题 检查', 100, '', [], 'f' * 32, datetime.now())
+
+    return [
+        ('get_all_platforms', db.get_all_platforms),
+        ('get_platform_by_code', lambda: db.get_platform_by_code(platform)),
+        ('get_enabled_platforms', db.get_enabled_platforms),
+        ('get_board_topics', lambda: db.get_board_topics(platform, category)),
+        ('get_topic_state_by_hash', lambda: db.get_topic_state_by_hash(sample['hex_hash'])),
+        ('get_hot_topic_by_hash', lambda: db.get_hot_topic_by_hash(sample['hex_hash'])),
+        ('get_hot_topics_by_platform', lambda: db.get_hot_topics_by_platform(platform, 50)),
+        ('get_latest_hot_topics', lambda: db.get_latest_hot_topics(24, 100)),
+        ('search_hot_topics', lambda: db.search_hot_topics('话题', 50)),
+        ('get_tag_ids', lambda: db.get_tag_ids(['标签1', '标签2', '新标签'])),
+        ('get_topic_tags', lambda: db.get_topic_tags(topic_id)),
+        ('get_collection_logs', lambda: db.get_collection_logs(platform, 20)),
+        ('get_collection_logs(all)', lambda: db.get_collection_logs(None, 20)),
+        ('get_platform_statistics', db.get_platform_statistics),
+        ('get_category_statistics', db.get_category_statistics),
+        ('get_tag_statistics', db.get_tag_statistics),
+        ('get_collection_statistics', lambda: db.get_collection_statistics(7)),
+        ('get_rank_changes', lambda: db.get_rank_changes(platform, 24, 10)),
+        ('update_hot_topic', lambda: db.update_hot_topic(topic_id, {'heat_value': 100, 'tags': ['标签1']})),
+        ('update_topic_positions', lambda: db.update_topic_positions([(2, 1, 100, '', topic_id)])),
+        ('deactivate_topics', lambda: db.deactivate_topics([topic_id, topic_id + 3])),
+        ('sync_topic_tags', lambda: db.sync_topic_tags({topic_id: ['标签1', '标签3']})),
+        ('dedup_window', lambda: deduplicator.is_duplicate(topic)),
+        ('retention_expired_ids', lambda: retention._fetch_expired_ids(1, datetime.now() - timedelta(days=30))),
+        ('retention_collection_logs', retention.purge_collection_logs),
+    ]
+
+
+def explain(db: DatabaseManager, query: str, params: Optional[Tuple]) -> List[Dict[str, Any]]:
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute(f"EXPLAIN {query}", params or ())
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def check_plans(db: RecordingDatabaseManager, baseline: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    逐条EXPLAIN记录到的SQL
+
+    Returns:
+        (本次计划 {场景#序号: [{table, type, key, rows}]}, 失败原因列表)
+    """
+    plans: Dict[str, Any] = {}
+    failures: List[str] = []
+    counters: Dict[str, int] = {}
+    for scenario, query, params in db.statements:
+        if query.lstrip().upper().startswith(('SET', 'ANALYZE')):
+            continue
+        index = counters[scenario] = counters.get(scenario, 0) + 1
+        key = f"{scenario}#{index}"
+        rows = explain(db, query, params)
+        plans[key] = [{'table': row['table'], 'type': row['type'], 'key': row['key'], 'rows': row['rows']}
+                      for row in rows]
+
+        for row in rows:
+            print(f"{key:32} {str(row['table']):18} {str(row['type']):8} {str(row['key']):26} "
+                  f"{str(row['rows']):>10}  {row.get('Extra') or ''}")
+            if row['table'] in LARGE_TABLES and row['type'] in ('ALL', 'index') and scenario not in ALLOWED_FULL_SCANS:
+                failures.append(f"{key}: {row['table']} 全{'表' if row['type'] == 'ALL' else '索引'}扫描，"
+                                f"预估 {row['rows']} 行")
+
+        if baseline and key in baseline:
+            for before, after in zip(baseline[key], plans[key]):
+                if before['key'] != after['key']:
+                    failures.append(f"{key}: {after['table']} 所用索引由 {before['key']} 变为 {after['key']}")
+                elif (after['type'] in ACCESS_TYPES and before['type'] in ACCESS_TYPES
+                      and ACCESS_TYPES.index(after['type']) > ACCESS_TYPES.index(before['type'])):
+                    failures.append(f"{key}: {after['table']} 访问类型由 {before['type']} 变差为 {after['type']}")
+    return plans, failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="合成数据上的查询计划回归检查")
+    parser.add_argument('--database', default='hot_topics_plan_check', help="检查用的库名（会被删除重建）")
+    parser.add_argument('--rows', type=int, default=2000000, help="合成话题行数")
+    parser.add_argument('--skip-load', action='store_true', help="复用已生成的数据，只执行EXPLAIN")
+    parser.add_argument('--baseline', help="计划基线文件，不存在时写入本次结果")
+    args = parser.parse_args(argv)
+
+    if args.database == DATABASE_CONFIG['database']:
+        print(f"拒绝在业务库 {args.database} 上运行，请指定独立的检查库")
+        return 2
+    config = {**DATABASE_CONFIG, 'database': args.database}
+
+    if not args.skip_load:
+        started = time.perf_counter()
+        create_database(config)
+        loader = DatabaseManager(config)
+        if not loader.connect():
+            return 2
+        load_synthetic(loader, args.rows)
+        loader.disconnect()
+        print(f"数据生成完成，耗时 {time.perf_counter() - started:.1f}秒")
+
+    db = RecordingDatabaseManager(config)
+    if not db.connect():
+        return 2
+    try:
+        for name, run in build_scenarios(db):
+            db.scenario = name
+            run()
+        baseline = None
+        if args.baseline and os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        plans, failures = check_plans(db, baseline)
+    finally:
+        db.disconnect()
+
+    if args.baseline and baseline is None:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(plans, f, ensure_ascii=False, indent=2)
+        print(f"已写入计划基线 {args.baseline}")
+
+    if failures:
+        print(f"\n{len(failures)} 条查询计划退化:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print(f"\n{len(plans)} 条语句的查询计划均未退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
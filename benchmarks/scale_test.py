@@ -0,0 +1,270 @@
+"""
+规模压测 - 用本地模拟接口服务驱动完整采集流程，观察榜单数量增长时的瓶颈
+
+在独立进程中启动模拟的热榜接口（响应结构与api.rebang.today一致），按 平台数×分类数×页数 逐级放大，
+每个规模连续运行若干个采集周期（第一个周期全部为新话题，之后按--churn比例换榜并打乱部分排名），
+对每个周期报告：
+  - 周期耗时与每秒榜单数；
+  - 数据库往返次数（服务端Questions计数差值）与每个榜单的往返次数；
+  - 数据库语句耗时占周期的比例（接近100%说明单连接串行写库已是瓶颈）；
+  - 采集进程CPU时间与常驻内存；
+  - 总耗时最高的SQL指纹（用于判断去重时间窗口、NOT IN列表等哪条语句随规模恶化）。
+
+该脚本会删除并重建--database指定的库，不能指向生产库。
+
+用法:
+    python -m benchmarks.scale_test [--scales 8x3,50x5,200x10] [--pages 2] [--page-size 50]
+                                    [--cycles 3] [--churn 0.2] [--latency-ms 20] [--json results.json]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import mysql.connector
+
+from benchmarks.check_query_plans import create_database
+from config.database_config import DATABASE_CONFIG
+from config.platform_config import FEED_CONFIG, FETCH_CONFIG
+
+
+def _hash(*parts) -> int:
+    return zlib.crc32('|'.join(map(str, parts)).encode('utf-8'))
+
+
+def board_items(platform: str, category: str, cycle: int, total: int, churn: float) -> List[Dict[str, Any]]:
+    """
+    生成某个榜单在某个周期的完整排名（无状态，由参数决定）
+
+    每个位置大约每1/churn个周期换成新话题（各位置错开），排序时加入随周期变化的扰动，模拟排名升降。
+    """
+    slots = []
+    for slot in range(total):
+        phase = (_hash(platform, category, slot) % 1000) / 1000
+        generation = int(cycle * churn + phase)
+        jitter = (_hash(platform, category, slot, cycle) % 300) / 100
+        slots.append((slot + jitter, slot, generation))
+    slots.sort()
+    items = []
+    for rank, (_, slot, generation) in enumerate(slots, 1):
+        items.append({
+            'title': f"{platform}{category}模拟话题{slot}代{generation}",
+            'heat_num': str((total - rank + 1) * 1000),
+            'www_url': f"{platform}-{category}-{slot}-{generation}",
+            'label_name': ('热', '新', '', '')[_hash(slot, generation) % 4],
+        })
+    return items
+
+
+def serve(port_queue, latency_ms: float, jitter_ms: float, page_size: int, total: int, churn: float) -> None:
+    """模拟接口服务进程：GET /v1/items?tab=平台&sub_tab=分类&page=页码&cycle=周期"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            time.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+            page = int(query.get('page', 1))
+            items = board_items(query.get('tab', ''), query.get('sub_tab', ''), int(query.get('cycle', 0)),
+                                total, churn)[(page - 1) * page_size:page * page_size]
+            body = json.dumps({'code': 200, 'data': {'list': json.dumps(items, ensure_ascii=False)}},
+                              ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def platform_config(base_url: str, code: str, pages: int, page_size: int) -> Dict[str, Any]:
+    """与PLATFORM_CONFIG结构相同的模拟平台定义"""
+    return {
+        'base_url': base_url,
+        'default_params': {'tab': code, 'version': '1'},
+        'data_path': ['data', 'list'],
+        'list_type': 'string',
+        'field_mapping': {'title': 'title', 'heat': 'heat_num', 'url': 'www_url', 'tag': 'label_name'},
+        'pagination': {'param_name': 'page', 'start_page': 1, 'max_pages': pages, 'page_size': page_size},
+    }
+
+
+def parse_scales(value: str) -> List[Tuple[int, int]]:
+    scales = []
+    for part in value.split(','):
+        platforms, categories = part.lower().split('x')
+        scales.append((int(platforms), int(categories)))
+    return scales
+
+
+def rss_mb() -> float:
+    """当前常驻内存（MB），无/proc时返回峰值"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Monitor:
+    """独立连接读取服务端计数（不计入被测连接的往返）"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.connection = mysql.connector.connect(**{key: config[key] for key in
+                                                     ('host', 'port', 'user', 'password', 'database', 'charset')})
+
+    def questions(self) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        value = int(cursor.fetchone()[1])
+        cursor.close()
+        return value
+
+    def topic_count(self) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM hot_topics")
+        value = cursor.fetchone()[0]
+        cursor.close()
+        self.connection.commit()  # 结束快照读，下次看到最新数据
+        return value
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="模拟接口 + 本地数据库的采集规模压测")
+    parser.add_argument('--scales', default='8x3,50x5,200x10', help="逐级规模，平台数x分类数，逗号分隔")
+    parser.add_argument('--pages', type=int, default=2, help="每个榜单的页数")
+    parser.add_argument('--page-size', type=int, default=50, help="每页话题数")
+    parser.add_argument('--cycles', type=int, default=3, help="每个规模运行的采集周期数")
+    parser.add_argument('--churn', type=float, default=0.2, help="每个周期换榜的话题比例")
+    parser.add_argument('--latency-ms', type=float, default=20, help="模拟接口的基础延迟")
+    parser.add_argument('--jitter-ms', type=float, default=10, help="模拟接口的随机附加延迟上限")
+    parser.add_argument('--rps', type=float, default=0, help="对模拟接口的限流速率，0表示不限流")
+    parser.add_argument('--database', default='hot_topics_scale_test', help="压测用的库名（会被删除重建）")
+    parser.add_argument('--json', help="把结果写入JSON文件")
+    parser.add_argument('--verbose', action='store_true', help="输出采集过程的INFO日志")
+    args = parser.parse_args(argv)
+
+    if args.database == DATABASE_CONFIG['database']:
+        print(f"拒绝在业务库 {args.database} 上运行，请指定独立的压测库")
+        return 2
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, daemon=True,
+        args=(port_queue, args.latency_ms, args.jitter_ms, args.page_size, args.pages * args.page_size, args.churn)
+    )
+    server.start()
+    port = port_queue.get(timeout=10)
+    base_url = f"http://127.0.0.1:{port}/v1/items"
+
+    # 采集器的各组件通过get_db_manager()共享全局连接，需在首次创建前指向压测库
+    DATABASE_CONFIG['database'] = args.database
+    FETCH_CONFIG['host_overrides'][f"127.0.0.1:{port}"] = (
+        {'requests_per_second': args.rps, 'burst': max(1, int(args.rps))} if args.rps else
+        {'requests_per_second': 1e9, 'burst': 1e9})
+    FEED_CONFIG['enabled'] = False
+
+    from main.database.database_manager import get_db_manager
+    from main.database.slow_query import SlowQueryLog
+    from main.scraper.rebang_scraper import RebangScraper
+
+    create_database(DATABASE_CONFIG)
+    db = get_db_manager()
+    if not db.connect():
+        return 2
+    monitor = Monitor(DATABASE_CONFIG)
+    scraper = RebangScraper()
+    results = []
+    global_cycle = 0
+
+    print(f"{'规模':>14} {'周期':>4} {'耗时s':>7} {'榜单/秒':>7} {'DB往返':>8} {'往返/榜单':>9} {'DB占比':>6} "
+          f"{'CPU s':>7} {'RSS MB':>7} {'话题行数':>9}  总耗时最高的语句")
+    try:
+        for platform_count, category_count in parse_scales(args.scales):
+            codes = [f"sim{i:03d}" for i in range(1, platform_count + 1)]
+            categories = {code: [f"c{j:02d}" for j in range(1, category_count + 1)] for code in codes}
+            db.execute_many("INSERT IGNORE INTO platforms (code, name, enabled) VALUES (%s, %s, 1)",
+                            [(code, f"模拟平台{code}") for code in codes])
+            scraper.platform_config = {code: platform_config(base_url, code, args.pages, args.page_size)
+                                       for code in codes}
+            boards = platform_count * category_count
+            label = f"{platform_count}x{category_count}x{args.pages}"
+
+            for cycle in range(1, args.cycles + 1):
+                global_cycle += 1
+                extra_params = {code: {'cycle': str(global_cycle)} for code in codes}
+                db._slow_queries = SlowQueryLog({'threshold_ms': 10 ** 9, 'explain': False})
+                questions, cpu, start = monitor.questions(), cpu_seconds(), time.perf_counter()
+
+                outcome = scraper.scrape_all_platforms(categories, extra_params)
+
+                elapsed = time.perf_counter() - start
+                cpu = cpu_seconds() - cpu
+                round_trips = monitor.questions() - questions - 1  # 减去本次SHOW STATUS自身
+                statements = db._slow_queries.summary()
+                db_seconds = sum(item['total_ms'] for item in statements) / 1000
+                failed = sum(1 for platform in outcome.values() if isinstance(platform, dict)
+                             for result in platform.values()
+                             if isinstance(result, dict) and result.get('status') not in ('success', 'partial'))
+                row = {
+                    'scale': label, 'boards': boards, 'cycle': cycle, 'seconds': round(elapsed, 3),
+                    'boards_per_second': round(boards / elapsed, 2), 'db_round_trips': round_trips,
+                    'round_trips_per_board': round(round_trips / boards, 1),
+                    'db_time_share': round(db_seconds / elapsed, 3), 'cpu_seconds': round(cpu, 3),
+                    'rss_mb': round(rss_mb(), 1), 'topics': monitor.topic_count(), 'failed_boards': failed,
+                    'top_statements': [{'sql': item['sql'][:200], 'count': item['count'], 'total_ms': item['total_ms'],
+                                        'p95_ms': item['p95_ms']} for item in statements[:5]],
+                }
+                results.append(row)
+                top = statements[0] if statements else None
+                top_text = f"{top['total_ms'] / 1000:.2f}s ×{top['count']} {top['sql'][:60]}" if top else ''
+                print(f"{label:>14} {cycle:>4} {elapsed:>7.2f} {row['boards_per_second']:>7.1f} "
+                      f"{round_trips:>8} {row['round_trips_per_board']:>9.1f} {row['db_time_share']:>6.0%} "
+                      f"{cpu:>7.2f} {row['rss_mb']:>7.1f} {row['topics']:>9}  {top_text}"
+                      + (f"  （失败榜单 {failed}）" if failed else ''))
+    finally:
+        monitor.close()
+        db.disconnect()
+        server.terminate()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,144 @@ PROCESSING_CONFIG = {
     'enable_duplicate_check': True,  # 启用重复检查
     'similarity_threshold': 0.8,     # 相似度阈值
 }
+# 热榜读缓存配置
+CACHE_CONFIG = {
+    'enabled': True,     # 启用热榜查询缓存
+    'max_size': 256,     # 最大缓存条目数（LRU淘汰）
+    'ttl_seconds': 120,  # 缓存有效期，与定时采集周期(2分钟)保持一致
+    'hash_cache_enabled': True,       # 缓存最近话题的 hash_id -> (id, rank, last_seen_at, is_active)
+    'hash_cache_size': 50000,         # 哈希缓存最大条目数（LRU淘汰），应大于所有榜单话题总数
+    'hash_cache_ttl_seconds': 3600,   # 哈希缓存有效期，须远小于保留策略的失效天数
+}
+# 去重哈希配置
+HASH_CONFIG = {
+    # 哈希算法：md5 或 blake2b（均输出128位，以BINARY(16)入库）
+    # 注意：切换算法后已有话题的哈希将无法匹配，首个周期会被当作新话题重新插入
+    'algorithm': 'md5',
+}
+# 数据保留配置
+RETENTION_CONFIG = {
+    'default_policy': {
+        'inactive_days': 30,  # 失效超过N天的话题被迁出主表（None表示不清理）
+        'mode': 'archive',    # archive: 迁入归档表；export: 导出为压缩文件后删除
+    },
+    'platform_policies': {    # 各平台覆盖默认策略，如 'bilibili': {'inactive_days': 7}
+    },
+    'batch_size': 500,            # 每批迁移的话题数，保持小事务避免长时间锁表
+    'batch_pause_seconds': 0.1,   # 批次之间的停顿，给线上写入让路
+    'collection_log_days': 90,    # 采集日志保留天数（None表示不清理）
+    'export_dir': 'archive',      # export模式的输出目录
+}
+# 接口抓取配置
+FETCH_CONFIG = {
+    'timeout': 10,                  # 单次请求超时（秒）
+    'requests_per_second': 2.0,     # 每个主机的令牌补充速率
+    'burst': 4,                     # 每个主机允许的突发请求数
+    'host_overrides': {},           # 按主机覆盖限流，如 'api.rebang.today': {'requests_per_second': 5}
+    'max_retries': 2,               # 单页最大重试次数
+    'backoff_base_seconds': 1.0,    # 指数退避基数
+    'backoff_max_seconds': 30.0,    # 单次退避上限；Retry-After超过该值时放弃重试
+    'retry_budget_per_cycle': 20,   # 每个采集周期的重试总额度
+    'json_backend': 'auto',         # auto（优先orjson）、orjson 或 json
+    'incremental_decode_chars': 2 * 1024 * 1024,  # 字符串化列表超过该长度时逐项解码
+}
+# 热度值解析规则
+HEAT_CONFIG = {
+    'units': {'万': 10000, 'w': 10000, '亿': 100000000},  # 数值后缀单位及倍数
+    # 按平台覆盖：units替换单位表；strict为True时整个字段必须是"数值+单位"，
+    # 否则视为无法解析（用于把自由文本映射为heat的平台，避免从文本中误取数字）
+    'platform_rules': {
+        'xueqiu': {'strict': True},
+    },
+}
+# 数据源熔断配置（平台级与(平台, 分类)级各自独立统计）
+CIRCUIT_BREAKER_CONFIG = {
+    'enabled': True,
+    'window_size': 10,              # 滑动窗口内记录的最近结果数
+    'min_calls': 3,                 # 窗口内至少有这么多结果才计算失败率
+    'failure_rate_threshold': 0.5,  # 失败率达到该值时熔断
+    'open_seconds': 300,            # 熔断持续时间，到期后放行探测请求
+    'max_open_seconds': 3600,       # 探测连续失败时熔断时间翻倍的上限
+    'half_open_max_calls': 1,       # 探测阶段同时放行的请求数
+}
+# 变更推送配置（话题新增/排名变化/掉榜事件写入本地日志并推送给订阅者）
+FEED_CONFIG = {
+    'enabled': True,
+    'log_dir': 'feed',                     # 事件日志目录，按起始偏移量分段存储
+    'segment_max_bytes': 64 * 1024 * 1024, # 单个分段文件上限
+    'max_segments': 8,                     # 保留的分段数，超出时删除最旧的分段
+    'queue_max_size': 10000,               # 待写入事件队列上限，队列满时丢弃并计数，不阻塞采集
+    'include_unchanged': False,            # 是否推送排名未变（仅热度变化）的事件
+}
+# 只读查询服务配置（python -m main.service.query_service）
+SERVICE_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8080,
+    'db_pool_size': 4,               # 数据库查询线程数，每个线程持有一个独立连接
+    'cache_max_size': 512,           # 响应缓存条目数（缓存的是编码后的响应体）
+    'cache_ttl_seconds': 120,        # 响应缓存有效期
+    'gzip_min_bytes': 1024,          # 超过该大小的响应体预先压缩一份gzip
+    'gzip_level': 5,
+    'feed_poll_seconds': 1.0,        # 跟随变更推送日志，按平台失效响应缓存；0表示不跟随
+    'config_poll_seconds': 10.0,     # 开启配置热加载时检查外部配置文件的间隔，与采集器使用同一份平台列表
+    'max_limit': 200,                # limit参数上限
+    'keepalive_timeout': 15,         # 空闲长连接超时秒数
+}
+# 内存分析配置（定时采集服务可选开启，基于tracemalloc按分配位置对比快照）
+MEMORY_PROFILE_CONFIG = {
+    'enabled': False,                       # 开启后有额外的内存与CPU开销，仅排查内存增长时使用
+    'snapshot_every_cycles': 5,             # 每N个采集周期取一次快照
+    'frames': 1,                            # 每个分配记录的调用栈深度（越深越准，开销越大）
+    'top_n': 15,                            # 报告中列出的增长最多的分配位置数
+    'growth_warn_bytes': 2 * 1024 * 1024,   # 平均每周期增长超过该值时告警
+    'report_dir': 'logs/memory',            # 报告输出目录（latest.txt为最近一次报告）
+    'signal': 'SIGUSR1',                    # 收到该信号时立即输出报告（不支持信号的平台忽略）
+}
+# 采集周期CPU分析配置（信号、标记文件或本配置触发，分析接下来的若干个周期）
+CYCLE_PROFILE_CONFIG = {
+    'cycles': 0,                            # 服务启动后立即分析的周期数（0表示只按需触发）
+    'trigger_cycles': 3,                    # 信号/标记文件触发时分析的周期数
+    'signal': 'SIGUSR2',                    # 收到该信号后分析接下来的周期（不支持信号的平台忽略）
+    'flag_file': 'logs/profile/profile.flag',  # 该文件存在时触发分析，内容可写周期数，读取后删除
+    'output_dir': 'logs/profile',           # 每个周期输出 .collapsed/.prof/.txt 三个文件
+    'sample_interval_ms': 5,                # 调用栈采样间隔
+    'cprofile': True,                       # 同时记录cProfile统计（开销较采样大，关闭后只采样）
+    'top_n': 40,                            # 文本摘要中列出的cProfile函数数
+}
+# 慢查询记录配置（统计每条SQL耗时，超过阈值时记录语句形态与EXPLAIN）
+SLOW_QUERY_CONFIG = {
+    'enabled': True,                     # 计时开销很小，默认开启
+    'threshold_ms': 200,                 # 超过该耗时视为慢查询
+    'explain': True,                     # 慢查询时捕获EXPLAIN执行计划
+    'explain_interval_seconds': 600,     # 同一指纹两次EXPLAIN的最小间隔
+    'samples_per_fingerprint': 1000,     # 每个指纹保留最近N次耗时用于计算p50/p95
+    'max_entries': 200,                  # 保留最近N条慢查询明细
+    'dump_path': 'logs/slow_queries.json',  # 定时采集服务每个周期结束后导出到该文件
+}
+# 日志配置
+LOGGING_CONFIG = {
+    'level': 'INFO',
+    'log_file': 'logs/hot_topic.log',
+    'max_bytes': 10 * 1024 * 1024,  # 单个日志文件上限（10MB）
+    'backup_count': 5,
+    'use_queue': True,              # 经队列由后台线程写文件/控制台，采集线程只负责入队
+    'format': 'text',               # text 或 json（每行一个JSON对象，便于日志系统采集）
+    'sample_every': 10,             # 标记为采样的逐页日志每N条保留1条（1表示全部保留）
+}
+# 多工作进程模式配置（通过数据库租约表分摊采集任务）
+WORKER_CONFIG = {
+    'enabled': False,              # 启用多工作进程模式
+    'worker_id': None,             # 工作进程标识，None表示使用"主机名:进程号"
+    'lease_seconds': 300,          # 租约有效期，超过未续约则视为工作进程失效
+    'heartbeat_seconds': 30,       # 续约间隔
+    'interval_seconds': 120,       # 同一任务的运行间隔，与定时采集周期保持一致
+    'interval_slack_seconds': 10,  # 间隔容差，避免调度抖动导致跳过一个周期
+}
+# 平台配置热加载（每个采集周期开始前检查外部配置文件，变化时校验并替换平台定义与分类列表）
+HOT_RELOAD_CONFIG = {
+    'enabled': False,                  # 开启后以外部文件覆盖本文件中的PLATFORM_CONFIG/platform_categories/custom_params
+    'path': 'config/platforms.json',   # 外部配置文件，可用 python -m main.scraper.config_loader --dump 生成
+}
 PLATFORM_CONFIG = {
     'weibo': {
         'base_url': 'https://api.rebang.today/v1/items',  # 基础路径（固定不变）
@@ -3,30 +3,69 @@
 """
 
 import logging
+import time
+from contextlib import contextmanager
 import mysql.connector
-from mysql.connector import Error
-from typing import List, Dict, Any, Optional, Tuple, Union
+from mysql.connector import Error, errorcode
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 from datetime import datetime
 import json
 
 from config.database_config import DATABASE_CONFIG
+from config.platform_config import CACHE_CONFIG
+from main.database.hash_cache import TopicState, get_hash_cache
+from main.database.query_cache import get_query_cache
+from main.database.slow_query import get_slow_query_log
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+def _hex_hash_id(row: Dict[str, Any]) -> Dict[str, Any]:
+    """将BINARY(16)存储的hash_id转换回32位十六进制字符串，保持对外接口不变"""
+    hash_id = row.get('hash_id')
+    if isinstance(hash_id, (bytes, bytearray)):
+        row['hash_id'] = hash_id.hex()
+    return row
+
 class DatabaseManager:
     """数据库管理类，处理与MySQL数据库的交互"""
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, raise_errors: bool = False):
         """
         初始化数据库管理器
         
         Args:
             config: 数据库配置，如果为None则使用默认配置
+            raise_errors: execute_query出错时抛出异常而不是返回空结果（查询服务等需要区分"无数据"和"查询失败"时使用）
         """
         self.config = config or DATABASE_CONFIG
+        self.raise_errors = raise_errors
         self.connection = None
         self.cursor = None
+        # 流式查询专用连接：非缓冲游标未读完前会占用连接，不能与常规查询共用
+        self._stream_connection = None
+        self._stream_busy = False
+        # 标签名 -> 标签ID（字典表中的ID提交后不再变化，可在进程内长期缓存；事务回滚时清空，其中可能有被回滚的新标签）
+        self._tag_ids: Dict[str, int] = {}
+        # 工作单元事务状态：嵌套深度、保存点序号、是否已被服务器整体回滚、提交后回调
+        self._tx_depth = 0
+        self._savepoint_seq = 0
+        self._tx_aborted = False
+        self._after_commit: List[Callable[[], Any]] = []
+        # 语句耗时统计与慢查询记录（进程内共享）
+        self._slow_queries = get_slow_query_log()
+    
+    def _open_connection(self, **options):
+        """按配置创建一个新的MySQL连接"""
+        return mysql.connector.connect(
+            host=self.config['host'],
+            port=self.config['port'],
+            user=self.config['user'],
+            password=self.config['password'],
+            database=self.config['database'],
+            charset=self.config['charset'],
+            **options
+        )
     
     def connect(self) -> bool:
         """
@@ -36,14 +75,7 @@ class DatabaseManager:
             连接是否成功
         """
         try:
-            self.connection = mysql.connector.connect(
-                host=self.config['host'],
-                port=self.config['port'],
-                user=self.config['user'],
-                password=self.config['password'],
-                database=self.config['database'],
-                charset=self.config['charset']
-            )
+            self.connection = self._open_connection()
             
             if self.connection.is_connected():
                 self.cursor = self.connection.cursor(dictionary=True)
@@ -57,6 +89,9 @@ class DatabaseManager:
     
     def disconnect(self) -> None:
         """关闭数据库连接"""
+        if self._stream_connection and self._stream_connection.is_connected():
+            self._stream_connection.close()
+        self._stream_connection = None
         if self.connection and self.connection.is_connected():
             if self.cursor:
                 self.cursor.close()
@@ -77,19 +112,109 @@ class DatabaseManager:
         result = []
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connected()
             
+            started = time.perf_counter()
             self.cursor.execute(query, params or ())
             result = self.cursor.fetchall()
+            self._slow_queries.observe(query, params, time.perf_counter() - started, len(result), self._explain)
+            if result and 'hash_id' in result[0]:
+                for row in result:
+                    _hex_hash_id(row)
             
         except Error as e:
             logger.error(f"执行查询时发生错误: {e}")
             logger.error(f"查询: {query}")
             logger.error(f"参数: {params}")
+            if self.raise_errors:
+                raise
         
         return result
     
+    def iter_query(self, query: str, params: Tuple = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        流式执行查询语句，逐行产出字典结果
+        
+        使用独立连接上的非缓冲游标按批fetchmany，不会一次性物化全部结果，
+        迭代期间仍可通过execute_query等方法使用主连接。
+        
+        Args:
+            query: SQL查询语句
+            params: 查询参数
+            batch_size: 每次从服务端读取的行数
+            
+        Returns:
+            结果行迭代器
+            
+        Raises:
+            Error: 查询或读取失败（与execute_query不同，不会返回空结果）
+        """
+        return self._iter_rows(query, params, batch_size, dictionary=True)
+    
+    def iter_query_tuples(self, query: str, params: Tuple = None, batch_size: int = 1000) -> Iterator[Tuple]:
+        """
+        流式执行查询语句，逐行产出元组结果（比字典行更省内存）
+        
+        Args:
+            query: SQL查询语句
+            params: 查询参数
+            batch_size: 每次从服务端读取的行数
+            
+        Returns:
+            结果行迭代器
+        """
+        return self._iter_rows(query, params, batch_size, dictionary=False)
+    
+    def _iter_rows(self, query: str, params: Optional[Tuple], batch_size: int, dictionary: bool) -> Iterator:
+        """流式查询的公共实现"""
+        connection = None
+        owns_connection = False
+        cursor = None
+        
+        try:
+            # 流式连接使用自动提交：每条查询读取最新数据，不会停留在首次查询的一致性快照上
+            if self._stream_busy:
+                # 已有流式查询在迭代中（嵌套迭代），使用临时连接
+                connection = self._open_connection(consume_results=True, autocommit=True)
+                owns_connection = True
+            else:
+                if not self._stream_connection or not self._stream_connection.is_connected():
+                    self._stream_connection = self._open_connection(consume_results=True, autocommit=True)
+                connection = self._stream_connection
+                self._stream_busy = True
+            
+            cursor = connection.cursor(dictionary=dictionary, buffered=False)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if dictionary and 'hash_id' in rows[0]:
+                    for row in rows:
+                        _hex_hash_id(row)
+                yield from rows
+            
+        except Error as e:
+            logger.error(f"执行流式查询时发生错误: {e}")
+            logger.error(f"查询: {query}")
+            logger.error(f"参数: {params}")
+            # 已产出部分行后无法用空结果表示失败，抛出以免调用方（如导出）得到截断的数据
+            raise
+        
+        finally:
+            if cursor is not None:
+                try:
+                    # 提前终止迭代时需丢弃未读结果，连接才能复用
+                    cursor.close()
+                except Error:
+                    if not owns_connection and self._stream_connection:
+                        self._stream_connection.close()
+                        self._stream_connection = None
+            if owns_connection and connection is not None:
+                connection.close()
+            elif not owns_connection:
+                self._stream_busy = False
+    
     def execute_update(self, query: str, params: Tuple = None) -> int:
         """
         执行更新语句
@@ -104,17 +229,22 @@ class DatabaseManager:
         affected_rows = 0
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connected()
             
+            started = time.perf_counter()
             self.cursor.execute(query, params or ())
-            self.connection.commit()
             affected_rows = self.cursor.rowcount
+            if not self._tx_depth:
+                self.connection.commit()
+            self._slow_queries.observe(query, params, time.perf_counter() - started, affected_rows, self._explain)
             
         except Error as e:
             logger.error(f"执行更新时发生错误: {e}")
             logger.error(f"查询: {query}")
             logger.error(f"参数: {params}")
+            # 事务中抛出，由保存点或事务整体回滚；事务外保持原有的记录后返回0
+            if self._tx_depth:
+                raise
             if self.connection:
                 self.connection.rollback()
         
@@ -134,22 +264,167 @@ class DatabaseManager:
         affected_rows = 0
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connected()
             
+            started = time.perf_counter()
             self.cursor.executemany(query, params_list)
-            self.connection.commit()
             affected_rows = self.cursor.rowcount
+            if not self._tx_depth:
+                self.connection.commit()
+            # 批量语句的参数只记录第一组的形态，不做EXPLAIN
+            self._slow_queries.observe(query, params_list[0] if params_list else None,
+                                       time.perf_counter() - started, affected_rows)
             
         except Error as e:
             logger.error(f"批量执行SQL时发生错误: {e}")
             logger.error(f"查询: {query}")
             logger.error(f"参数数量: {len(params_list)}")
+            if self._tx_depth:
+                raise
             if self.connection:
                 self.connection.rollback()
         
         return affected_rows
     
+    def _explain(self, query: str, params: Optional[Tuple]) -> List[Dict[str, Any]]:
+        """获取语句的执行计划，失败时返回空列表（只用于慢查询诊断，不影响业务）
+        
+        使用单独的临时游标：调用方随后还要读取主游标的lastrowid等状态，不能被EXPLAIN覆盖。
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(f"EXPLAIN {query}", params or ())
+            return cursor.fetchall()
+        except Error as e:
+            logger.warning(f"获取执行计划失败: {e}")
+            return []
+        finally:
+            if cursor is not None:
+                cursor.close()
+    
+    def _ensure_connected(self) -> None:
+        """事务外按需重连；事务内连接已在开始时确认，不再逐条语句ping服务器"""
+        if self._tx_depth:
+            return
+        if not self.connection or not self.connection.is_connected():
+            self.connect()
+    
+    @contextmanager
+    def transaction(self) -> Iterator['DatabaseManager']:
+        """
+        工作单元事务：范围内的execute_update/execute_many不再逐条提交，正常退出时统一提交一次
+        
+        可嵌套，内层并入最外层事务；范围内抛出异常时整体回滚并重新抛出。
+        事务中执行失败的写入语句会抛出mysql.connector.Error，配合savepoint隔离单条数据的失败。
+        保存点内发生死锁或回滚到保存点失败时，服务器端事务已整体回滚，退出时不提交，回滚并抛出Error。
+        
+        用法:
+            with db.transaction():
+                ...
+        """
+        if self._tx_depth:
+            self._tx_depth += 1
+            try:
+                yield self
+            finally:
+                self._tx_depth -= 1
+            return
+        
+        if (not self.connection or not self.connection.is_connected()) and not self.connect():
+            raise Error("无法连接数据库，事务未开始")
+        self._tx_depth = 1
+        self._tx_aborted = False
+        try:
+            yield self
+            if self._tx_aborted:
+                # 之前的写入已被服务器回滚，之后的语句在新事务中执行，提交会只落库一部分
+                raise Error("事务已被服务器回滚，放弃提交")
+            self.connection.commit()
+        except BaseException:
+            self._tx_depth = 0
+            self._rollback()
+            raise
+        finally:
+            self._tx_depth = 0
+            self._tx_aborted = False
+        
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"事务提交后回调执行失败: {e}")
+    
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """
+        事务内的保存点：范围内抛出异常时只回滚该范围内的写入并重新抛出，事务其余部分照常提交
+        
+        范围内发生死锁或回滚到保存点失败时，整个事务标记为已回滚，最外层transaction()不再提交。
+        不在事务中时等同于transaction()。
+        """
+        if not self._tx_depth:
+            with self.transaction():
+                yield
+            return
+        
+        self._savepoint_seq += 1
+        name = f"sp_{self._savepoint_seq}"
+        pending_callbacks = len(self._after_commit)
+        self.cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException as exc:
+            # 死锁会使服务器回滚整个事务，保存点随之失效；两种情况都只能让整个事务回滚
+            if isinstance(exc, Error) and exc.errno == errorcode.ER_LOCK_DEADLOCK:
+                self._tx_aborted = True
+            else:
+                try:
+                    self.cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                except Error as e:
+                    logger.error(f"回滚到保存点 {name} 失败: {e}")
+                    self._tx_aborted = True
+            del self._after_commit[pending_callbacks:]
+            # 被回滚的写入可能已登记到哈希缓存和标签ID缓存
+            get_hash_cache().clear()
+            self._tag_ids.clear()
+            raise
+        self.cursor.execute(f"RELEASE SAVEPOINT {name}")
+    
+    def end_snapshot(self) -> None:
+        """
+        结束主连接上的只读事务（事务外才生效）
+        
+        自动提交关闭时，InnoDB在REPEATABLE READ下从第一条查询起一直读同一个一致性快照；
+        长期持有连接只做查询的调用方（如查询服务的线程）每次查询后调用，下次查询即可读到最新提交的数据。
+        """
+        if self._tx_depth or not self.connection:
+            return
+        try:
+            self.connection.commit()
+        except Error as e:
+            logger.warning(f"结束只读事务失败: {e}")
+    
+    def after_commit(self, callback: Callable[[], Any]) -> None:
+        """
+        登记事务提交后执行的回调（如缓存失效）；不在事务中时立即执行，事务回滚时丢弃
+        """
+        if self._tx_depth:
+            self._after_commit.append(callback)
+        else:
+            callback()
+    
+    def _rollback(self) -> None:
+        self._after_commit.clear()
+        get_hash_cache().clear()
+        self._tag_ids.clear()
+        try:
+            if self.connection:
+                self.connection.rollback()
+        except Error as e:
+            logger.error(f"回滚事务失败: {e}")
+    
     def get_last_insert_id(self) -> int:
         """
         获取最后插入的ID
@@ -197,19 +472,22 @@ class DatabaseManager:
     
     # 热搜话题相关方法
     
-    def insert_hot_topic(self, topic_data: Dict[str, Any]) -> int:
+    def insert_hot_topic(self, topic_data: Dict[str, Any], platform_id: Optional[int] = None,
+                         rank_change: Optional[int] = None, is_active: Optional[bool] = None) -> int:
         """
         插入热搜话题（适配新字段）
+        
+        platform_id、rank_change、is_active可直接传入，未传入时从topic_data读取，避免调用方复制字典
         """
         query = """
         INSERT INTO hot_topics 
         (platform_id, title, `rank`, heat_value, url, hash_id, 
         category, first_seen_at, last_seen_at, rank_change, is_active) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, UNHEX(%s), %s, %s, %s, %s, %s)
         """
         
         params = (
-            topic_data.get('platform_id'),
+            platform_id if platform_id is not None else topic_data.get('platform_id'),
             topic_data['title'],
             topic_data['rank'],
             topic_data.get('heat_value'),
@@ -218,8 +496,8 @@ class DatabaseManager:
             topic_data.get('category'),
             topic_data.get('first_seen_at', datetime.now()),
             topic_data.get('last_seen_at', datetime.now()),
-            topic_data.get('rank_change', 0),
-            topic_data.get('is_active', True)
+            rank_change if rank_change is not None else topic_data.get('rank_change', 0),
+            is_active if is_active is not None else topic_data.get('is_active', True)
         )
         
         affected = self.execute_update(query, params)
@@ -272,15 +550,89 @@ class DatabaseManager:
         # 执行更新
         affected_rows = self.execute_update(query, tuple(params))
         
-        # 更新标签
+        # 按差异同步标签
         if 'tags' in topic_data and topic_data['tags']:
-            # 删除旧标签
-            self.delete_topic_tags(topic_id)
-            # 插入新标签
-            self.insert_topic_tags(topic_id, topic_data['tags'])
+            self.sync_topic_tags({topic_id: topic_data['tags']})
         
         return affected_rows > 0
     
+    def get_board_topics(self, platform_code: str, category: str) -> List[Dict[str, Any]]:
+        """
+        获取某个榜单(平台, 分类)当前活跃的话题，用于初始化内存快照
+        
+        Args:
+            platform_code: 平台代码
+            category: 分类名称
+            
+        Returns:
+            话题列表（id, hash_id, rank, heat_value, title, tags），tags为以单元分隔符(\\x1f)连接的字符串
+        """
+        query = """
+        SELECT t.id, t.hash_id, t.`rank`, t.heat_value, t.title,
+               (SELECT GROUP_CONCAT(tg.name ORDER BY tt.id SEPARATOR '\x1f')
+                FROM topic_tags tt JOIN tags tg ON tg.id = tt.tag_id
+                WHERE tt.topic_id = t.id) AS tags
+        FROM hot_topics t
+        JOIN platforms p ON t.platform_id = p.id
+        WHERE p.code = %s AND t.category = %s AND t.is_active = TRUE
+        ORDER BY t.`rank`
+        """
+        return self.execute_query(query, (platform_code, category))
+    
+    def update_topic_positions(self, params_list: List[Tuple]) -> int:
+        """
+        批量更新仍在榜话题的排名、排名变化和热度，并刷新最后出现时间
+        
+        Args:
+            params_list: [(rank, rank_change, heat_value, url, topic_id), ...]
+            
+        Returns:
+            受影响的行数
+        """
+        if not params_list:
+            return 0
+        return self.execute_many("""
+            UPDATE hot_topics
+            SET `rank` = %s, rank_change = %s, heat_value = %s, url = %s,
+                last_seen_at = NOW(), is_active = TRUE
+            WHERE id = %s
+        """, params_list)
+    
+    def deactivate_topics(self, topic_ids: List[int]) -> int:
+        """
+        将指定话题标记为失效（已掉出榜单）
+        
+        Args:
+            topic_ids: 话题ID列表
+            
+        Returns:
+            受影响的行数
+        """
+        if not topic_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(topic_ids))
+        return self.execute_update(
+            f"UPDATE hot_topics SET is_active = FALSE, last_seen_at = CURRENT_TIMESTAMP "
+            f"WHERE id IN ({placeholders}) AND is_active = TRUE",
+            tuple(topic_ids)
+        )
+    
+    def get_topic_state_by_hash(self, hash_id: str) -> Optional[Dict[str, Any]]:
+        """
+        根据哈希ID获取话题的最小状态（只查主表，不关联平台、不查标签），供去重和保存时使用
+        
+        Args:
+            hash_id: 哈希ID
+            
+        Returns:
+            {'id', 'rank', 'last_seen_at', 'is_active'}，不存在则返回None
+        """
+        result = self.execute_query(
+            "SELECT id, `rank`, last_seen_at, is_active FROM hot_topics WHERE hash_id = UNHEX(%s)",
+            (hash_id,)
+        )
+        return result[0] if result else None
+    
     def get_hot_topic_by_hash(self, hash_id: str) -> Optional[Dict[str, Any]]:
         """
         根据哈希ID获取热搜话题
@@ -295,7 +647,7 @@ class DatabaseManager:
         SELECT t.*, p.code as platform_code, p.name as platform_name 
         FROM hot_topics t
         JOIN platforms p ON t.platform_id = p.id
-        WHERE t.hash_id = %s
+        WHERE t.hash_id = UNHEX(%s)
         """
         result = self.execute_query(query, (hash_id,))
         
@@ -309,20 +661,21 @@ class DatabaseManager:
     
     def get_hot_topics_by_platform(self, platform_code: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
-        获取指定平台的热搜话题
+        获取指定平台当前在榜的热搜话题
         
         Args:
             platform_code: 平台代码
             limit: 返回数量限制
             
         Returns:
-            话题列表
+            话题列表，按排名升序
         """
+        # 只取活跃话题：已掉榜的历史话题保留着旧排名，不过滤会与当前榜单混在一起
         query = """
         SELECT t.*, p.code as platform_code, p.name as platform_name 
         FROM hot_topics t
         JOIN platforms p ON t.platform_id = p.id
-        WHERE p.code = %s
+        WHERE p.code = %s AND t.is_active = TRUE
         ORDER BY t.`rank`
         LIMIT %s
         """
@@ -390,9 +743,39 @@ class DatabaseManager:
     
     # 话题标签相关方法
     
+    def get_tag_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        获取标签名对应的标签ID，字典表中没有的标签先写入
+        
+        Args:
+            names: 标签名
+            
+        Returns:
+            {标签名: 标签ID}，写入失败的标签不在结果中
+        """
+        names = [name for name in dict.fromkeys(names) if name]
+        missing = [name for name in names if name not in self._tag_ids]
+        if missing:
+            # 事务外单独成一个事务，查询加的共享锁随之释放
+            with self.transaction():
+                self.execute_update(
+                    f"INSERT INTO tags (name) VALUES {', '.join(['(%s)'] * len(missing))} "
+                    f"ON DUPLICATE KEY UPDATE name = name",
+                    tuple(missing)
+                )
+                # 加锁读取最新提交的数据：其他进程在本事务快照之后写入的标签，普通查询在REPEATABLE READ下看不到
+                rows = self.execute_query(
+                    f"SELECT id, name FROM tags WHERE name IN ({', '.join(['%s'] * len(missing))}) "
+                    f"LOCK IN SHARE MODE",
+                    tuple(missing)
+                )
+            for row in rows:
+                self._tag_ids[row['name']] = row['id']
+        return {name: self._tag_ids[name] for name in names if name in self._tag_ids}
+    
     def insert_topic_tags(self, topic_id: int, tags: List[str]) -> int:
         """
-        插入话题标签
+        插入话题标签（新话题使用，已有话题请使用sync_topic_tags）
         
         Args:
             topic_id: 话题ID
@@ -404,10 +787,63 @@ class DatabaseManager:
         if not tags:
             return 0
         
-        query = "INSERT INTO topic_tags (topic_id, tag_name) VALUES (%s, %s)"
-        params_list = [(topic_id, tag) for tag in tags]
+        tag_ids = self.get_tag_ids(tags)
+        if not tag_ids:
+            return 0
+        params = []
+        for tag_id in tag_ids.values():
+            params.extend((topic_id, tag_id))
+        return self.execute_update(
+            f"INSERT INTO topic_tags (topic_id, tag_id) VALUES {', '.join(['(%s, %s)'] * len(tag_ids))} "
+            f"ON DUPLICATE KEY UPDATE tag_id = tag_id",
+            tuple(params)
+        )
+    
+    def sync_topic_tags(self, topic_tags: Dict[int, List[str]]) -> Tuple[int, int]:
+        """
+        按差异同步一批话题的标签：只插入新增的关联、只删除不再出现的关联，未变化的行不动
+        
+        整批只需一次查询现有关联，加上至多一条批量DELETE和一条批量INSERT。
         
-        return self.execute_many(query, params_list)
+        Args:
+            topic_tags: {话题ID: 当前标签列表}
+            
+        Returns:
+            (插入的关联数, 删除的关联数)
+        """
+        if not topic_tags:
+            return 0, 0
+        
+        tag_ids = self.get_tag_ids(tag for tags in topic_tags.values() for tag in tags)
+        current: Dict[int, set] = {}
+        rows = self.execute_query(
+            f"SELECT topic_id, tag_id FROM topic_tags WHERE topic_id IN ({', '.join(['%s'] * len(topic_tags))})",
+            tuple(topic_tags)
+        )
+        for row in rows:
+            current.setdefault(row['topic_id'], set()).add(row['tag_id'])
+        
+        to_insert, to_delete = [], []
+        for topic_id, tags in topic_tags.items():
+            existing = current.get(topic_id, set())
+            wanted = [tag_ids[tag] for tag in dict.fromkeys(tags) if tag in tag_ids]
+            to_insert.extend((topic_id, tag_id) for tag_id in wanted if tag_id not in existing)
+            to_delete.extend((topic_id, tag_id) for tag_id in existing.difference(wanted))
+        
+        deleted = inserted = 0
+        if to_delete:
+            deleted = self.execute_update(
+                f"DELETE FROM topic_tags WHERE (topic_id, tag_id) IN ({', '.join(['(%s, %s)'] * len(to_delete))})",
+                tuple(value for pair in to_delete for value in pair)
+            )
+        if to_insert:
+            inserted = self.execute_update(
+                # 只容忍重复关联，外键等其他错误照常抛出
+                f"INSERT INTO topic_tags (topic_id, tag_id) VALUES {', '.join(['(%s, %s)'] * len(to_insert))} "
+                f"ON DUPLICATE KEY UPDATE tag_id = tag_id",
+                tuple(value for pair in to_insert for value in pair)
+            )
+        return inserted, deleted
     
     def delete_topic_tags(self, topic_id: int) -> int:
         """
@@ -432,9 +868,14 @@ class DatabaseManager:
         Returns:
             标签列表
         """
-        query = "SELECT tag_name FROM topic_tags WHERE topic_id = %s"
+        query = """
+        SELECT tg.name FROM topic_tags tt
+        JOIN tags tg ON tg.id = tt.tag_id
+        WHERE tt.topic_id = %s
+        ORDER BY tt.id
+        """
         result = self.execute_query(query, (topic_id,))
-        return [row['tag_name'] for row in result]
+        return [row['name'] for row in result]
     
     # 采集记录相关方法
     
@@ -535,7 +976,7 @@ class DatabaseManager:
         GROUP BY p.id, p.code, p.name, p.icon
         ORDER BY p.id
         """
-        return self.execute_query(query)
+        return list(self.iter_query(query))
     
     def get_category_statistics(self) -> List[Dict[str, Any]]:
         """
@@ -553,7 +994,7 @@ class DatabaseManager:
         GROUP BY category
         ORDER BY topic_count DESC
         """
-        return self.execute_query(query)
+        return list(self.iter_query(query))
     
     def get_tag_statistics(self) -> List[Dict[str, Any]]:
         """
@@ -564,13 +1005,14 @@ class DatabaseManager:
         """
         query = """
         SELECT 
-            tag_name,
+            tg.name as tag_name,
             COUNT(*) as topic_count
-        FROM topic_tags
-        GROUP BY tag_name
+        FROM topic_tags tt
+        JOIN tags tg ON tg.id = tt.tag_id
+        GROUP BY tg.id, tg.name
         ORDER BY topic_count DESC
         """
-        return self.execute_query(query)
+        return list(self.iter_query(query))
     
     def get_collection_statistics(self, days: int = 7) -> Dict[str, Any]:
         """
@@ -646,7 +1088,7 @@ class DatabaseManager:
         ORDER BY ABS(t.rank_change) DESC
         LIMIT %s
         """
-        return self.execute_query(query, (platform_code, hours, limit))
+        return list(self.iter_query(query, (platform_code, hours, limit)))
 # 单例模式
 _db_instance = None
 
@@ -663,6 +1105,30 @@ def get_db_manager() -> DatabaseManager:
     return _db_instance
 
 # 辅助函数
+def lookup_topic_state(hash_id: str, db: Optional[DatabaseManager] = None) -> Optional[TopicState]:
+    """
+    按哈希ID查找已有话题的状态：先查哈希缓存，未命中时精简查询并回填缓存
+    
+    Args:
+        hash_id: 哈希ID
+        db: 数据库管理器，默认使用全局实例
+        
+    Returns:
+        TopicState，话题不存在时返回None
+    """
+    if CACHE_CONFIG['hash_cache_enabled']:
+        state = get_hash_cache().get(hash_id)
+        if state is not None:
+            return state
+    
+    row = (db or get_db_manager()).get_topic_state_by_hash(hash_id)
+    if not row:
+        return None
+    state = TopicState(row['id'], row['rank'], row['last_seen_at'], bool(row['is_active']))
+    if CACHE_CONFIG['hash_cache_enabled']:
+        get_hash_cache().put(hash_id, state)
+    return state
+
 def save_hot_topic(topic_data: Dict[str, Any]) -> Union[int, bool]:
     """
     优化后的保存热搜话题方法，支持排名变动追踪
@@ -680,16 +1146,13 @@ def save_hot_topic(topic_data: Dict[str, Any]) -> Union[int, bool]:
         logger.error(f"平台 {topic_data['platform']} 不存在")
         return False  # 平台不存在，确认为失败
     
-    # 检查是否已存在相同话题
-    existing = db.execute_query(
-        "SELECT id, `rank` FROM hot_topics WHERE hash_id = %s",
-        (topic_data['hash_id'],)
-    )
+    # 检查是否已存在相同话题（优先命中哈希缓存）
+    existing = lookup_topic_state(topic_data['hash_id'], db)
     
     if existing:
         # 计算排名变化 (旧排名 - 新排名，正数表示排名上升)
-        old_rank = existing[0]['rank']
-        rank_change = old_rank - topic_data['rank']
+        old_rank = existing.rank
+        rank_change = old_rank - topic_data['rank'] if old_rank is not None else 0
         
         # 执行更新（即使字段无变化，也更新last_seen_at为当前时间，标记活跃）
         affected = db.execute_update("""
@@ -706,26 +1169,29 @@ def save_hot_topic(topic_data: Dict[str, Any]) -> Union[int, bool]:
             rank_change,
             topic_data.get('heat_value'),
             topic_data.get('url'),
-            existing[0]['id']
+            existing.id
         ))
+        if CACHE_CONFIG['hash_cache_enabled']:
+            get_hash_cache().mark_seen(topic_data['hash_id'], existing.id, topic_data['rank'])
         
-        # 更新标签（无论是否有字段变化，均同步标签）
+        # 按差异同步标签（标签未变化时不产生写入）
         if 'tags' in topic_data:
-            db.delete_topic_tags(existing[0]['id'])
-            db.insert_topic_tags(existing[0]['id'], topic_data['tags'])
+            db.sync_topic_tags({existing.id: topic_data['tags']})
         
         # 关键修改：只要记录存在，无论是否有字段变化，均返回现有ID（视为成功）
         # 即使affected=0，也说明记录有效，只是本次无字段更新
-        return existing[0]['id']
+        return existing.id
     
     else:
         # 插入新记录
-        new_topic_id = db.insert_hot_topic({
-            **topic_data,
-            'platform_id': platform['id'],
-            'rank_change': 0,  # 新话题默认无变化
-            'is_active': True
-        })
+        new_topic_id = db.insert_hot_topic(
+            topic_data,
+            platform_id=platform['id'],
+            rank_change=0,  # 新话题默认无变化
+            is_active=True
+        )
+        if new_topic_id > 0 and CACHE_CONFIG['hash_cache_enabled']:
+            get_hash_cache().mark_seen(topic_data['hash_id'], new_topic_id, topic_data['rank'])
         return new_topic_id if new_topic_id > 0 else False  # 新增失败才返回False
 def save_collection_log(platform: str, status: str, stats: Dict[str, int], 
                        start_time: datetime, end_time: datetime, 
@@ -761,11 +1227,17 @@ def save_collection_log(platform: str, status: str, stats: Dict[str, int],
         'end_time': end_time
     }
     
-    return db.insert_collection_log(log_data)
+    # 采集日志写入失败不应影响同一事务中已写入的话题
+    try:
+        with db.savepoint():
+            return db.insert_collection_log(log_data)
+    except Error as e:
+        logger.error(f"保存采集记录失败: {e}")
+        return 0
     
 def get_platform_hot_topics(platform_code: str, limit: int = 50) -> List[Dict[str, Any]]:
     """
-    获取指定平台的热搜话题
+    获取指定平台的热搜话题（带缓存，返回的列表为缓存共享对象，请勿修改）
     
     Args:
         platform_code: 平台代码
@@ -774,8 +1246,18 @@ def get_platform_hot_topics(platform_code: str, limit: int = 50) -> List[Dict[st
     Returns:
         话题列表
     """
+    cache_key = ('platform_hot_topics', platform_code, limit)
+    if CACHE_CONFIG['enabled']:
+        hit, cached = get_query_cache().get(cache_key)
+        if hit:
+            return cached
+    
     db = get_db_manager()
-    return db.get_hot_topics_by_platform(platform_code, limit)
+    topics = db.get_hot_topics_by_platform(platform_code, limit)
+    
+    if CACHE_CONFIG['enabled']:
+        get_query_cache().set(cache_key, topics, platforms=(platform_code,))
+    return topics
 
 def get_all_platform_hot_topics(limit_per_platform: int = 20) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -787,6 +1269,12 @@ def get_all_platform_hot_topics(limit_per_platform: int = 20) -> Dict[str, List[
     Returns:
         按平台分组的话题字典
     """
+    cache_key = ('all_platform_hot_topics', limit_per_platform)
+    if CACHE_CONFIG['enabled']:
+        hit, cached = get_query_cache().get(cache_key)
+        if hit:
+            return cached
+    
     db = get_db_manager()
     platforms = db.get_enabled_platforms()
     
@@ -795,8 +1283,56 @@ def get_all_platform_hot_topics(limit_per_platform: int = 20) -> Dict[str, List[
         topics = db.get_hot_topics_by_platform(platform['code'], limit_per_platform)
         result[platform['code']] = topics
     
+    if CACHE_CONFIG['enabled']:
+        # 依赖全部平台：任一平台数据更新都会使其失效
+        get_query_cache().set(cache_key, result)
     return result
 
+def get_latest_hot_topics(hours: int = 24, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    获取最近的热搜话题（带缓存）
+    
+    Args:
+        hours: 最近小时数
+        limit: 返回数量限制
+        
+    Returns:
+        话题列表
+    """
+    cache_key = ('latest_hot_topics', hours, limit)
+    if CACHE_CONFIG['enabled']:
+        hit, cached = get_query_cache().get(cache_key)
+        if hit:
+            return cached
+    
+    db = get_db_manager()
+    topics = db.get_latest_hot_topics(hours, limit)
+    
+    if CACHE_CONFIG['enabled']:
+        get_query_cache().set(cache_key, topics)
+    return topics
+
+def invalidate_platform_cache(platform_code: str) -> int:
+    """
+    使指定平台相关的热榜缓存失效（平台数据写入后调用）
+    
+    Args:
+        platform_code: 平台代码
+        
+    Returns:
+        失效的缓存条目数
+    """
+    return get_query_cache().invalidate_platform(platform_code)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    获取热榜缓存的命中统计
+    
+    Returns:
+        统计信息字典
+    """
+    return get_query_cache().get_stats()
+
 def search_topics(keyword: str, limit: int = 50) -> List[Dict[str, Any]]:
     """
     搜索热搜话题
@@ -830,7 +1366,7 @@ def get_statistics() -> Dict[str, Any]:
 def mark_inactive_topics(platform_code: str, active_hashes: List[str], category: Optional[str] = None):
     """
     标记指定平台+分类下不在活跃列表中的话题为失效状态
-    完全适配hot_topics表结构（使用platform_id关联、hash_id为字符串）
+    完全适配hot_topics表结构（使用platform_id关联、hash_id以BINARY(16)存储）
     """
     db = get_db_manager()
     if not db.connection or not db.connection.is_connected():
@@ -842,7 +1378,7 @@ def mark_inactive_topics(platform_code: str, active_hashes: List[str], category:
         cursor.execute("SELECT id FROM platforms WHERE code = %s", (platform_code,))
         platform = cursor.fetchone()
         if not platform:
-            logger.error(f"平台 {platform_code} 在platforms表中不存在，无法标记失效话题")
+            logger.error("平台 %s 在platforms表中不存在，无法标记失效话题", platform_code)
             return False
         platform_id = platform['id']  # 从platforms表获取的整数ID
         
@@ -853,12 +1389,12 @@ def mark_inactive_topics(platform_code: str, active_hashes: List[str], category:
         ]
         params = [platform_id]  # 先添加platform_id参数（整数类型）
         
-        # 3. 处理活跃hash_id列表（hash_id为VARCHAR类型，需作为字符串参数）
+        # 3. 处理活跃hash_id列表（hash_id为BINARY(16)类型，十六进制参数需经UNHEX转换）
         if active_hashes:
-            # 为每个hash_id创建字符串占位符（%s），MySQL会自动加引号
-            placeholders = ', '.join(['%s'] * len(active_hashes))
+            # 为每个hash_id创建UNHEX(%s)占位符，MySQL会自动加引号
+            placeholders = ', '.join(['UNHEX(%s)'] * len(active_hashes))
             where_conditions.append(f"hash_id NOT IN ({placeholders})")
-            params.extend(active_hashes)  # 添加字符串类型的hash_id列表
+            params.extend(active_hashes)  # 添加十六进制字符串形式的hash_id列表
         
         # 4. 处理分类条件（如果指定）
         if category:
@@ -874,19 +1410,18 @@ def mark_inactive_topics(platform_code: str, active_hashes: List[str], category:
             WHERE {where_clause}
         """
         
-        # 6. 执行SQL（参数通过列表传递，确保类型匹配）
-        cursor.execute(update_sql, params)
-        db.connection.commit()
-        affected_rows = cursor.rowcount
-        logger.info(
-            f"平台 {platform_code}（ID: {platform_id}）分类 {category or '全部'} "
-            f"成功标记 {affected_rows} 个失效话题"
-        )
+        # 6. 执行SQL（参数通过列表传递，确保类型匹配），在事务中时随事务一起提交
+        with db.savepoint():
+            cursor.execute(update_sql, params)
+            affected_rows = cursor.rowcount
+        logger.info("平台 %s（ID: %s）分类 %s 成功标记 %d 个失效话题",
+                    platform_code, platform_id, category or '全部', affected_rows,
+                    extra={'sampled': True})
         return True if affected_rows >= 0 else False
     
     except Exception as e:
-        logger.error(f"标记失效话题失败: {str(e)}")
-        db.connection.rollback()
+        # 写入已由保存点回滚，不影响外层事务
+        logger.error("标记失效话题失败: %s", e)
         return False
     
     finally:
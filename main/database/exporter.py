@@ -0,0 +1,212 @@
+"""
+数据导出模块 - 以流式方式将热搜话题导出为JSONL/CSV/Parquet文件
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from main.database.database_manager import DatabaseManager, get_db_manager
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('jsonl', 'csv', 'parquet')
+
+# 标签在GROUP_CONCAT中的分隔符（单元分隔符，不会出现在清洗后的标签里）
+TAG_SEPARATOR = '\x1f'
+
+EXPORT_COLUMNS = [
+    'id', 'platform_code', 'platform_name', 'title', 'rank', 'heat_value', 'url', 'hash_id',
+    'category', 'first_seen_at', 'last_seen_at', 'rank_change', 'is_active', 'tags'
+]
+
+EXPORT_QUERY = f"""
+    SELECT t.id, p.code, p.name, t.title, t.`rank`, t.heat_value, t.url, LOWER(HEX(t.hash_id)),
+           t.category, t.first_seen_at, t.last_seen_at, t.rank_change, t.is_active,
+           (SELECT GROUP_CONCAT(tg.name ORDER BY tt.id SEPARATOR '{TAG_SEPARATOR}')
+            FROM topic_tags tt JOIN tags tg ON tg.id = tt.tag_id
+            WHERE tt.topic_id = t.id) AS tags
+    FROM hot_topics t
+    JOIN platforms p ON t.platform_id = p.id
+"""
+
+
+class TopicExporter:
+    """话题导出器：通过非缓冲游标按块读取并写出，内存占用与总行数无关"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, chunk_size: int = 5000):
+        """
+        初始化导出器
+
+        Args:
+            db: 数据库管理器，默认使用全局单例（流式查询走其独立的流式连接）
+            chunk_size: 每次fetchmany读取并写出的行数
+        """
+        self.db = db or get_db_manager()
+        self.chunk_size = chunk_size
+
+    def export(self, output_path: str, fmt: str = 'jsonl',
+               start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+               platforms: Optional[Sequence[str]] = None,
+               time_field: str = 'last_seen_at') -> Dict[str, Any]:
+        """
+        导出话题数据
+
+        Args:
+            output_path: 输出文件路径
+            fmt: 输出格式（jsonl/csv/parquet）
+            start_time: 时间范围起点（含）
+            end_time: 时间范围终点（不含）
+            platforms: 平台代码列表，None表示全部平台
+            time_field: 时间过滤字段（first_seen_at或last_seen_at）
+
+        Returns:
+            导出统计（行数、耗时、输出路径）
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}，可选: {', '.join(SUPPORTED_FORMATS)}")
+        if time_field not in ('first_seen_at', 'last_seen_at'):
+            raise ValueError(f"不支持的时间字段: {time_field}")
+
+        query, params = self._build_query(start_time, end_time, platforms, time_field)
+        writer = {'jsonl': self._write_jsonl, 'csv': self._write_csv, 'parquet': self._write_parquet}[fmt]
+
+        started = time.time()
+        try:
+            rows = writer(output_path, self._iter_chunks(query, params))
+        except Exception:
+            # 读取中途失败时删除不完整的文件，避免被当作完整导出使用
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        duration = time.time() - started
+
+        logger.info(f"导出完成: {rows} 条话题 -> {output_path} ({fmt}, 耗时 {duration:.2f}秒)")
+        return {'rows': rows, 'path': output_path, 'format': fmt, 'duration': duration}
+
+    def _build_query(self, start_time: Optional[datetime], end_time: Optional[datetime],
+                     platforms: Optional[Sequence[str]], time_field: str) -> Tuple[str, Tuple]:
+        """根据过滤条件拼接导出SQL"""
+        conditions = []
+        params: List[Any] = []
+        if start_time:
+            conditions.append(f"t.{time_field} >= %s")
+            params.append(start_time)
+        if end_time:
+            conditions.append(f"t.{time_field} < %s")
+            params.append(end_time)
+        if platforms:
+            conditions.append(f"p.code IN ({', '.join(['%s'] * len(platforms))})")
+            params.extend(platforms)
+
+        query = EXPORT_QUERY
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY t.id"
+        return query, tuple(params)
+
+    def _iter_chunks(self, query: str, params: Tuple) -> Iterator[List[Tuple]]:
+        """通过流式查询按块产出元组行"""
+        rows = self.db.iter_query_tuples(query, params, batch_size=self.chunk_size)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            yield [self._normalize_row(row) for row in chunk]
+
+    @staticmethod
+    def _normalize_row(row: Tuple) -> Tuple:
+        """把标签串拆为列表"""
+        tags = row[-1].split(TAG_SEPARATOR) if row[-1] else []
+        return row[:-1] + (tags,)
+
+    @staticmethod
+    def _write_jsonl(output_path: str, chunks: Iterator[List[Tuple]]) -> int:
+        rows = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.writelines(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str) + '\n'
+                    for row in chunk
+                )
+                rows += len(chunk)
+        return rows
+
+    @staticmethod
+    def _write_csv(output_path: str, chunks: Iterator[List[Tuple]]) -> int:
+        rows = 0
+        # utf-8-sig 便于Excel直接打开中文内容
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for chunk in chunks:
+                writer.writerows(row[:-1] + ('|'.join(row[-1]),) for row in chunk)
+                rows += len(chunk)
+        return rows
+
+    @staticmethod
+    def _write_parquet(output_path: str, chunks: Iterator[List[Tuple]]) -> int:
+        # 列式输出按需导入，避免常规采集路径加载pandas/pyarrow
+        import pandas as pd
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("导出Parquet需要安装pyarrow: pip install pyarrow") from e
+
+        schema = pa.schema([
+            ('id', pa.int64()), ('platform_code', pa.string()), ('platform_name', pa.string()),
+            ('title', pa.string()), ('rank', pa.int32()), ('heat_value', pa.int64()),
+            ('url', pa.string()), ('hash_id', pa.string()), ('category', pa.string()),
+            ('first_seen_at', pa.timestamp('s')), ('last_seen_at', pa.timestamp('s')),
+            ('rank_change', pa.int32()), ('is_active', pa.bool_()), ('tags', pa.list_(pa.string())),
+        ])
+
+        rows = 0
+        with pq.ParquetWriter(output_path, schema, compression='snappy') as writer:
+            for chunk in chunks:
+                frame = pd.DataFrame.from_records(chunk, columns=EXPORT_COLUMNS)
+                frame['is_active'] = frame['is_active'].astype(bool)
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                rows += len(chunk)
+        return rows
+
+
+def export_topics(output_path: str, fmt: str = 'jsonl', **filters) -> Dict[str, Any]:
+    """
+    使用默认配置导出话题数据
+
+    Args:
+        output_path: 输出文件路径
+        fmt: 输出格式
+        **filters: 透传给TopicExporter.export的过滤条件
+
+    Returns:
+        导出统计
+    """
+    return TopicExporter().export(output_path, fmt, **filters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式导出热搜话题")
+    parser.add_argument('output', help="输出文件路径")
+    parser.add_argument('--format', default='jsonl', choices=SUPPORTED_FORMATS, help="输出格式")
+    parser.add_argument('--platform', action='append', help="平台代码，可多次指定")
+    parser.add_argument('--start', type=datetime.fromisoformat, help="起始时间，如 2025-08-01")
+    parser.add_argument('--end', type=datetime.fromisoformat, help="结束时间（不含）")
+    parser.add_argument('--time-field', default='last_seen_at', choices=('first_seen_at', 'last_seen_at'))
+    parser.add_argument('--chunk-size', type=int, default=5000, help="每批读取行数")
+    args = parser.parse_args()
+
+    result = TopicExporter(chunk_size=args.chunk_size).export(
+        args.output, args.format,
+        start_time=args.start, end_time=args.end,
+        platforms=args.platform, time_field=args.time_field
+    )
+    print(f"导出完成: {result['rows']} 条 -> {result['path']}，耗时 {result['duration']:.2f}秒")
@@ -0,0 +1,132 @@
+"""
+话题哈希缓存模块 - 缓存最近出现的话题 hash_id -> (id, rank, last_seen_at, is_active)
+
+去重和保存话题时都要按hash_id查找已有话题。稳定状态下大部分话题跨周期持续在榜，
+由读取和写入共同填充的缓存使这些查找无需访问数据库。只缓存已存在的话题，
+未命中时一律回源查询，因此其他进程新插入的话题不会被漏掉。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from config.platform_config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class TopicState:
+    """话题在库中的最小状态"""
+
+    __slots__ = ('id', 'rank', 'last_seen_at', 'is_active')
+
+    def __init__(self, topic_id: int, rank: Optional[int], last_seen_at: Optional[datetime], is_active: bool):
+        self.id = topic_id
+        self.rank = rank
+        self.last_seen_at = last_seen_at
+        self.is_active = is_active
+
+
+class HashCache:
+    """容量有限的LRU缓存，条目在写入后ttl_seconds秒过期"""
+
+    def __init__(self, max_size: int = 50000, ttl_seconds: float = 3600):
+        """
+        初始化哈希缓存
+
+        Args:
+            max_size: 最大条目数，超出后淘汰最久未使用的条目
+            ttl_seconds: 条目存活秒数
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, hash_id: str) -> Optional[TopicState]:
+        """读取话题状态，未命中或已过期返回None"""
+        with self._lock:
+            entry = self._entries.get(hash_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            expires_at, state = entry
+            if expires_at <= time.monotonic():
+                del self._entries[hash_id]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(hash_id)
+            self._stats['hits'] += 1
+            return state
+
+    def put(self, hash_id: str, state: TopicState) -> None:
+        """写入（或覆盖）话题状态"""
+        with self._lock:
+            self._entries[hash_id] = (time.monotonic() + self.ttl_seconds, state)
+            self._entries.move_to_end(hash_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def mark_seen(self, hash_id: str, topic_id: int, rank: Optional[int],
+                  seen_at: Optional[datetime] = None) -> None:
+        """话题写入后刷新缓存（仍在榜、刚插入或刚更新）"""
+        self.put(hash_id, TopicState(topic_id, rank, seen_at or datetime.now(), True))
+
+    def mark_inactive(self, hash_ids: Iterable[str]) -> None:
+        """话题掉榜后更新缓存中的活跃状态"""
+        with self._lock:
+            for hash_id in hash_ids:
+                entry = self._entries.get(hash_id)
+                if entry is not None:
+                    entry[1].is_active = False
+
+    def discard(self, hash_ids: Iterable[str]) -> None:
+        """移除指定话题（话题被删除或迁出主表时调用）"""
+        with self._lock:
+            for hash_id in hash_ids:
+                self._entries.pop(hash_id, None)
+
+    def clear(self) -> None:
+        """清空缓存（统计信息保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            包含命中/未命中次数、命中率和当前条目数的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# 单例模式
+_hash_cache_instance = None
+
+
+def get_hash_cache() -> HashCache:
+    """
+    获取哈希缓存实例（单例模式）
+
+    Returns:
+        哈希缓存实例
+    """
+    global _hash_cache_instance
+    if _hash_cache_instance is None:
+        _hash_cache_instance = HashCache(
+            max_size=CACHE_CONFIG['hash_cache_size'],
+            ttl_seconds=CACHE_CONFIG['hash_cache_ttl_seconds']
+        )
+    return _hash_cache_instance
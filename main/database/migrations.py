@@ -0,0 +1,219 @@
+"""
+数据库迁移模块 - 将已有库升级到当前表结构
+
+迁移会修改表结构，执行前请停止采集任务。
+"""
+
+import logging
+from typing import Optional
+
+from main.database.database_manager import DatabaseManager, get_db_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _column_type(db: DatabaseManager, table: str, column: str) -> Optional[str]:
+    """查询列的数据类型，表或列不存在时返回None"""
+    result = db.execute_query("""
+        SELECT data_type AS data_type FROM information_schema.COLUMNS
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return result[0]['data_type'].lower() if result else None
+
+
+def _index_exists(db: DatabaseManager, table: str, index: str) -> bool:
+    """判断索引是否存在"""
+    result = db.execute_query("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index))
+    return bool(result)
+
+
+def _convert_hash_column(db: DatabaseManager, table: str, unique: bool, batch_size: int) -> bool:
+    """把单张表的hash_id从VARCHAR(32)十六进制转换为BINARY(16)"""
+    column_type = _column_type(db, table, 'hash_id')
+    if column_type is None:
+        logger.info(f"表 {table} 不存在，跳过哈希列迁移")
+        return False
+    if column_type == 'binary':
+        logger.info(f"表 {table}.hash_id 已是BINARY(16)，无需迁移")
+        return False
+
+    invalid = db.execute_query(
+        f"SELECT COUNT(*) AS cnt FROM {table} WHERE hash_id NOT REGEXP '^[0-9a-fA-F]{{32}}$'"
+    )
+    if invalid and invalid[0]['cnt']:
+        raise ValueError(f"表 {table} 存在 {invalid[0]['cnt']} 条非32位十六进制的hash_id，无法无损转换")
+
+    if _column_type(db, table, 'hash_bin') is None:
+        db.execute_update(f"ALTER TABLE {table} ADD COLUMN hash_bin BINARY(16) NULL AFTER hash_id")
+
+    # 按主键区间分批回填，避免单条大UPDATE长时间锁表
+    bounds = db.execute_query(f"SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM {table}")
+    min_id, max_id = (bounds[0]['min_id'], bounds[0]['max_id']) if bounds else (None, None)
+    converted = 0
+    if min_id is not None:
+        for start in range(min_id, max_id + 1, batch_size):
+            converted += db.execute_update(
+                f"UPDATE {table} SET hash_bin = UNHEX(hash_id) "
+                f"WHERE id >= %s AND id < %s AND hash_bin IS NULL",
+                (start, start + batch_size)
+            )
+
+    # 删除旧列会连带删除其上的UNIQUE约束和冗余的idx_hash_id索引
+    db.execute_update(f"ALTER TABLE {table} DROP COLUMN hash_id")
+    db.execute_update(f"ALTER TABLE {table} CHANGE COLUMN hash_bin hash_id BINARY(16) NOT NULL")
+    if unique:
+        db.execute_update(f"ALTER TABLE {table} ADD UNIQUE KEY uk_hash_id (hash_id)")
+    elif not _index_exists(db, table, 'idx_hash_id'):
+        db.execute_update(f"ALTER TABLE {table} ADD INDEX idx_hash_id (hash_id)")
+
+    logger.info(f"表 {table}.hash_id 已转换为BINARY(16)，回填 {converted} 行")
+    return True
+
+
+def migrate_hash_id_to_binary(db: Optional[DatabaseManager] = None, batch_size: int = 5000) -> bool:
+    """
+    将hot_topics及归档表的hash_id由VARCHAR(32)转换为BINARY(16)
+
+    已有的十六进制哈希通过UNHEX无损转换，无需重新计算。
+
+    Args:
+        db: 数据库管理器，默认使用全局单例
+        batch_size: 每批回填的主键区间大小
+
+    Returns:
+        是否有表被迁移
+    """
+    db = db or get_db_manager()
+    migrated = _convert_hash_column(db, 'hot_topics', unique=True, batch_size=batch_size)
+    migrated = _convert_hash_column(db, 'hot_topics_archive', unique=False, batch_size=batch_size) or migrated
+    return migrated
+
+
+def migrate_tags_to_dictionary(db: Optional[DatabaseManager] = None, batch_size: int = 5000) -> bool:
+    """
+    将topic_tags中重复存储的tag_name拆分到tags字典表，topic_tags改为引用tag_id
+
+    同一话题下的重复标签只保留最早的一条；归档表topic_tags_archive仍保存标签文本，不做迁移。
+
+    Args:
+        db: 数据库管理器，默认使用全局单例
+        batch_size: 每批回填的主键区间大小
+
+    Returns:
+        是否执行了迁移
+    """
+    db = db or get_db_manager()
+    if _column_type(db, 'topic_tags', 'tag_name') is None:
+        logger.info("topic_tags已引用标签字典表，无需迁移")
+        return False
+
+    db.execute_update("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(100) COLLATE utf8mb4_bin NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uk_name (name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    # 旧列为不区分大小写的排序规则，按二进制比较才不会把大小写不同的标签合并
+    created = db.execute_update(
+        "INSERT IGNORE INTO tags (name) SELECT DISTINCT tag_name COLLATE utf8mb4_bin FROM topic_tags"
+    )
+    if _column_type(db, 'topic_tags', 'tag_id') is None:
+        db.execute_update("ALTER TABLE topic_tags ADD COLUMN tag_id INT NULL AFTER topic_id")
+
+    bounds = db.execute_query("SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM topic_tags")
+    min_id, max_id = (bounds[0]['min_id'], bounds[0]['max_id']) if bounds else (None, None)
+    linked = 0
+    if min_id is not None:
+        for start in range(min_id, max_id + 1, batch_size):
+            linked += db.execute_update("""
+                UPDATE topic_tags tt JOIN tags tg ON tg.name = tt.tag_name COLLATE utf8mb4_bin
+                SET tt.tag_id = tg.id
+                WHERE tt.id >= %s AND tt.id < %s AND tt.tag_id IS NULL
+            """, (start, start + batch_size))
+
+    # 原表允许同一话题重复写入相同标签，建唯一索引前去重
+    duplicates = db.execute_update("""
+        DELETE t1 FROM topic_tags t1
+        JOIN topic_tags t2 ON t1.topic_id = t2.topic_id AND t1.tag_id = t2.tag_id AND t1.id > t2.id
+    """)
+    orphans = db.execute_update("DELETE FROM topic_tags WHERE tag_id IS NULL")
+
+    # 新的唯一索引以topic_id开头，可替代旧索引支撑topic_id外键
+    db.execute_update("""
+        ALTER TABLE topic_tags
+            MODIFY COLUMN tag_id INT NOT NULL,
+            ADD UNIQUE KEY uk_topic_tag (topic_id, tag_id),
+            ADD INDEX idx_tag_id (tag_id),
+            DROP INDEX idx_topic_tag,
+            DROP COLUMN tag_name,
+            ADD FOREIGN KEY (tag_id) REFERENCES tags(id)
+    """)
+    logger.info(f"标签已迁移到字典表: 新建标签 {created} 个, 关联 {linked} 行, "
+                f"删除重复 {duplicates} 行, 无法关联 {orphans} 行")
+    return True
+
+
+# 表 -> [(索引名, 索引定义)]，与database_init.sql保持一致
+COVERING_INDEXES = {
+    'hot_topics': [
+        ('idx_platform_active_rank', "INDEX idx_platform_active_rank (platform_id, is_active, `rank`)"),
+        ('idx_board', "INDEX idx_board (platform_id, category, is_active, `rank`)"),
+        ('idx_platform_seen', "INDEX idx_platform_seen (platform_id, last_seen_at, is_active)"),
+    ],
+    'collection_logs': [
+        ('idx_platform_created', "INDEX idx_platform_created (platform_id, created_at)"),
+        ('idx_created_at', "INDEX idx_created_at (created_at)"),
+    ],
+}
+# 被上面的组合索引覆盖的旧索引（最左前缀相同或不再被任何查询使用）
+REDUNDANT_INDEXES = {
+    'hot_topics': ['idx_platform_rank', 'idx_platform_active', 'idx_rank_change', 'idx_hash_id'],
+    'collection_logs': ['idx_platform_time'],
+}
+
+
+def migrate_covering_indexes(db: Optional[DatabaseManager] = None) -> bool:
+    """
+    为hot_topics和collection_logs建立按实际查询设计的组合索引，并删除被覆盖的旧索引
+
+    每张表的增删索引合并为一条ALTER TABLE，只重建一次；
+    新索引先于旧索引删除生效，platform_id外键始终有可用的索引。
+
+    Args:
+        db: 数据库管理器，默认使用全局单例
+
+    Returns:
+        是否有索引变化
+    """
+    db = db or get_db_manager()
+    changed = False
+    for table, indexes in COVERING_INDEXES.items():
+        clauses = [f"ADD {definition}" for name, definition in indexes if not _index_exists(db, table, name)]
+        dropped = [name for name in REDUNDANT_INDEXES[table] if _index_exists(db, table, name)]
+        clauses.extend(f"DROP INDEX {name}" for name in dropped)
+        if not clauses:
+            logger.info(f"表 {table} 的索引已是最新，无需迁移")
+            continue
+        db.execute_update(f"ALTER TABLE {table} {', '.join(clauses)}")
+        db.execute_query(f"ANALYZE TABLE {table}")  # 刷新统计信息，让优化器立即选用新索引
+        logger.info(f"表 {table} 索引已更新: {', '.join(clauses)}")
+        changed = True
+    return changed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db = get_db_manager()
+    if db.connect():
+        migrate_hash_id_to_binary(db)
+        migrate_tags_to_dictionary(db)
+        migrate_covering_indexes(db)
+        db.disconnect()
+    else:
+        print("数据库连接失败！")
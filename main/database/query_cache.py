@@ -0,0 +1,137 @@
+"""
+查询缓存模块 - 为热榜读取接口提供带TTL的LRU读缓存
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from config.platform_config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 依赖所有平台数据的缓存项使用该标记，任一平台失效时一并清除
+ALL_PLATFORMS = '*'
+
+
+class QueryCache:
+    """容量有限的LRU缓存，每个条目带过期时间，并按平台打标签以便定向失效"""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 120):
+        """
+        初始化查询缓存
+
+        Args:
+            max_size: 最大缓存条目数，超出后淘汰最久未使用的条目
+            ttl_seconds: 条目存活秒数
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, frozenset]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any, platforms: Iterable[str] = (ALL_PLATFORMS,),
+            ttl_seconds: Optional[float] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            platforms: 该条目依赖的平台代码，用于按平台失效
+            ttl_seconds: 覆盖默认的存活秒数
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, frozenset(platforms))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate_platform(self, platform_code: str) -> int:
+        """
+        使依赖指定平台的所有缓存条目失效
+
+        Returns:
+            失效的条目数
+        """
+        with self._lock:
+            stale_keys = [
+                key for key, (_, _, platforms) in self._entries.items()
+                if platform_code in platforms or ALL_PLATFORMS in platforms
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale_keys)
+
+        if stale_keys:
+            logger.debug(f"平台 {platform_code} 数据更新，失效缓存 {len(stale_keys)} 条")
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        """清空缓存（统计信息保留）"""
+        with self._lock:
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            包含命中/未命中次数、命中率和当前条目数的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# 单例模式
+_cache_instance = None
+
+
+def get_query_cache() -> QueryCache:
+    """
+    获取查询缓存实例（单例模式）
+
+    Returns:
+        查询缓存实例
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = QueryCache(
+            max_size=CACHE_CONFIG['max_size'],
+            ttl_seconds=CACHE_CONFIG['ttl_seconds']
+        )
+    return _cache_instance
@@ -0,0 +1,322 @@
+"""
+数据保留模块 - 迁出长期失效的话题并清理过期采集日志
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.platform_config import RETENTION_CONFIG
+from main.database.database_manager import DatabaseManager, get_db_manager
+from main.database.hash_cache import get_hash_cache
+
+logger = logging.getLogger(__name__)
+
+# 归档表结构（与database_init.sql保持一致，便于在已有库上按需创建）
+ARCHIVE_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS hot_topics_archive (
+        id BIGINT PRIMARY KEY,
+        platform_id INT NOT NULL,
+        title VARCHAR(500) NOT NULL,
+        `rank` INT NOT NULL,
+        heat_value INT,
+        url VARCHAR(1000),
+        hash_id BINARY(16) NOT NULL,
+        category VARCHAR(20),
+        first_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        rank_change INT DEFAULT 0,
+        is_active TINYINT(1) DEFAULT 0,
+        archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_platform_seen (platform_id, last_seen_at),
+        INDEX idx_hash_id (hash_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS topic_tags_archive (
+        id BIGINT PRIMARY KEY,
+        topic_id BIGINT NOT NULL,
+        tag_name VARCHAR(100) NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_topic_id (topic_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+]
+
+TOPIC_COLUMNS = (
+    "id, platform_id, title, `rank`, heat_value, url, hash_id, category, "
+    "first_seen_at, last_seen_at, created_at, updated_at, rank_change, is_active"
+)
+
+
+class RetentionEngine:
+    """按平台策略迁出失效话题（含标签），并清理过期采集日志"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化保留引擎
+
+        Args:
+            db: 数据库管理器，默认使用全局单例
+            config: 保留配置，默认使用RETENTION_CONFIG
+        """
+        self.db = db or get_db_manager()
+        self.config = config or RETENTION_CONFIG
+
+    def get_policy(self, platform_code: str) -> Dict[str, Any]:
+        """
+        获取平台的保留策略（平台配置覆盖默认配置）
+
+        Args:
+            platform_code: 平台代码
+
+        Returns:
+            策略字典，包含inactive_days和mode
+        """
+        policy = dict(self.config['default_policy'])
+        policy.update(self.config.get('platform_policies', {}).get(platform_code, {}))
+        return policy
+
+    def ensure_archive_tables(self) -> None:
+        """创建归档表（已存在则跳过）"""
+        for ddl in ARCHIVE_TABLES_DDL:
+            self.db.execute_update(ddl)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        执行一次完整的保留任务
+
+        Returns:
+            报告字典，包含各平台迁出行数、清理的日志行数和估算回收字节数
+        """
+        if not self.db.connection or not self.db.connection.is_connected():
+            self.db.connect()
+
+        row_sizes = self._get_avg_row_lengths(['hot_topics', 'topic_tags', 'collection_logs'])
+        report = {
+            'platforms': {},
+            'topics_removed': 0,
+            'tags_removed': 0,
+            'logs_removed': 0,
+            'bytes_reclaimed': 0,
+        }
+
+        platforms = self.db.get_all_platforms()
+        if any(self.get_policy(p['code'])['mode'] == 'archive' for p in platforms):
+            self.ensure_archive_tables()
+
+        for platform in platforms:
+            platform_report = self.purge_platform(platform)
+            report['platforms'][platform['code']] = platform_report
+            report['topics_removed'] += platform_report['topics']
+            report['tags_removed'] += platform_report['tags']
+
+        if report['topics_removed']:
+            # 迁出的话题可能仍在哈希缓存中（被保留策略设为极短天数时），清空以免按旧ID更新
+            get_hash_cache().clear()
+        report['logs_removed'] = self.purge_collection_logs()
+        report['bytes_reclaimed'] = (
+            report['topics_removed'] * row_sizes.get('hot_topics', 0)
+            + report['tags_removed'] * row_sizes.get('topic_tags', 0)
+            + report['logs_removed'] * row_sizes.get('collection_logs', 0)
+        )
+
+        logger.info(
+            "保留任务完成: 迁出话题 %d 条, 标签 %d 条, 清理日志 %d 条, 约回收 %d 字节",
+            report['topics_removed'], report['tags_removed'], report['logs_removed'], report['bytes_reclaimed']
+        )
+        return report
+
+    def purge_platform(self, platform: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按策略分批迁出单个平台的失效话题
+
+        Args:
+            platform: 平台记录（需包含id和code）
+
+        Returns:
+            该平台的迁出统计
+        """
+        policy = self.get_policy(platform['code'])
+        result = {'mode': policy['mode'], 'topics': 0, 'tags': 0, 'file': None}
+        if policy.get('inactive_days') is None:
+            return result
+
+        cutoff = datetime.now() - timedelta(days=policy['inactive_days'])
+        export_file = None
+        try:
+            while True:
+                topic_ids = self._fetch_expired_ids(platform['id'], cutoff)
+                if not topic_ids:
+                    break
+
+                if policy['mode'] == 'export':
+                    if export_file is None:
+                        result['file'] = self._export_path(platform['code'])
+                        export_file = gzip.open(result['file'], 'at', encoding='utf-8')
+                    topics, tags = self._export_batch(topic_ids, export_file)
+                else:
+                    topics, tags = self._archive_batch(topic_ids)
+
+                result['topics'] += topics
+                result['tags'] += tags
+                if len(topic_ids) < self.config['batch_size']:
+                    break
+                time.sleep(self.config['batch_pause_seconds'])
+        finally:
+            if export_file is not None:
+                export_file.close()
+
+        if result['topics']:
+            logger.info(
+                "平台 %s 迁出失效话题 %d 条（%s），标签 %d 条",
+                platform['code'], result['topics'], policy['mode'], result['tags']
+            )
+        return result
+
+    def purge_collection_logs(self) -> int:
+        """
+        分批删除超过保留天数的采集日志
+
+        Returns:
+            删除的日志行数
+        """
+        days = self.config.get('collection_log_days')
+        if days is None:
+            return 0
+
+        cutoff = datetime.now() - timedelta(days=days)
+        batch_size = self.config['batch_size']
+        removed = 0
+        while True:
+            # 按主键顺序删除：旧日志集中在主键前部，无需created_at索引也能快速定位
+            affected = self.db.execute_update(
+                "DELETE FROM collection_logs WHERE created_at < %s ORDER BY id LIMIT %s",
+                (cutoff, batch_size)
+            )
+            removed += affected
+            if affected < batch_size:
+                break
+            time.sleep(self.config['batch_pause_seconds'])
+        return removed
+
+    def _fetch_expired_ids(self, platform_id: int, cutoff: datetime) -> List[int]:
+        """获取一批失效且超期的话题ID"""
+        rows = self.db.execute_query("""
+            SELECT id FROM hot_topics
+            WHERE platform_id = %s AND is_active = 0 AND last_seen_at < %s
+            ORDER BY id
+            LIMIT %s
+        """, (platform_id, cutoff, self.config['batch_size']))
+        return [row['id'] for row in rows]
+
+    def _archive_batch(self, topic_ids: List[int]) -> Tuple[int, int]:
+        """在单个小事务内把一批话题及其标签迁入归档表"""
+        placeholders = ', '.join(['%s'] * len(topic_ids))
+        cursor = self.db.connection.cursor()
+        try:
+            cursor.execute(f"""
+                INSERT IGNORE INTO topic_tags_archive (id, topic_id, tag_name, created_at)
+                SELECT tt.id, tt.topic_id, tg.name, tt.created_at FROM topic_tags tt
+                JOIN tags tg ON tg.id = tt.tag_id
+                WHERE tt.topic_id IN ({placeholders})
+            """, topic_ids)
+            cursor.execute(f"""
+                INSERT IGNORE INTO hot_topics_archive ({TOPIC_COLUMNS})
+                SELECT {TOPIC_COLUMNS} FROM hot_topics
+                WHERE id IN ({placeholders})
+            """, topic_ids)
+            tags, topics = self._delete_live_rows(cursor, placeholders, topic_ids)
+            self.db.connection.commit()
+            return topics, tags
+        except Exception as e:
+            logger.error("归档话题批次失败: %s", e)
+            self.db.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _export_batch(self, topic_ids: List[int], export_file) -> Tuple[int, int]:
+        """把一批话题及其标签写入压缩文件后从主表删除"""
+        placeholders = ', '.join(['%s'] * len(topic_ids))
+        topics = self.db.execute_query(
+            f"SELECT {TOPIC_COLUMNS} FROM hot_topics WHERE id IN ({placeholders})", tuple(topic_ids)
+        )
+        tag_rows = self.db.execute_query(
+            f"SELECT tt.topic_id, tg.name AS tag_name FROM topic_tags tt JOIN tags tg ON tg.id = tt.tag_id "
+            f"WHERE tt.topic_id IN ({placeholders}) ORDER BY tt.id", tuple(topic_ids)
+        )
+        tags_by_topic: Dict[int, List[str]] = {}
+        for row in tag_rows:
+            tags_by_topic.setdefault(row['topic_id'], []).append(row['tag_name'])
+
+        for topic in topics:
+            topic['tags'] = tags_by_topic.get(topic['id'], [])
+            export_file.write(json.dumps(topic, ensure_ascii=False, default=str) + '\n')
+        # 先落盘再删除，避免进程中断时数据丢失
+        export_file.flush()
+
+        cursor = self.db.connection.cursor()
+        try:
+            tags, removed = self._delete_live_rows(cursor, placeholders, topic_ids)
+            self.db.connection.commit()
+            return removed, tags
+        except Exception as e:
+            logger.error("删除已导出话题失败: %s", e)
+            self.db.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _delete_live_rows(cursor, placeholders: str, topic_ids: List[int]) -> Tuple[int, int]:
+        """按主键删除主表中的标签和话题，返回(标签行数, 话题行数)"""
+        cursor.execute(f"DELETE FROM topic_tags WHERE topic_id IN ({placeholders})", topic_ids)
+        tags = cursor.rowcount
+        cursor.execute(f"DELETE FROM hot_topics WHERE id IN ({placeholders})", topic_ids)
+        return tags, cursor.rowcount
+
+    def _export_path(self, platform_code: str) -> str:
+        """生成导出文件路径"""
+        export_dir = self.config['export_dir']
+        os.makedirs(export_dir, exist_ok=True)
+        filename = f"{platform_code}_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl.gz"
+        return os.path.join(export_dir, filename)
+
+    def _get_avg_row_lengths(self, tables: List[str]) -> Dict[str, int]:
+        """从information_schema读取表的平均行长度，用于估算回收空间"""
+        placeholders = ', '.join(['%s'] * len(tables))
+        rows = self.db.execute_query(f"""
+            SELECT table_name AS table_name, avg_row_length AS avg_row_length
+            FROM information_schema.TABLES
+            WHERE table_schema = DATABASE() AND table_name IN ({placeholders})
+        """, tuple(tables))
+        return {row['table_name']: int(row['avg_row_length'] or 0) for row in rows}
+
+
+def run_retention() -> Dict[str, Any]:
+    """
+    使用默认配置执行一次保留任务
+
+    Returns:
+        保留任务报告
+    """
+    return RetentionEngine().run()
+
+
+if __name__ == "__main__":
+    db = get_db_manager()
+    if db.connect():
+        report = run_retention()
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        db.disconnect()
+    else:
+        print("数据库连接失败！")
@@ -0,0 +1,342 @@
+"""
+慢查询记录模块 - 统计每条SQL的耗时，超过阈值时记录语句形态与执行计划
+
+DatabaseManager的execute_query/execute_update/execute_many每执行一条语句都会调用observe：
+  - 按指纹（归一化后的SQL）聚合次数、总耗时、最大耗时，并保留最近的耗时样本用于计算p50/p95；
+  - 超过阈值时记录归一化SQL、参数形态、行数、调用方法，并对该指纹执行一次EXPLAIN（按间隔限频）。
+
+用法:
+    python -m main.database.slow_query                   # 查看最近一次导出的统计
+    python -m main.database.slow_query --sort p95 --top 10
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from config.platform_config import SLOW_QUERY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 归一化规则：字符串/数字字面量替换为?，IN列表与多行VALUES折叠为一组，使不同批量大小的同一语句共用指纹
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w%])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+# 可以EXPLAIN的语句
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+
+def normalize_sql(query: str) -> str:
+    """
+    将SQL归一化为指纹文本
+
+    Args:
+        query: 原始SQL语句
+
+    Returns:
+        去除字面量、折叠IN列表和多行VALUES后的单行SQL
+    """
+    sql = _WHITESPACE.sub(' ', query).strip()
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (%s, ...)', sql)
+    sql = _VALUES_ROWS.sub(r'\1, ...', sql)
+    return sql
+
+
+def param_shape(params: Optional[Sequence[Any]]) -> List[str]:
+    """
+    参数形态：只记录类型（序列附带长度），不记录参数值
+
+    Args:
+        params: 查询参数
+
+    Returns:
+        类型名列表，如 ['str', 'int', 'datetime']
+    """
+    if not params:
+        return []
+    shape = []
+    for value in params:
+        if isinstance(value, (list, tuple, set)):
+            shape.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            shape.append(type(value).__name__)
+    return shape
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _caller() -> str:
+    """调用DatabaseManager的业务方法名（跳过本模块与execute_*包装层）"""
+    frame = sys._getframe(2)
+    while frame is not None and (frame.f_code.co_filename == __file__
+                                 or frame.f_code.co_name.startswith('execute_')):
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    return f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+class _FingerprintStats:
+    """单个指纹的聚合统计"""
+
+    __slots__ = ('sql', 'count', 'total', 'max', 'rows', 'slow_count', 'samples',
+                 'callers', 'explain', 'explained_at')
+
+    def __init__(self, sql: str, sample_size: int):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow_count = 0
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+        self.callers: Dict[str, int] = {}
+        self.explain: List[Dict[str, Any]] = []
+        self.explained_at = 0.0
+
+
+class SlowQueryLog:
+    """按指纹聚合SQL耗时，并记录超过阈值的慢查询"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化慢查询记录器
+
+        Args:
+            config: 配置，默认使用SLOW_QUERY_CONFIG
+        """
+        self.config = {**SLOW_QUERY_CONFIG, **(config or {})}
+        self.enabled = self.config['enabled']
+        self.threshold = self.config['threshold_ms'] / 1000
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self._fingerprints: Dict[str, str] = {}  # 原始SQL -> 指纹，语句文本基本固定，避免重复正则处理
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=self.config['max_entries'])
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, query: str) -> str:
+        fingerprint = self._fingerprints.get(query)
+        if fingerprint is None:
+            fingerprint = normalize_sql(query)
+            if len(self._fingerprints) < 10000:  # 拼接了字面量的语句不无限占用内存
+                self._fingerprints[query] = fingerprint
+        return fingerprint
+
+    def observe(self, query: str, params: Optional[Sequence[Any]], elapsed: float, rows: int,
+                explain: Optional[Callable[[str, Any], List[Dict[str, Any]]]] = None) -> None:
+        """
+        记录一次语句执行
+
+        Args:
+            query: SQL语句
+            params: 查询参数（仅记录形态）
+            elapsed: 耗时（秒）
+            rows: 返回或影响的行数
+            explain: 执行EXPLAIN的回调 (query, params) -> 执行计划行，超过阈值时按需调用
+        """
+        if not self.enabled:
+            return
+        fingerprint = self._fingerprint(query)
+        slow = elapsed >= self.threshold
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = _FingerprintStats(fingerprint, self.config['samples_per_fingerprint'])
+            stats.count += 1
+            stats.total += elapsed
+            stats.rows += rows
+            stats.samples.append(elapsed)
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if not slow:
+                return
+            stats.slow_count += 1
+            caller = _caller()
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+            now = time.monotonic()
+            need_explain = (explain is not None and self.config['explain']
+                            and fingerprint.split(' ', 1)[0].upper() in _EXPLAINABLE
+                            and (not stats.explained_at
+                                 or now - stats.explained_at >= self.config['explain_interval_seconds']))
+            if need_explain:
+                stats.explained_at = now
+
+        # EXPLAIN在锁外执行，同一指纹按间隔限频
+        if need_explain:
+            plan = explain(query, params)
+            with self._lock:
+                stats.explain = plan
+
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'sql': fingerprint,
+            'params': param_shape(params),
+            'rows': rows,
+            'caller': caller,
+        }
+        with self._lock:
+            self._recent.append(entry)
+        logger.warning("慢查询 %sms，行数 %s，来自 %s: %s", entry['elapsed_ms'], rows, caller, fingerprint[:200])
+
+    def summary(self, sort: str = 'total', top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按指纹汇总的耗时统计
+
+        Args:
+            sort: 排序字段 total/p95/max/count
+            top: 只返回前N条
+
+        Returns:
+            [{'fingerprint', 'sql', 'count', 'slow_count', 'total_ms', 'p50_ms', 'p95_ms', 'max_ms',
+              'avg_rows', 'callers', 'explain'}]
+        """
+        with self._lock:
+            snapshot = [(stats, sorted(stats.samples), dict(stats.callers), list(stats.explain))
+                        for stats in self._stats.values()]
+        result = []
+        for stats, samples, callers, plan in snapshot:
+            result.append({
+                'fingerprint': hashlib.blake2b(stats.sql.encode('utf-8'), digest_size=6).hexdigest(),
+                'sql': stats.sql,
+                'count': stats.count,
+                'slow_count': stats.slow_count,
+                'total_ms': round(stats.total * 1000, 2),
+                'p50_ms': round(_percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(_percentile(samples, 95) * 1000, 2),
+                'max_ms': round(stats.max * 1000, 2),
+                'avg_rows': round(stats.rows / stats.count, 1) if stats.count else 0,
+                'callers': callers,
+                'explain': plan,
+            })
+        key = {'total': 'total_ms', 'p95': 'p95_ms', 'max': 'max_ms', 'count': 'count'}.get(sort, 'total_ms')
+        result.sort(key=lambda item: item[key], reverse=True)
+        return result[:top] if top else result
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """最近记录的慢查询（按时间顺序）"""
+        with self._lock:
+            return list(self._recent)
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        将统计与最近的慢查询导出为JSON文件
+
+        Args:
+            path: 导出路径，默认使用配置中的dump_path
+
+        Returns:
+            导出路径，未开启或写入失败时返回None
+        """
+        if not self.enabled:
+            return None
+        path = path or self.config['dump_path']
+        data = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'threshold_ms': self.config['threshold_ms'],
+            'fingerprints': self.summary(),
+            'recent': self.recent(),
+        }
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("导出慢查询统计失败: %s", e)
+            return None
+        return path
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+
+def format_report(fingerprints: List[Dict[str, Any]], top: int = 20) -> str:
+    """
+    将汇总统计格式化为文本报告
+
+    Args:
+        fingerprints: summary()或导出文件中的fingerprints
+        top: 列出的指纹数
+
+    Returns:
+        文本报告
+    """
+    lines = []
+    for item in fingerprints[:top]:
+        lines.append(f"[{item['fingerprint']}] 次数 {item['count']}（慢 {item['slow_count']}），"
+                     f"总计 {item['total_ms']:.1f}ms，p50 {item['p50_ms']:.1f}ms，"
+                     f"p95 {item['p95_ms']:.1f}ms，最大 {item['max_ms']:.1f}ms，平均行数 {item['avg_rows']}")
+        lines.append(f"    {item['sql']}")
+        for caller, count in sorted(item['callers'].items(), key=lambda kv: -kv[1]):
+            lines.append(f"    调用方: {caller} × {count}")
+        for row in item['explain']:
+            lines.append(f"    EXPLAIN: table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                         f"rows={row.get('rows')} Extra={row.get('Extra')}")
+    return '\n'.join(lines)
+
+
+# 单例模式
+_slow_query_log = None
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """
+    获取全局慢查询记录器实例（单例模式）
+
+    Returns:
+        慢查询记录器实例
+    """
+    global _slow_query_log
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog()
+    return _slow_query_log
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="查看导出的慢查询统计")
+    parser.add_argument('path', nargs='?', default=SLOW_QUERY_CONFIG['dump_path'], help="导出文件路径")
+    parser.add_argument('--sort', choices=['total', 'p95', 'max', 'count'], default='total', help="排序字段")
+    parser.add_argument('--top', type=int, default=20, help="列出的指纹数")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"无法读取慢查询统计 {args.path}: {e}")
+        return 1
+
+    key = {'total': 'total_ms', 'p95': 'p95_ms', 'max': 'max_ms', 'count': 'count'}[args.sort]
+    fingerprints = sorted(data['fingerprints'], key=lambda item: item[key], reverse=True)
+    print(f"导出时间 {data['generated_at']}，慢查询阈值 {data['threshold_ms']}ms，共 {len(fingerprints)} 个指纹")
+    print(format_report(fingerprints, args.top))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
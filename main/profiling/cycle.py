@@ -0,0 +1,262 @@
+"""
+采集周期CPU分析模块 - 不停止服务，对接下来的N个采集周期做CPU分析
+
+触发方式（任一即可）：
+  - 配置CYCLE_PROFILE_CONFIG['cycles'] > 0：服务启动后立即分析前N个周期；
+  - 信号（默认SIGUSR2）：kill -USR2 <pid>，分析接下来的trigger_cycles个周期；
+  - 标记文件（默认logs/profile/profile.flag）：文件存在时分析接下来的N个周期，
+    N取文件内容（为空则用trigger_cycles），读取后删除文件。
+
+每个被分析的周期在output_dir下输出：
+  - <时间>_cycleN.collapsed：采样线程按sample_interval_ms采集的调用栈，折叠格式（frame;frame;... 次数），
+    可直接用flamegraph.pl或speedscope生成火焰图，栈底为所在的 平台/分类 标签；
+  - <时间>_cycleN.prof：cProfile统计（cprofile为True时），可用pstats或snakeviz查看；
+  - <时间>_cycleN.txt：各平台/分类的采样耗时和cProfile累计耗时排名。
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.platform_config import CYCLE_PROFILE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 不在任何平台/分类范围内时的栈底标签
+NO_SPAN = '-'
+
+
+def _frame_name(code) -> str:
+    return f"{getattr(code, 'co_qualname', code.co_name)}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """后台线程定时采集目标线程的调用栈，按折叠栈计数"""
+
+    def __init__(self, thread_id: int, interval: float, span_getter):
+        """
+        初始化采样器
+
+        Args:
+            thread_id: 被采样线程的ident
+            interval: 采样间隔（秒）
+            span_getter: 返回当前平台/分类标签的函数，作为栈底
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self._span_getter = span_getter
+        self.stacks: Counter = Counter()
+        self.span_samples: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cycle-profiler-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        names: Dict[Any, str] = {}  # 代码对象 -> 帧名，避免每次采样重复格式化
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code)
+                stack.append(name)
+                frame = frame.f_back
+            span = self._span_getter()
+            stack.append(span)
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+            self.span_samples[span] += 1
+            self.samples += 1
+
+
+class CycleProfiler:
+    """按需分析接下来若干个采集周期的CPU耗时"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化周期分析器
+
+        Args:
+            config: 分析配置，默认使用CYCLE_PROFILE_CONFIG
+        """
+        self.config = {**CYCLE_PROFILE_CONFIG, **(config or {})}
+        self.pending = self.config['cycles']   # 尚待分析的周期数
+        self.cycles_profiled = 0
+        self._active = False
+        self._span = NO_SPAN
+        self._signal_requested = False
+
+    def install(self) -> None:
+        """注册触发信号（需在主线程调用）"""
+        signum = getattr(signal, self.config.get('signal') or '', None)
+        if signum is None:
+            logger.info("当前平台不支持信号 %s，可通过标记文件 %s 触发周期分析",
+                        self.config.get('signal'), self.config['flag_file'])
+            return
+        try:
+            # 信号处理函数只做标记，下个周期开始时再生效
+            signal.signal(signum, self._request_by_signal)
+        except ValueError:
+            logger.warning("无法在非主线程注册周期分析信号")
+
+    def _request_by_signal(self, signum, frame) -> None:
+        self._signal_requested = True
+
+    def request(self, cycles: Optional[int] = None) -> None:
+        """请求分析接下来的cycles个周期（默认trigger_cycles）"""
+        self.pending = max(self.pending, cycles or self.config['trigger_cycles'])
+        logger.info("将分析接下来的 %d 个采集周期", self.pending)
+
+    def _check_triggers(self) -> None:
+        if self._signal_requested:
+            self._signal_requested = False
+            self.request()
+        flag_file = self.config['flag_file']
+        if flag_file and os.path.exists(flag_file):
+            try:
+                with open(flag_file, encoding='utf-8') as f:
+                    content = f.read().strip()
+                os.remove(flag_file)
+            except OSError as e:
+                logger.error("读取周期分析标记文件失败: %s", e)
+                return
+            self.request(int(content) if content.isdigit() else None)
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """包住一次采集周期；有待分析的周期时对本周期做分析并输出结果文件"""
+        self._check_triggers()
+        if self._active or self.pending <= 0:
+            yield
+            return
+
+        import cProfile  # 仅在分析时导入
+
+        self.pending -= 1
+        self.cycles_profiled += 1
+        sampler = StackSampler(threading.get_ident(), self.config['sample_interval_ms'] / 1000,
+                               lambda: self._span)
+        profile = cProfile.Profile() if self.config['cprofile'] else None
+        started_at = datetime.now()
+        start = time.perf_counter()
+        self._active = True
+        sampler.start()
+        if profile:
+            try:
+                profile.enable()
+            except ValueError:  # 已有其他分析工具（如调试器）占用，只做采样
+                logger.warning("cProfile无法启用，本周期只做调用栈采样")
+                profile = None
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            sampler.stop()
+            self._active = False
+            self._span = NO_SPAN
+            self._write(started_at, time.perf_counter() - start, sampler, profile)
+
+    @contextmanager
+    def span(self, platform_code: str, category: Optional[str] = None) -> Iterator[None]:
+        """标记当前执行的平台/分类，采样到的调用栈以此为栈底；未在分析时几乎无开销"""
+        if not self._active:
+            yield
+            return
+        previous = self._span
+        self._span = f"{platform_code}/{category}" if category else platform_code
+        try:
+            yield
+        finally:
+            self._span = previous
+
+    def _write(self, started_at: datetime, elapsed: float, sampler: StackSampler, profile) -> List[str]:
+        """输出本周期的折叠栈、cProfile统计和文本摘要，返回写入的文件路径"""
+        output_dir = self.config['output_dir']
+        base = os.path.join(output_dir, f"{started_at.strftime('%Y%m%d_%H%M%S')}_cycle{self.cycles_profiled}")
+        paths = []
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(f"{base}.collapsed")
+            if profile is not None:
+                profile.dump_stats(f"{base}.prof")
+                paths.append(f"{base}.prof")
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                f.write(self._summary(started_at, elapsed, sampler, profile))
+            paths.append(f"{base}.txt")
+        except OSError as e:
+            logger.error("写入周期分析结果失败: %s", e)
+            return paths
+        logger.info("采集周期分析完成（耗时 %.2f秒，采样 %d 次，剩余 %d 个周期）: %s",
+                    elapsed, sampler.samples, self.pending, ', '.join(paths))
+        return paths
+
+    def _summary(self, started_at: datetime, elapsed: float, sampler: StackSampler, profile) -> str:
+        interval = self.config['sample_interval_ms'] / 1000
+        lines = [
+            f"采集周期分析 {started_at.isoformat(timespec='seconds')}，耗时 {elapsed:.2f}秒，"
+            f"采样 {sampler.samples} 次（间隔 {self.config['sample_interval_ms']}ms）",
+            "",
+            "各平台/分类采样耗时:",
+        ]
+        for span, count in self._span_totals(sampler.span_samples):
+            lines.append(f"  {count * interval:8.2f}秒  {count / max(sampler.samples, 1):6.1%}  {span}")
+        if profile is not None:
+            import io
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(self.config['top_n'])
+            lines.extend(["", "cProfile累计耗时排名:", stream.getvalue()])
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _span_totals(span_samples: Counter) -> List[Tuple[str, int]]:
+        """平台级标签的耗时包含其下各分类"""
+        totals: Counter = Counter(span_samples)
+        for span, count in span_samples.items():
+            if '/' in span:
+                totals[span.split('/', 1)[0]] += count
+        return sorted(totals.items(), key=lambda item: item[0])
+
+
+# 单例模式
+_cycle_profiler = None
+
+
+def get_cycle_profiler() -> CycleProfiler:
+    """
+    获取全局周期分析器实例（单例模式）
+
+    Returns:
+        周期分析器实例
+    """
+    global _cycle_profiler
+    if _cycle_profiler is None:
+        _cycle_profiler = CycleProfiler()
+    return _cycle_profiler
@@ -0,0 +1,221 @@
+"""
+内存分析模块 - 长期运行的定时采集服务的可选内存分析
+
+开启后用tracemalloc记录内存分配，每N个采集周期取一次快照，与上一快照和基线快照按分配位置对比：
+  - 平均每周期增长超过阈值时输出告警，列出增长最多的位置；
+  - 每次快照后把报告写入 report_dir/latest.txt；
+  - 收到配置的信号（默认SIGUSR1）时在主循环中立即生成一份报告。
+
+用法（runtime_execute在MEMORY_PROFILE_CONFIG['enabled']为True时自动接入）:
+    profiler = get_memory_profiler()
+    profiler.start()
+    ...每个采集周期结束后: profiler.on_cycle()
+    ...主循环中: profiler.poll()
+    kill -USR1 <pid>   # 立即输出报告
+"""
+
+import logging
+import os
+import signal
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.platform_config import MEMORY_PROFILE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 分析工具自身和导入机制的分配不计入结果
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+class MemoryProfiler:
+    """按采集周期对比tracemalloc快照的内存分析器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化内存分析器
+
+        Args:
+            config: 分析配置，默认使用MEMORY_PROFILE_CONFIG
+        """
+        self.config = {**MEMORY_PROFILE_CONFIG, **(config or {})}
+        self.cycle = 0
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._previous_cycle = 0
+        self._report_requested = False
+        self._started_tracing = False
+
+    @property
+    def running(self) -> bool:
+        return self._baseline is not None
+
+    def start(self) -> None:
+        """开始记录内存分配并取基线快照，同时注册报告信号"""
+        if self.running:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.config['frames'])
+            self._started_tracing = True
+        self._baseline = self._previous = self._take_snapshot()
+        self._previous_cycle = self.cycle
+        self._install_signal()
+        logger.info("内存分析已开启: 每 %d 个周期取一次快照，调用栈深度 %d",
+                    self.config['snapshot_every_cycles'], self.config['frames'])
+
+    def stop(self) -> None:
+        """停止记录并释放快照"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = self._previous = None
+
+    def _install_signal(self) -> None:
+        signum = getattr(signal, self.config.get('signal') or '', None)
+        if signum is None:
+            logger.info("当前平台不支持信号 %s，仅按周期输出内存报告", self.config.get('signal'))
+            return
+        try:
+            # 信号处理函数只做标记，报告在主循环的poll中生成，避免在任意位置打断时加锁写日志
+            signal.signal(signum, self._request_report)
+        except ValueError:  # 非主线程不能注册信号
+            logger.warning("无法在非主线程注册内存报告信号")
+
+    def _request_report(self, signum, frame) -> None:
+        self._report_requested = True
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def on_cycle(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        一个采集周期结束时调用，每snapshot_every_cycles个周期对比一次快照
+
+        Returns:
+            本次对比的增长位置列表，未到对比周期时返回None
+        """
+        if not self.running:
+            return None
+        self.cycle += 1
+        if self.cycle % self.config['snapshot_every_cycles']:
+            return None
+
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self._previous, 'lineno')
+        cycles = self.cycle - self._previous_cycle
+        growth = sum(stat.size_diff for stat in stats)
+        per_cycle = growth / cycles if cycles else growth
+        top = self._top(stats)
+        self._previous, self._previous_cycle = snapshot, self.cycle
+
+        if per_cycle > self.config['growth_warn_bytes']:
+            logger.warning("内存持续增长: 最近 %d 个周期增长 %.1f KB（平均每周期 %.1f KB），增长最多的位置:\n%s",
+                           cycles, growth / 1024, per_cycle / 1024, self._format(top[:5]))
+        else:
+            logger.info("内存快照: 最近 %d 个周期增长 %.1f KB", cycles, growth / 1024)
+        self.write_report()
+        return top
+
+    def poll(self) -> Optional[str]:
+        """主循环中定期调用：收到报告信号后生成报告，返回报告路径"""
+        if not self._report_requested:
+            return None
+        self._report_requested = False
+        return self.write_report(datetime.now().strftime('memory_%Y%m%d_%H%M%S.txt'))
+
+    def _top(self, stats: List[tracemalloc.StatisticDiff]) -> List[Dict[str, Any]]:
+        top = []
+        for stat in stats[:self.config['top_n']]:
+            frame = stat.traceback[0]
+            top.append({
+                'site': f"{frame.filename}:{frame.lineno}",
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size': stat.size,
+                'traceback': stat.traceback.format() if len(stat.traceback) > 1 else [],
+            })
+        return top
+
+    @staticmethod
+    def _format(top: List[Dict[str, Any]]) -> str:
+        lines = []
+        for item in top:
+            lines.append(f"  {item['size_diff'] / 1024:+10.1f} KB {item['count_diff']:+8d} 个  "
+                         f"(当前 {item['size'] / 1024:.1f} KB)  {item['site']}")
+            lines.extend(f"        {line}" for line in item['traceback'])
+        return '\n'.join(lines)
+
+    def top_growth(self, since: str = 'baseline') -> List[Dict[str, Any]]:
+        """
+        当前内存与基线（或上一快照）相比增长最多的分配位置
+
+        Args:
+            since: 'baseline' 或 'previous'
+
+        Returns:
+            [{'site', 'size_diff', 'count_diff', 'size', 'traceback'}]，按增长量降序
+        """
+        if not self.running:
+            return []
+        reference = self._baseline if since == 'baseline' else self._previous
+        return self._top(self._take_snapshot().compare_to(reference, 'lineno'))
+
+    def report(self) -> str:
+        """生成文本报告：tracemalloc统计的当前/峰值内存，及相对基线和上一快照增长最多的位置"""
+        current, peak = tracemalloc.get_traced_memory()
+        return '\n'.join([
+            f"内存分析报告 {datetime.now().isoformat(timespec='seconds')}，第 {self.cycle} 个采集周期",
+            f"已跟踪内存: 当前 {current / 1024 / 1024:.2f} MB，峰值 {peak / 1024 / 1024:.2f} MB",
+            "",
+            "相对基线增长最多的位置:",
+            self._format(self.top_growth('baseline')),
+            "",
+            f"相对上一快照（第 {self._previous_cycle} 个周期）增长最多的位置:",
+            self._format(self.top_growth('previous')),
+        ])
+
+    def write_report(self, filename: str = 'latest.txt') -> Optional[str]:
+        """
+        把报告写入report_dir
+
+        Returns:
+            报告文件路径，未开启或写入失败时返回None
+        """
+        if not self.running:
+            return None
+        start = time.perf_counter()
+        path = os.path.join(self.config['report_dir'], filename)
+        try:
+            os.makedirs(self.config['report_dir'], exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.report() + '\n')
+        except OSError as e:
+            logger.error("写入内存报告失败: %s", e)
+            return None
+        logger.info("内存报告已写入 %s（耗时 %.2f秒）", path, time.perf_counter() - start)
+        return path
+
+
+# 单例模式
+_memory_profiler = None
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """
+    获取全局内存分析器实例（单例模式）
+
+    Returns:
+        内存分析器实例
+    """
+    global _memory_profiler
+    if _memory_profiler is None:
+        _memory_profiler = MemoryProfiler()
+    return _memory_profiler
@@ -2,12 +2,21 @@ import random
 import time
 import logging
 import requests
-from requests.exceptions import RequestException
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from requests.exceptions import HTTPError, RequestException
 from typing import Dict, Optional
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
+
+from config.platform_config import FETCH_CONFIG
+from main.scraper import json_codec
+from main.scraper.rate_limiter import RetryBudget, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# 需要退避后重试的状态码（会读取Retry-After）
+THROTTLE_STATUS_CODES = (429, 503)
+
 class ApiFetcher:
     def __init__(self, session: requests.Session, base_url: str):
         self.session = session
@@ -15,6 +24,9 @@ class ApiFetcher:
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
         ]
+        self.config = FETCH_CONFIG
+        self.rate_limiter = get_rate_limiter()
+        self.retry_budget = RetryBudget(self.config['retry_budget_per_cycle'])
     
     def update_headers(self):
         user_agent = random.choice(self.user_agents)
@@ -24,16 +36,81 @@ class ApiFetcher:
             'Referer': f'{self.base_url}/',
         })
     
-    def fetch_data(self, url: str, params: Dict, max_retries: int = 0) -> Optional[Dict]:
+    def fetch_data(self, url: str, params: Dict, max_retries: Optional[int] = None) -> Optional[Dict]:
+        if max_retries is None:
+            max_retries = self.config['max_retries']
+        host = urlparse(url).netloc
         retries = 0
-        while retries <= max_retries:
+        while True:
+            retry_after = None
+            self.rate_limiter.acquire(host)
             try:
                 self.update_headers()
-                response = self.session.get(url, params=params, timeout=10)
+                response = self.session.get(url, params=params, timeout=self.config['timeout'])
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    retry_after = self.parse_retry_after(response.headers.get('Retry-After'))
                 response.raise_for_status()
-                return response.json()
+                # 直接解码原始字节，避免先转换为str
+                return json_codec.loads(response.content)
+            except HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                logger.warning("API请求失败 (%d/%d): %s", retries + 1, max_retries + 1, e)
+                # 除限流外的4xx属于请求本身的问题，重试无意义
+                if status is not None and 400 <= status < 500 and status not in THROTTLE_STATUS_CODES:
+                    return None
             except (RequestException, ValueError) as e:
-                logger.warning(f"API请求失败 ({retries+1}/{max_retries+1}): {e}")
-                retries += 1
-                time.sleep(1 * retries)
-        return None
+                logger.warning("API请求失败 (%d/%d): %s", retries + 1, max_retries + 1, e)
+            
+            if retries >= max_retries:
+                return None
+            delay = self.backoff_delay(retries, retry_after)
+            if delay is None:
+                logger.warning("服务端要求等待 %.0f 秒，超过退避上限，放弃重试", retry_after)
+                return None
+            if not self.retry_budget.try_spend():
+                logger.warning("本周期重试额度(%d)已用尽，放弃重试", self.retry_budget.limit)
+                return None
+            retries += 1
+            time.sleep(delay)
+    
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        计算第attempt次重试前的等待时间：优先遵循Retry-After，否则为带全抖动的指数退避
+        
+        Returns:
+            等待秒数；Retry-After超过退避上限时返回None表示不再重试
+        """
+        max_delay = self.config['backoff_max_seconds']
+        if retry_after is not None:
+            if retry_after > max_delay:
+                return None
+            # 在服务端给出的时间基础上加少量抖动，避免多个进程同时醒来
+            return retry_after + random.uniform(0, self.config['backoff_base_seconds'])
+        return random.uniform(0, min(max_delay, self.config['backoff_base_seconds'] * (2 ** attempt)))
+    
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """解析Retry-After头（秒数或HTTP日期）"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    
+    def get_stats(self) -> Dict:
+        """获取限流等待与重试额度统计"""
+        return {
+            'rate_limiter': self.rate_limiter.get_stats(),
+            'retry_budget': {
+                'limit': self.retry_budget.limit,
+                'used': self.retry_budget.used,
+                'exhausted': self.retry_budget.exhausted,
+            },
+        }
@@ -0,0 +1,409 @@
+"""
+变更推送模块 - 将话题新增、排名变化和掉榜事件写入本地分段日志，并推送给进程内订阅者
+
+每个事件带有单调递增的偏移量(offset)：
+  - 进程内订阅者通过subscribe注册回调；
+  - 其他进程通过FeedReader按偏移量读取或持续跟随日志，断开后从上次的偏移量继续。
+
+采集线程只把事件放入有界队列（满时丢弃并计数），写文件和回调都在后台线程完成；
+全局实例在进程正常退出前写完队列中剩余的事件。
+多个工作进程可以共用同一个日志目录：每批追加都持有目录下的文件锁，并在锁内从日志末尾确定偏移量，
+偏移量在所有进程间连续且不重复；写入中途崩溃留下的不完整行在下次追加前截掉。
+
+用法（跟随事件流）:
+    python -m main.scraper.change_feed --from-offset 0 --follow
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，只支持单个进程写入同一日志目录
+    fcntl = None
+
+from config.platform_config import FEED_CONFIG
+from main.scraper.snapshot_diff import ENTERED, EXITED, MOVED, UNCHANGED, BoardDiff
+
+logger = logging.getLogger(__name__)
+
+# 榜单比对事件 -> 推送事件类型
+EVENT_TYPES = {
+    ENTERED: 'topic_inserted',
+    MOVED: 'rank_changed',
+    UNCHANGED: 'heat_changed',
+    EXITED: 'topic_deactivated',
+}
+
+SEGMENT_SUFFIX = '.jsonl'
+LOCK_FILE = '.lock'
+
+# 从分段末尾向前查找最后一个完整事件时每次读取的字节数
+_TAIL_BLOCK = 64 * 1024
+
+_STOP = object()
+
+Subscriber = Callable[[Dict[str, Any]], None]
+
+
+def _segment_name(base_offset: int) -> str:
+    return f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+
+def _list_segments(log_dir: str) -> List[int]:
+    """按起始偏移量升序列出分段"""
+    if not os.path.isdir(log_dir):
+        return []
+    return sorted(
+        int(name[:-len(SEGMENT_SUFFIX)])
+        for name in os.listdir(log_dir)
+        if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+    )
+
+
+def _read_tail(path: str, repair: bool = False) -> Tuple[int, Optional[int]]:
+    """
+    从分段末尾向前读取，找到最后一个完整事件
+
+    Args:
+        path: 分段文件路径
+        repair: 是否截掉末尾不完整的行（写入中途进程崩溃留下的），只在持有写锁时使用
+
+    Returns:
+        (最后一个换行符之后的位置, 最后一个完整事件的偏移量)，没有完整事件时偏移量为None
+    """
+    with open(path, 'r+b' if repair else 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        size = None
+        buffer = b''
+        last = None
+        while pos > 0 and last is None:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buffer = f.read(step) + buffer
+            if size is None:
+                cut = buffer.rfind(b'\n')
+                if cut < 0:
+                    continue
+                size = pos + cut + 1
+                buffer = buffer[:cut]
+            lines = buffer.split(b'\n')
+            # 首行可能只读到一半，读到文件开头之前留到下一轮
+            buffer = lines.pop(0) if pos > 0 else b''
+            for line in reversed(lines):
+                try:
+                    last = json.loads(line)['offset']
+                    break
+                except (ValueError, KeyError, TypeError):
+                    continue
+        size = size or 0
+        if repair and size < end:
+            logger.warning("变更日志 %s 末尾有 %d 字节不完整的数据，已截掉", path, end - size)
+            f.truncate(size)
+    return size, last
+
+
+class ChangeFeed:
+    """变更推送：有界队列 + 后台写入线程 + 分段文件日志"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化变更推送，从已有日志恢复下一个偏移量
+
+        Args:
+            config: 推送配置，默认使用FEED_CONFIG
+        """
+        self.config = {**FEED_CONFIG, **(config or {})}
+        self.log_dir = self.config['log_dir']
+        self._queue: queue.Queue = queue.Queue(maxsize=self.config['queue_max_size'])
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self._next_offset = self._recover()
+        self._thread = threading.Thread(target=self._run, name='change-feed-writer', daemon=True)
+        self._thread.start()
+
+    def _recover(self) -> int:
+        os.makedirs(self.log_dir, exist_ok=True)
+        with self._exclusive():
+            return self._tail()[2]
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """跨进程的写锁：持有期间其他进程不能追加事件"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.log_dir, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _tail(self) -> Tuple[int, int, int]:
+        """修复最后一个分段的末尾，返回(分段起始偏移量, 分段大小, 下一个偏移量)；需持有写锁"""
+        segments = _list_segments(self.log_dir)
+        if not segments:
+            return 0, 0, 0
+        base = segments[-1]
+        size, last = _read_tail(os.path.join(self.log_dir, _segment_name(base)), repair=True)
+        return base, size, base if last is None else last + 1
+
+    @property
+    def next_offset(self) -> int:
+        """下一个事件将使用的偏移量"""
+        return self._next_offset
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """注册进程内订阅者，回调在后台写入线程中以事件字典调用"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        """取消订阅"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, diff: BoardDiff) -> int:
+        """
+        发布一个榜单的变化事件（不阻塞，队列满时丢弃）
+
+        Args:
+            diff: 榜单比对结果
+
+        Returns:
+            成功入队的事件数
+        """
+        kinds = [diff.entered, diff.moved, diff.exited]
+        if self.config['include_unchanged']:
+            kinds.append([event for event in diff.unchanged if event.heat_delta])
+        queued = 0
+        timestamp = diff.scraped_at.isoformat()
+        for events in kinds:
+            for event in events:
+                record = event.to_dict()
+                record['type'] = EVENT_TYPES[record.pop('kind')]
+                record['platform'] = diff.platform
+                record['category'] = diff.category
+                record['ts'] = timestamp
+                try:
+                    self._queue.put_nowait(record)
+                    queued += 1
+                except queue.Full:
+                    self.dropped += 1
+        if queued < sum(len(events) for events in kinds):
+            logger.warning("变更推送队列已满，累计丢弃 %d 条事件", self.dropped)
+        return queued
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            # 一次取出队列中已有的事件，批量写入后再刷新
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            records = [item for item in batch if item is not _STOP]
+            if records:
+                written = self._write(records)
+                self._dispatch(records[:written])
+            if stop:
+                break
+
+    def _write(self, records: List[Dict[str, Any]]) -> int:
+        """
+        持有写锁追加一批事件，偏移量在锁内从日志末尾确定，只有写入成功的事件才分配偏移量
+
+        Returns:
+            成功写入的事件数（写入失败时后面的事件被丢弃）
+        """
+        max_bytes = self.config['segment_max_bytes']
+        next_offset = self._next_offset
+        written = 0
+        try:
+            with self._exclusive():
+                base, size, next_offset = self._tail()
+                lines = [(json.dumps(dict(record, offset=next_offset + i), ensure_ascii=False) + '\n').encode('utf-8')
+                         for i, record in enumerate(records)]
+                while written < len(lines):
+                    if size and size + len(lines[written]) > max_bytes:
+                        base, size = next_offset + written, 0  # 滚动到新分段
+                    # 当前分段能容纳的行，新分段至少写入一行
+                    end = written + 1
+                    chunk_size = len(lines[written])
+                    while end < len(lines) and size + chunk_size + len(lines[end]) <= max_bytes:
+                        chunk_size += len(lines[end])
+                        end += 1
+                    self._append(os.path.join(self.log_dir, _segment_name(base)), size, b''.join(lines[written:end]))
+                    if size == 0:
+                        self._prune_segments()
+                    size += chunk_size
+                    written = end
+        except OSError as e:
+            logger.error("写入变更日志失败，丢弃 %d 条事件: %s", len(records) - written, e)
+            self.dropped += len(records) - written
+        for i in range(written):
+            records[i]['offset'] = next_offset + i
+        self._next_offset = next_offset + written
+        self.published += written
+        return written
+
+    @staticmethod
+    def _append(path: str, size: int, data: bytes) -> None:
+        """追加到分段；失败时截回写入前的大小，不留下不完整的行"""
+        try:
+            with open(path, 'ab') as f:
+                f.write(data)
+        except OSError:
+            try:
+                os.truncate(path, size)
+            except OSError:
+                pass
+            raise
+
+    def _prune_segments(self) -> None:
+        segments = _list_segments(self.log_dir)
+        for base in segments[:-self.config['max_segments']]:
+            try:
+                os.remove(os.path.join(self.log_dir, _segment_name(base)))
+            except OSError as e:
+                logger.warning("删除过期变更日志分段失败: %s", e)
+
+    def _dispatch(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            for record in records:
+                try:
+                    callback(record)
+                except Exception as e:
+                    logger.error("变更订阅者处理事件异常: %s", e)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """写完队列中剩余的事件后停止后台线程"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """推送统计"""
+        return {
+            'next_offset': self._next_offset,
+            'published': self.published,
+            'dropped': self.dropped,
+            'pending': self._queue.qsize(),
+        }
+
+
+class FeedReader:
+    """按偏移量读取变更日志（可在其他进程中使用）"""
+
+    def __init__(self, log_dir: Optional[str] = None):
+        self.log_dir = log_dir or FEED_CONFIG['log_dir']
+
+    def read(self, from_offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        读取偏移量不小于from_offset的事件
+
+        Args:
+            from_offset: 起始偏移量（含）
+            limit: 最多返回的事件数
+
+        Returns:
+            事件列表，按偏移量升序
+        """
+        events = []
+        segments = _list_segments(self.log_dir)
+        # 从包含from_offset的分段开始读（已被清理的偏移量从最早的分段开始）
+        start = max([base for base in segments if base <= from_offset], default=None)
+        for base in segments:
+            if start is not None and base < start:
+                continue
+            with open(os.path.join(self.log_dir, _segment_name(base)), 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 正在写入的不完整行
+                    try:
+                        event = json.loads(line)
+                        offset = event['offset']
+                    except (ValueError, KeyError, TypeError):
+                        continue  # 写入中途崩溃留下、尚未被截掉的残缺行
+                    if offset < from_offset:
+                        continue
+                    events.append(event)
+                    if limit is not None and len(events) >= limit:
+                        return events
+        return events
+
+    def end_offset(self) -> int:
+        """下一个将被写入的偏移量（用于只跟随之后的新事件）"""
+        segments = _list_segments(self.log_dir)
+        if not segments:
+            return 0
+        _, last = _read_tail(os.path.join(self.log_dir, _segment_name(segments[-1])))
+        return segments[-1] if last is None else last + 1
+
+    def follow(self, from_offset: int = 0, poll_interval: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """持续跟随新事件（轮询本地文件，不访问数据库）"""
+        offset = from_offset
+        while True:
+            events = self.read(offset, limit=1000)
+            for event in events:
+                yield event
+            if events:
+                offset = events[-1]['offset'] + 1
+            else:
+                time.sleep(poll_interval)
+
+
+# 单例模式
+_change_feed = None
+
+
+def get_change_feed() -> ChangeFeed:
+    """
+    获取全局变更推送实例（单例模式）
+
+    Returns:
+        变更推送实例
+    """
+    global _change_feed
+    if _change_feed is None:
+        _change_feed = ChangeFeed()
+        # 写入线程是守护线程，退出时不会等待它，须先写完队列中的事件
+        atexit.register(_change_feed.close)
+    return _change_feed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="读取话题变更事件")
+    parser.add_argument('--from-offset', type=int, default=0, help="起始偏移量")
+    parser.add_argument('--limit', type=int, default=None, help="最多读取的事件数")
+    parser.add_argument('--follow', action='store_true', help="持续跟随新事件")
+    parser.add_argument('--log-dir', default=None, help="事件日志目录")
+    args = parser.parse_args()
+
+    reader = FeedReader(args.log_dir)
+    events = reader.follow(args.from_offset) if args.follow else reader.read(args.from_offset, args.limit)
+    try:
+        for event in events:
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
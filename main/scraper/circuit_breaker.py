@@ -0,0 +1,185 @@
+"""
+熔断模块 - 按平台及(平台, 分类)跟踪近期失败率，跳过持续故障的数据源
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.platform_config import CIRCUIT_BREAKER_CONFIG
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    熔断器：closed状态下统计滑动窗口内的失败率，超过阈值进入open；
+    open持续一段时间后进入half_open放行探测请求，探测成功则恢复，失败则延长熔断时间
+    """
+
+    def __init__(self, name: str, config: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化熔断器
+
+        Args:
+            name: 熔断器名称（用于日志）
+            config: 熔断配置，默认使用CIRCUIT_BREAKER_CONFIG
+            clock: 单调时钟函数
+        """
+        self.name = name
+        self.config = config or CIRCUIT_BREAKER_CONFIG
+        self.state = CLOSED
+        self._clock = clock
+        self._outcomes = deque(maxlen=self.config['window_size'])
+        self._opened_at = 0.0
+        self._open_seconds = self.config['open_seconds']
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        判断是否放行本次请求（open到期后自动转为half_open并放行有限的探测请求）
+
+        Returns:
+            是否放行
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self._open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.config['half_open_max_calls']:
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def cancel_request(self) -> None:
+        """撤销一次已放行但未实际执行的请求（归还half_open的探测名额）"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record_success(self) -> None:
+        """记录一次成功"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # 探测成功：恢复并清空历史，熔断时长回到初始值
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._open_seconds = self.config['open_seconds']
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """记录一次失败"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # 探测失败：重新熔断，熔断时长翻倍（不超过上限）
+                self._open_seconds = min(self._open_seconds * 2, self.config['max_open_seconds'])
+                self._trip()
+                return
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.config['min_calls'] and self.failure_rate() >= self.config['failure_rate_threshold']:
+                self._trip()
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+
+    def failure_rate(self) -> float:
+        """滑动窗口内的失败率"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def retry_in(self) -> float:
+        """距离下一次探测的秒数（非open状态为0）"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._open_seconds - (self._clock() - self._opened_at))
+
+
+class CircuitBreakerRegistry:
+    """管理平台级和(平台, 分类)级熔断器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.config = config or CIRCUIT_BREAKER_CONFIG
+        self._clock = clock
+        self._breakers: Dict[Tuple[str, Optional[str]], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, platform_code: str, category: Optional[str] = None) -> CircuitBreaker:
+        """获取(必要时创建)熔断器；category为None时为平台级熔断器"""
+        key = (platform_code, category)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                name = f"{platform_code}/{category}" if category else platform_code
+                breaker = CircuitBreaker(name, self.config, self._clock)
+                self._breakers[key] = breaker
+            return breaker
+
+    def allow(self, platform_code: str, category: str) -> Tuple[bool, Optional[str]]:
+        """
+        依次检查平台级和分类级熔断器
+
+        Returns:
+            (是否放行, 拒绝原因)
+        """
+        if not self.config['enabled']:
+            return True, None
+        platform_breaker = self.get(platform_code)
+        if not platform_breaker.allow_request():
+            return False, (f"平台 {platform_code} 熔断中（失败率 {platform_breaker.failure_rate():.0%}），"
+                           f"{platform_breaker.retry_in():.0f}秒后探测")
+        category_breaker = self.get(platform_code, category)
+        if not category_breaker.allow_request():
+            platform_breaker.cancel_request()
+            return False, (f"分类 {platform_code}/{category} 熔断中（失败率 {category_breaker.failure_rate():.0%}），"
+                           f"{category_breaker.retry_in():.0f}秒后探测")
+        return True, None
+
+    def cancel(self, platform_code: str, category: str) -> None:
+        """撤销allow放行但最终未执行的请求"""
+        if not self.config['enabled']:
+            return
+        self.get(platform_code).cancel_request()
+        self.get(platform_code, category).cancel_request()
+
+    def record(self, platform_code: str, category: str, success: bool) -> None:
+        """同时向平台级和分类级熔断器记录结果"""
+        if not self.config['enabled']:
+            return
+        for breaker in (self.get(platform_code), self.get(platform_code, category)):
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def discard(self, platform_code: str, category: Optional[str] = None) -> None:
+        """移除熔断器；category为None时移除该平台的平台级和全部分类级熔断器"""
+        with self._lock:
+            for key in list(self._breakers):
+                if key[0] == platform_code and (category is None or key[1] == category):
+                    del self._breakers[key]
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有熔断器的状态"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {
+            breaker.name: {
+                'state': breaker.state,
+                'failure_rate': breaker.failure_rate(),
+                'retry_in': breaker.retry_in(),
+            }
+            for breaker in breakers
+        }
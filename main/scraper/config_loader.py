@@ -0,0 +1,322 @@
+"""
+平台配置热加载模块 - 监视外部配置文件，在采集周期之间校验并整体替换平台配置与分类列表
+
+外部配置文件为JSON，三个部分均可省略：
+    {
+        "platforms": {"weibo": {...与PLATFORM_CONFIG中单个平台的结构相同...}},
+        "platform_categories": {"weibo": ["ent", "search"]},
+        "custom_params": {"weibo": {"version": "2"}}
+    }
+platforms按平台代码覆盖或新增config/platform_config.py中的平台定义，
+platform_categories和custom_params出现时整体替换内置配置。
+
+每个周期开始前调用poll()：文件未变化时只有一次stat；内容变化时全部校验通过才替换，
+校验失败保留当前配置继续运行。未变化平台的配置对象保持不变，
+采集器据此只清理被移除榜单的快照和熔断器，其余缓存、连接和去重状态保留。
+
+用法:
+    python -m main.scraper.config_loader --dump config/platforms.json   # 以内置配置生成外部配置文件
+    python -m main.scraper.config_loader --check config/platforms.json  # 只校验不加载
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config.platform_config import HOT_RELOAD_CONFIG, PLATFORM_CONFIG, custom_params, platform_categories
+
+logger = logging.getLogger(__name__)
+
+# 单个平台配置的必填字段及类型
+_REQUIRED_FIELDS = {
+    'base_url': str,
+    'default_params': dict,
+    'data_path': list,
+    'list_type': str,
+    'field_mapping': dict,
+}
+_MAPPING_FIELDS = ('title', 'heat', 'url', 'tag')
+_PAGINATION_FIELDS = ('start_page', 'max_pages', 'page_size')
+_LIST_TYPES = ('string', 'list')
+
+
+class ConfigError(ValueError):
+    """外部配置校验失败，errors为全部问题列表"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class PlatformSettings:
+    """一次加载得到的完整平台配置，加载后不再修改，替换时整体换成新对象"""
+
+    __slots__ = ('platforms', 'platform_categories', 'custom_params', 'version', 'source')
+
+    def __init__(self, platforms: Dict[str, Dict[str, Any]], platform_categories: Dict[str, List[str]],
+                 custom_params: Dict[str, Dict[str, Any]], version: str, source: str):
+        self.platforms = platforms
+        self.platform_categories = platform_categories
+        self.custom_params = custom_params
+        self.version = version
+        self.source = source
+
+
+class ConfigChange:
+    """新旧配置的差异"""
+
+    __slots__ = ('settings', 'added', 'removed', 'changed', 'removed_boards')
+
+    def __init__(self, settings: PlatformSettings, added: Set[str], removed: Set[str], changed: Set[str],
+                 removed_boards: List[Tuple[str, str]]):
+        self.settings = settings
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.removed_boards = removed_boards
+
+    def describe(self) -> str:
+        parts = []
+        for label, codes in (('新增平台', self.added), ('移除平台', self.removed), ('变更平台', self.changed)):
+            if codes:
+                parts.append(f"{label} {','.join(sorted(codes))}")
+        if self.removed_boards:
+            parts.append(f"移除榜单 {','.join(f'{p}/{c}' for p, c in self.removed_boards)}")
+        return '; '.join(parts) or '平台定义无变化'
+
+
+def compile_platform(platform_code: str, raw: Any, errors: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    校验单个平台配置并生成独立副本（之后修改原始数据不影响正在使用的配置）
+
+    Args:
+        platform_code: 平台代码
+        raw: 平台配置
+        errors: 收集校验问题的列表
+
+    Returns:
+        校验通过的配置副本，未通过时返回None
+    """
+    start = len(errors)
+    if not isinstance(raw, dict):
+        errors.append(f"平台 {platform_code} 的配置必须是对象")
+        return None
+    for field, expected in _REQUIRED_FIELDS.items():
+        if not isinstance(raw.get(field), expected):
+            errors.append(f"平台 {platform_code} 缺少字段 {field} 或类型不是 {expected.__name__}")
+    if isinstance(raw.get('data_path'), list) and (
+            not raw['data_path'] or not all(isinstance(key, (str, int)) for key in raw['data_path'])):
+        errors.append(f"平台 {platform_code} 的data_path必须是非空的键列表")
+    if isinstance(raw.get('list_type'), str) and raw['list_type'] not in _LIST_TYPES:
+        errors.append(f"平台 {platform_code} 的list_type只能是 {'/'.join(_LIST_TYPES)}")
+    if isinstance(raw.get('field_mapping'), dict):
+        for field in _MAPPING_FIELDS:
+            if not isinstance(raw['field_mapping'].get(field), str):
+                errors.append(f"平台 {platform_code} 的field_mapping缺少 {field}")
+    pagination = raw.get('pagination', {})
+    if not isinstance(pagination, dict):
+        errors.append(f"平台 {platform_code} 的pagination必须是对象")
+    else:
+        for field in _PAGINATION_FIELDS:
+            value = pagination.get(field)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                errors.append(f"平台 {platform_code} 的pagination.{field}必须是正整数")
+    if len(errors) > start:
+        return None
+    return copy.deepcopy(raw)
+
+
+def build_settings(data: Dict[str, Any], source: str = 'builtin') -> PlatformSettings:
+    """
+    以内置配置为基础叠加外部配置，校验后生成PlatformSettings
+
+    Args:
+        data: 外部配置（空字典表示只使用内置配置）
+        source: 配置来源说明
+
+    Returns:
+        PlatformSettings
+
+    Raises:
+        ConfigError: 任一部分校验失败
+    """
+    errors: List[str] = []
+    if not isinstance(data, dict):
+        raise ConfigError(["配置文件顶层必须是对象"])
+    unknown = set(data) - {'platforms', 'platform_categories', 'custom_params'}
+    if unknown:
+        errors.append(f"未知的配置项: {', '.join(sorted(unknown))}")
+
+    overrides = data.get('platforms', {})
+    if not isinstance(overrides, dict):
+        errors.append("platforms必须是对象")
+        overrides = {}
+    platforms = {}
+    for platform_code, raw in {**PLATFORM_CONFIG, **overrides}.items():
+        compiled = compile_platform(platform_code, raw, errors)
+        if compiled is not None:
+            platforms[platform_code] = compiled
+
+    categories = data.get('platform_categories', platform_categories)
+    if not isinstance(categories, dict):
+        errors.append("platform_categories必须是对象")
+        categories = {}
+    for platform_code, names in categories.items():
+        if platform_code not in platforms and platform_code in overrides:
+            continue  # 平台定义本身有误，已记录
+        if platform_code not in platforms:
+            errors.append(f"platform_categories中的平台 {platform_code} 没有对应的平台定义")
+        if not isinstance(names, list) or not names or not all(isinstance(name, str) and name for name in names):
+            errors.append(f"平台 {platform_code} 的分类必须是非空的字符串列表")
+
+    params = data.get('custom_params', custom_params)
+    if not isinstance(params, dict) or not all(isinstance(value, dict) for value in params.values()):
+        errors.append("custom_params必须是 平台代码 -> 参数对象 的映射")
+        params = {}
+
+    if errors:
+        raise ConfigError(errors)
+    payload = json.dumps([platforms, categories, params], sort_keys=True, ensure_ascii=False, default=str)
+    version = hashlib.blake2b(payload.encode('utf-8'), digest_size=6).hexdigest()
+    return PlatformSettings(platforms, copy.deepcopy(categories), copy.deepcopy(params), version, source)
+
+
+def diff_settings(old: PlatformSettings, new: PlatformSettings) -> ConfigChange:
+    """比较两份配置：平台定义的增删改，以及不再采集的榜单"""
+    old_codes, new_codes = set(old.platforms), set(new.platforms)
+    changed = {code for code in old_codes & new_codes if old.platforms[code] != new.platforms[code]}
+    new_boards = {(p, c) for p, names in new.platform_categories.items() for c in names}
+    removed_boards = sorted((p, c) for p, names in old.platform_categories.items() for c in names
+                            if (p, c) not in new_boards)
+    return ConfigChange(new, new_codes - old_codes, old_codes - new_codes, changed, removed_boards)
+
+
+class ConfigLoader:
+    """监视外部配置文件，变化时校验并整体替换当前配置"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化配置加载器（不读取文件，首次poll时才加载）
+
+        Args:
+            path: 外部配置文件路径，默认使用HOT_RELOAD_CONFIG['path']
+        """
+        self.path = path or HOT_RELOAD_CONFIG['path']
+        self._settings = build_settings({})
+        self._file_state: Optional[Tuple[int, int]] = None
+        self._content_hash: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> PlatformSettings:
+        """当前生效的配置（替换是单次引用赋值，读取方总是拿到完整的一份）"""
+        return self._settings
+
+    def poll(self) -> Optional[ConfigChange]:
+        """
+        检查配置文件，变化且校验通过时替换当前配置
+
+        Returns:
+            配置变化，文件未变化、不存在或校验失败时返回None
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error("读取配置文件 %s 状态失败: %s", self.path, e)
+            return None
+        file_state = (stat.st_mtime_ns, stat.st_size)
+        if file_state == self._file_state:
+            return None
+        return self._load(file_state)
+
+    def _load(self, file_state: Tuple[int, int]) -> Optional[ConfigChange]:
+        with self._lock:
+            self._file_state = file_state
+            try:
+                with open(self.path, 'rb') as f:
+                    content = f.read()
+            except OSError as e:
+                logger.error("读取配置文件 %s 失败: %s", self.path, e)
+                return None
+            content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+            if content_hash == self._content_hash:
+                return None  # 仅修改时间变化
+            self._content_hash = content_hash
+
+            try:
+                settings = build_settings(json.loads(content.decode('utf-8')), source=self.path)
+            except (ValueError, UnicodeDecodeError) as e:
+                errors = e.errors if isinstance(e, ConfigError) else [str(e)]
+                logger.error("配置文件 %s 校验失败，继续使用当前配置（版本 %s）:\n  %s",
+                             self.path, self._settings.version, '\n  '.join(errors))
+                return None
+
+            if settings.version == self._settings.version:
+                return None
+            # 未变化平台沿用旧的配置对象
+            for platform_code, compiled in settings.platforms.items():
+                previous = self._settings.platforms.get(platform_code)
+                if previous is not None and previous == compiled:
+                    settings.platforms[platform_code] = previous
+            change = diff_settings(self._settings, settings)
+            self._settings = settings
+        logger.info("已加载配置文件 %s（版本 %s）: %s", self.path, settings.version, change.describe())
+        return change
+
+
+# 单例模式
+_config_loader = None
+
+
+def get_config_loader() -> ConfigLoader:
+    """
+    获取全局配置加载器实例（单例模式）
+
+    Returns:
+        配置加载器实例
+    """
+    global _config_loader
+    if _config_loader is None:
+        _config_loader = ConfigLoader()
+    return _config_loader
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="平台配置文件工具")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--dump', metavar='PATH', help="把内置配置写成外部配置文件")
+    group.add_argument('--check', metavar='PATH', help="校验外部配置文件")
+    args = parser.parse_args(argv)
+
+    if args.dump:
+        settings = build_settings({})
+        with open(args.dump, 'w', encoding='utf-8') as f:
+            json.dump({'platforms': settings.platforms, 'platform_categories': settings.platform_categories,
+                       'custom_params': settings.custom_params}, f, ensure_ascii=False, indent=2)
+        print(f"已写入 {args.dump}（版本 {settings.version}）")
+        return 0
+
+    try:
+        with open(args.check, encoding='utf-8') as f:
+            settings = build_settings(json.load(f), source=args.check)
+    except ConfigError as e:
+        print("校验失败:\n  " + '\n  '.join(e.errors))
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.check}: {e}")
+        return 1
+    print(f"校验通过: {len(settings.platforms)} 个平台，"
+          f"{sum(len(names) for names in settings.platform_categories.values())} 个榜单，版本 {settings.version}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
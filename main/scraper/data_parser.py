@@ -1,23 +1,68 @@
-import re
-from typing import Dict, List, Any, Optional
+import logging
 from datetime import datetime
-from main.scraper.utils import clean_text, process_tags, generate_hash, safe_get, parse_json_string
+from typing import Dict, Iterable, Iterator, List, Any, Optional
+from main.scraper import json_codec
+from main.scraper.heat import normalize_heat_batch, parse_heat
+from main.scraper.topic import Topic, TopicBatch
+from main.scraper.utils import clean_text, process_tags, generate_hash, safe_get
+
+logger = logging.getLogger(__name__)
 
 class DataParser:
     @staticmethod
     def parse_api_data(api_data: Dict, platform_code: str, category: str, config: Dict, page: int) -> List[Dict]:
+        return DataParser.parse_batch(api_data, platform_code, category, config, page).to_dicts()
+
+    @staticmethod
+    def parse_batch(api_data: Dict, platform_code: str, category: str, config: Dict, page: int,
+                    rank_offset: int = 0) -> TopicBatch:
+        """解析单页接口数据为TopicBatch（采集流水线内部使用，rank_offset为翻页带来的排名偏移）"""
+        batch = TopicBatch(platform_code, category, page)
         current_data = api_data
         for key in config['data_path']:
             current_data = safe_get(current_data, key)
             if current_data is None:
-                return []
+                return batch
+
+        if config['list_type'] == 'string':
+            try:
+                # 超大页面返回逐项解码的迭代器
+                items = json_codec.decode_list(current_data)
+            except (json_codec.JSONDecodeError, TypeError) as e:
+                logger.warning("JSON字符串解析失败: %s, 原始字符串: %s", e, str(current_data)[:100])
+                batch.truncated = True
+                return batch
+        else:
+            items = current_data
+        if not isinstance(items, (list, Iterator)):
+            return batch
+
+        try:
+            DataParser._append_topics(batch, items, config['field_mapping'], rank_offset)
+        except json_codec.JSONDecodeError as e:
+            # 逐项解码中途出错时保留已解析的话题，并标记本页不完整
+            logger.warning("平台 %s 第 %d 页数据在第 %d 项后解析失败: %s", platform_code, page, len(batch), e)
+            batch.truncated = True
+        return batch
 
-        items = parse_json_string(current_data) if config['list_type'] == 'string' else current_data
-        if not isinstance(items, list):
-            return []
+    @staticmethod
+    def _append_topics(batch: TopicBatch, items: Iterable, field_map: Dict, rank_offset: int) -> None:
+        platform_code, category, page = batch.platform, batch.category, batch.page
+        topics = batch.topics
+        scraped_at = batch.scraped_at
+        start = len(topics)
+        heats = []
+        try:
+            DataParser._build_topics(topics, heats, items, field_map, platform_code, category, page,
+                                     rank_offset, scraped_at)
+        finally:
+            # 逐项解码中途出错时，已解析的话题同样需要热度值
+            DataParser._fill_heat(topics[start:], heats, platform_code, page)
 
-        field_map = config['field_mapping']
-        topics = []
+    @staticmethod
+    def _build_topics(topics: List[Topic], heats: List[Any], items: Iterable, field_map: Dict,
+                      platform_code: str, category: str, page: int, rank_offset: int, scraped_at: datetime) -> None:
+        """逐项构造话题，热度原始值收集到heats中，由_fill_heat整页批量解析"""
         for idx, item in enumerate(items, 1):
             if not isinstance(item, dict):
                 continue
@@ -25,35 +70,33 @@ class DataParser:
             if not title:
                 continue
             
-            topic = {
-                "platform": platform_code,
-                "category": category,
-                "page": page,
-                "rank": idx,
-                "timestamp": datetime.now().isoformat(),
-                "title": title,
-                "heat_value": DataParser.extract_heat_value(safe_get(item, field_map['heat'], "")),
-                "url": f"https://rebang.today/item/{safe_get(item, field_map['url'], '')}" if safe_get(item, field_map['url'], '') else "",
-                "tags": process_tags(clean_text(safe_get(item, field_map['tag'], ""))),
-                "hash_id": generate_hash(f"{title}_{platform_code}_{category}_{page}"),
-            }
-            
-            topics.append(topic)
-        return topics
+            item_id = safe_get(item, field_map['url'], '')
+            heats.append(safe_get(item, field_map['heat'], ""))
+            topics.append(Topic(
+                platform=platform_code,
+                category=category,
+                page=page,
+                rank=idx + rank_offset,
+                title=title,
+                heat_value=None,
+                url=f"https://rebang.today/item/{item_id}" if item_id else "",
+                tags=process_tags(clean_text(safe_get(item, field_map['tag'], ""))),
+                hash_id=generate_hash(f"{title}_{platform_code}_{category}_{page}"),
+                scraped_at=scraped_at,
+            ))
+
+    @staticmethod
+    def _fill_heat(topics: List[Topic], heats: List[Any], platform_code: str, page: int) -> None:
+        """整页批量解析热度值并写回话题，报告无法解析的值"""
+        if not topics:
+            return
+        result = normalize_heat_batch(heats, platform_code)
+        for topic, heat_value in zip(topics, result.to_list()):
+            topic.heat_value = heat_value
+        if result.unparseable:
+            logger.debug("平台 %s 第 %d 页有 %d 个热度值无法解析，例如: %r",
+                         platform_code, page, len(result.unparseable), result.unparseable[0][1])
 
     @staticmethod
-    def extract_heat_value(heat_str: Any) -> Optional[int]:
-        if isinstance(heat_str, int):
-            return heat_str
-        if not heat_str or not isinstance(heat_str, str):
-            return None
-        match = re.search(r'(\d+\.?\d*)\s*([w万亿]?)', heat_str)
-        if not match:
-            return None
-        value = float(match.group(1))
-        unit = match.group(2)
-        if unit in ('万', 'w'):
-            value *= 10000
-        elif unit == '亿':
-            value *= 100000000
-        return int(value)
\ No newline at end of file
+    def extract_heat_value(heat_str: Any, platform_code: Optional[str] = None) -> Optional[int]:
+        return parse_heat(heat_str, platform_code)
@@ -1,7 +1,8 @@
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Any, Tuple, Optional
-from main.database.database_manager import get_db_manager
+from typing import Tuple, Optional
+from main.database.database_manager import get_db_manager, lookup_topic_state
+from main.scraper.topic import Topic
 
 class Deduplicator:
     def __init__(self):
@@ -12,23 +13,23 @@ class Deduplicator:
             'time_window_minutes': 30
         }
     
-    def is_duplicate(self, topic: Dict[str, Any]) -> Tuple[bool, Optional[int]]:
-        existing_by_hash = self.db.get_hot_topic_by_hash(topic['hash_id'])
+    def is_duplicate(self, topic: Topic) -> Tuple[bool, Optional[int]]:
+        time_threshold = datetime.now() - timedelta(minutes=self.config['time_window_minutes'])
+        existing_by_hash = lookup_topic_state(topic.hash_id, self.db)
         if existing_by_hash:
-            last_seen = existing_by_hash['last_seen_at']
-            if last_seen and (datetime.now() - last_seen < timedelta(minutes=self.config['time_window_minutes'])):
-                return True, existing_by_hash['id']
+            last_seen = existing_by_hash.last_seen_at
+            if last_seen and last_seen > time_threshold:
+                return True, existing_by_hash.id
         
-        time_threshold = datetime.now() - timedelta(minutes=self.config['time_window_minutes'])
         similar_topics = self.db.execute_query("""
             SELECT id, title FROM hot_topics 
             WHERE platform_id = (SELECT id FROM platforms WHERE code = %s)
             AND last_seen_at >= %s
             AND is_active = TRUE
-        """, (topic['platform'], time_threshold))
+        """, (topic.platform, time_threshold))
         
         for existing in similar_topics:
-            similarity = self._title_similarity(topic['title'], existing['title'])
+            similarity = self._title_similarity(topic.title, existing['title'])
             if similarity >= self.config['title_similarity_threshold']:
                 return True, existing['id']
                 
@@ -0,0 +1,158 @@
+"""
+热度值解析模块 - 将"123.4万"、"2亿"等热度文本转换为整数
+
+normalize_heat_batch一次解析整页（采集时由DataParser按页调用）或整批历史数据，
+结果为int64的NumPy数组，并报告无法解析的值；parse_heat逐条解析单个值。
+两者遵循相同的按平台单位规则，结果一致。
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from config.platform_config import HEAT_CONFIG
+
+INT64_MAX = 2 ** 63 - 1
+
+_rule_cache: Dict[Optional[str], Tuple[Pattern, Dict[str, int]]] = {}
+
+
+class _FullMatch:
+    """让严格模式的规则与普通规则一样通过search调用"""
+
+    def __init__(self, pattern: Pattern):
+        self.pattern = pattern
+
+    def search(self, text: str):
+        return self.pattern.fullmatch(text)
+
+
+def get_rule(platform_code: Optional[str] = None) -> Tuple[Pattern, Dict[str, int]]:
+    """
+    获取平台的热度解析规则（预编译的正则和单位倍数表）
+
+    Args:
+        platform_code: 平台代码，None表示默认规则
+
+    Returns:
+        (正则, 单位倍数表)
+    """
+    rule = _rule_cache.get(platform_code)
+    if rule is None:
+        override = HEAT_CONFIG['platform_rules'].get(platform_code, {}) if platform_code else {}
+        units = override.get('units', HEAT_CONFIG['units'])
+        # 长单位在前，避免被其前缀抢先匹配
+        unit_pattern = '|'.join(re.escape(unit) for unit in sorted(units, key=len, reverse=True))
+        pattern = rf'(\d+\.?\d*)\s*({unit_pattern})?' if unit_pattern else r'(\d+\.?\d*)()'
+        if override.get('strict'):
+            rule = (_FullMatch(re.compile(rf'\s*{pattern}\s*')), units)
+        else:
+            rule = (re.compile(pattern), units)
+        _rule_cache[platform_code] = rule
+    return rule
+
+
+def clear_rule_cache() -> None:
+    """热度规则配置变更后清空缓存"""
+    _rule_cache.clear()
+
+
+def parse_heat(heat: Any, platform_code: Optional[str] = None) -> Optional[int]:
+    """
+    解析单个热度值
+
+    Args:
+        heat: 热度（整数直接返回，字符串按单位规则解析）
+        platform_code: 平台代码
+
+    Returns:
+        整数热度，无法解析时返回None
+    """
+    if isinstance(heat, int):
+        return heat
+    if not heat or not isinstance(heat, str):
+        return None
+    pattern, units = get_rule(platform_code)
+    match = pattern.search(heat)
+    if not match:
+        return None
+    value = float(match.group(1))
+    unit = match.group(2)
+    if unit:
+        value *= units[unit]
+    return int(value)
+
+
+class HeatBatchResult:
+    """批量解析结果"""
+
+    __slots__ = ('values', 'valid', 'unparseable')
+
+    def __init__(self, values, valid, unparseable: List[Tuple[int, Any]]):
+        self.values = values            # int64数组，无法解析的位置为0
+        self.valid = valid              # bool数组，标记成功解析的位置
+        self.unparseable = unparseable  # [(下标, 原始值)]，空值不计入
+
+    def to_list(self) -> List[Optional[int]]:
+        """转换为与parse_heat一致的列表（无法解析为None）"""
+        return [int(value) if ok else None for value, ok in zip(self.values.tolist(), self.valid.tolist())]
+
+
+def normalize_heat_batch(values: Sequence[Any], platform_code: Optional[str] = None) -> HeatBatchResult:
+    """
+    批量解析热度值：正则只负责切分数值和单位，数值转换与单位换算在NumPy中一次完成
+
+    Args:
+        values: 热度原始值序列（一页或整批历史数据）
+        platform_code: 平台代码
+
+    Returns:
+        HeatBatchResult
+    """
+    import numpy as np
+
+    pattern, units = get_rule(platform_code)
+    search = pattern.search
+    size = len(values)
+    result = np.zeros(size, dtype=np.int64)
+    valid = np.zeros(size, dtype=bool)
+    unparseable = []
+
+    int_positions, ints = [], []
+    positions, numbers, multipliers = [], [], []
+    for idx, raw in enumerate(values):
+        if isinstance(raw, int):
+            if -INT64_MAX <= raw <= INT64_MAX:
+                int_positions.append(idx)
+                ints.append(raw)
+            else:
+                unparseable.append((idx, raw))
+            continue
+        if not raw or not isinstance(raw, str):
+            if raw:
+                unparseable.append((idx, raw))
+            continue
+        match = search(raw)
+        if not match:
+            unparseable.append((idx, raw))
+            continue
+        positions.append(idx)
+        numbers.append(match.group(1))
+        unit = match.group(2)
+        multipliers.append(units[unit] if unit else 1)
+
+    if int_positions:
+        result[int_positions] = ints
+        valid[int_positions] = True
+    if positions:
+        index = np.asarray(positions, dtype=np.intp)
+        # float64乘法与截断取整与parse_heat的float(...) * 倍数、int(...)逐位一致
+        scaled = np.fromiter(map(float, numbers), dtype=np.float64, count=len(numbers)) \
+            * np.asarray(multipliers, dtype=np.float64)
+        in_range = np.abs(scaled) < 2.0 ** 63
+        result[index[in_range]] = scaled[in_range].astype(np.int64)
+        valid[index[in_range]] = True
+        for idx in index[~in_range].tolist():
+            unparseable.append((idx, values[idx]))
+        unparseable.sort(key=lambda item: item[0])
+
+    return HeatBatchResult(result, valid, unparseable)
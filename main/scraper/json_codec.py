@@ -0,0 +1,160 @@
+"""
+JSON解码模块 - 接口响应的统一解码入口
+
+安装了orjson时使用orjson（可直接解码响应的原始字节，省去bytes->str的转换），否则回退到标准库json。
+超大的字符串化列表可用iter_json_array逐项解码，无需一次性构建整个列表。
+dumps为查询服务等输出端提供同样的后端选择，直接输出UTF-8字节。
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, Optional, Union
+
+from config.platform_config import FETCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+# 复用同一个解码器实例，逐项解码时在原字符串上按偏移扫描，不切片复制
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError是其子类
+
+
+def _resolve_backend(name: str) -> str:
+    if name == 'orjson' and orjson is None:
+        logger.warning("未安装orjson，JSON解码回退到标准库")
+        return 'json'
+    if name == 'auto':
+        return 'orjson' if orjson is not None else 'json'
+    return name
+
+
+_backend = _resolve_backend(FETCH_CONFIG.get('json_backend', 'auto'))
+
+
+def get_backend() -> str:
+    """当前使用的JSON解码后端（'orjson' 或 'json'）"""
+    return _backend
+
+
+def set_backend(name: str) -> str:
+    """
+    切换JSON解码后端（主要用于基准测试）
+
+    Args:
+        name: 'auto'、'orjson' 或 'json'
+
+    Returns:
+        实际生效的后端
+    """
+    global _backend
+    _backend = _resolve_backend(name)
+    return _backend
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    解码JSON文本或原始字节
+
+    Raises:
+        JSONDecodeError: 内容不是合法JSON
+    """
+    if _backend == 'orjson':
+        return orjson.loads(data)
+    if not isinstance(data, str):
+        data = bytes(data).decode('utf-8')
+    return _decoder.decode(data)
+
+
+def _default(obj: Any) -> Any:
+    """序列化数据库结果中的非JSON原生类型"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.hex()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    编码为UTF-8 JSON字节（中文不转义，datetime输出ISO格式，Decimal输出为浮点数）
+
+    Raises:
+        TypeError: 包含无法序列化的对象
+    """
+    if _backend == 'orjson':
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def iter_json_array(s: str, start: int = 0) -> Iterator[Any]:
+    """
+    逐项解码JSON数组字符串，每次只解码一个元素
+
+    Args:
+        s: JSON数组字符串
+        start: 开始扫描的位置
+
+    Yields:
+        数组元素
+
+    Raises:
+        JSONDecodeError: 内容不是合法的JSON数组
+    """
+    end = len(s)
+    idx = start
+    while idx < end and s[idx] in _WHITESPACE:
+        idx += 1
+    if idx >= end or s[idx] != '[':
+        raise JSONDecodeError("Expecting '['", s, idx)
+    idx += 1
+    expect_item = True
+    count = 0
+    while True:
+        while idx < end and s[idx] in _WHITESPACE:
+            idx += 1
+        if idx >= end:
+            raise JSONDecodeError("Unterminated array", s, idx)
+        char = s[idx]
+        if char == ']':
+            if expect_item and count:
+                raise JSONDecodeError("Illegal trailing comma before end of array", s, idx)
+            return
+        if char == ',' and not expect_item:
+            idx += 1
+            expect_item = True
+            continue
+        if not expect_item:
+            raise JSONDecodeError("Expecting ',' delimiter", s, idx)
+        item, idx = _decoder.raw_decode(s, idx)
+        expect_item = False
+        count += 1
+        yield item
+
+
+def decode_list(s: str, incremental_threshold: Optional[int] = None) -> Any:
+    """
+    解码字符串化的列表：小于阈值时整体解码，超过阈值时返回逐项解码的迭代器
+
+    Args:
+        s: JSON数组字符串
+        incremental_threshold: 逐项解码的长度阈值（字符数），默认取FETCH_CONFIG['incremental_decode_chars']
+
+    Returns:
+        列表，或逐项产出元素的迭代器
+    """
+    if incremental_threshold is None:
+        incremental_threshold = FETCH_CONFIG.get('incremental_decode_chars')
+    if incremental_threshold and len(s) > incremental_threshold:
+        return iter_json_array(s)
+    return loads(s)
@@ -0,0 +1,149 @@
+"""
+日志配置模块 - 基于队列的非阻塞日志、JSON结构化格式和逐页日志采样
+
+采集线程只把日志记录放入队列，格式化、文件写入和日志滚动都由QueueListener的后台线程完成
+（参数含可变对象的记录在入队前合并消息，见DeferredQueueHandler）。
+需要采样的日志在调用时传入 extra={'sampled': True}。
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from config.platform_config import LOGGING_CONFIG
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord自带的属性，JSON格式中只额外输出调用方通过extra传入的字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# 不可变的日志参数：延迟到后台线程格式化，结果与在调用线程格式化相同
+_IMMUTABLE_ARGS = (str, int, float, bytes, Decimal, date, type(None))
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'sampled':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """对标记为sampled的INFO及以下日志按消息模板每N条保留1条，WARNING及以上始终保留"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno >= logging.WARNING or not getattr(record, 'sampled', False):
+            return True
+        # %风格日志的record.msg是未格式化的模板，同一条语句共享一个计数器
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counters.get(key, 0)
+            self._counters[key] = count + 1
+        return count % self.every == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    参数都不可变时原样入队，格式化留给后台线程（标准QueueHandler.prepare总是提前格式化）
+
+    参数中有列表、字典、对象等可变值时在调用线程合并消息，
+    避免后台线程格式化前调用方已修改这些对象，日志内容与记录时不符。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args:
+            return record
+        values = args.values() if isinstance(args, dict) else args
+        if all(isinstance(value, _IMMUTABLE_ARGS) for value in values):
+            return record
+        # 与标准实现一样复制后修改，不影响同一记录的其他处理器
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    配置根日志记录器：控制台 + 滚动日志文件，可选队列模式与JSON格式
+
+    仅由程序入口调用，导入模块时不产生任何文件I/O；重复调用不会重复添加处理器。
+
+    Args:
+        config: 日志配置，默认使用LOGGING_CONFIG
+    """
+    global _listener
+    config = {**LOGGING_CONFIG, **(config or {})}
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    log_file = config['log_file']
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    formatter = JsonFormatter() if config['format'] == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [
+        RotatingFileHandler(
+            log_file,
+            maxBytes=config['max_bytes'],
+            backupCount=config['backup_count'],
+            encoding='utf-8'  # 明确指定编码
+        ),
+        logging.StreamHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    sampler = SamplingFilter(config['sample_every'])
+    if config['use_queue']:
+        # 队列不设上限，入队不会阻塞采集线程
+        log_queue = queue.SimpleQueue()
+        front = DeferredQueueHandler(log_queue)
+        front.addFilter(sampler)
+        root.addHandler(front)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    else:
+        for handler in handlers:
+            handler.addFilter(sampler)
+            root.addHandler(handler)
+    root.setLevel(config['level'])
+
+
+def shutdown_logging() -> None:
+    """停止后台日志线程并写出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,160 @@
+"""
+限流模块 - 按主机的令牌桶限流与每周期重试预算
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config.platform_config import FETCH_CONFIG
+
+
+class TokenBucket:
+    """令牌桶：以固定速率补充令牌，允许不超过容量的突发请求"""
+
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（最大突发请求数）
+            clock: 单调时钟函数
+            sleep: 休眠函数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预占一个令牌，返回需要等待的秒数（令牌不足时允许透支，由等待补足）"""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """
+        获取一个令牌，必要时阻塞等待
+
+        Returns:
+            实际等待的秒数
+        """
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """按主机划分令牌桶，同一主机的所有请求共享限流，并统计等待时间"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化限流器
+
+        Args:
+            config: 抓取配置，默认使用FETCH_CONFIG
+        """
+        self.config = config or FETCH_CONFIG
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                override = self.config.get('host_overrides', {}).get(host, {})
+                bucket = TokenBucket(
+                    rate=override.get('requests_per_second', self.config['requests_per_second']),
+                    capacity=override.get('burst', self.config['burst'])
+                )
+                self._buckets[host] = bucket
+                self._stats[host] = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+            return bucket
+
+    def acquire(self, host: str) -> float:
+        """
+        为指定主机获取请求许可
+
+        Returns:
+            等待的秒数
+        """
+        waited = self._get_bucket(host).acquire()
+        with self._lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            if waited > 0:
+                stats['throttled'] += 1
+                stats['wait_seconds'] += waited
+                stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+        return waited
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各主机的限流等待统计
+
+        Returns:
+            {主机: {requests, throttled, wait_seconds, max_wait_seconds, avg_wait_seconds}}
+        """
+        with self._lock:
+            result = {host: dict(stats) for host, stats in self._stats.items()}
+        for stats in result.values():
+            stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        return result
+
+
+class RetryBudget:
+    """每个采集周期的重试次数上限，防止源站故障时重试放大请求量"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        """
+        消耗一次重试额度
+
+        Returns:
+            是否还有额度
+        """
+        with self._lock:
+            if self.used >= self.limit:
+                self.exhausted += 1
+                return False
+            self.used += 1
+            return True
+
+    def reset(self) -> None:
+        """新周期开始时重置额度"""
+        with self._lock:
+            self.used = 0
+            self.exhausted = 0
+
+
+# 单例模式
+_rate_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    获取全局限流器实例（单例模式，进程内所有抓取器共享）
+
+    Returns:
+        限流器实例
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
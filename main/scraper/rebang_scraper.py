@@ -4,14 +4,19 @@ import time
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from main.scraper.api_fetcher import ApiFetcher
+from main.scraper.change_feed import get_change_feed
+from main.scraper.circuit_breaker import CircuitBreakerRegistry
+from main.scraper.config_loader import ConfigChange
 from main.scraper.data_parser import DataParser
 from main.scraper.deduplicator import Deduplicator
+from main.scraper.snapshot_diff import BoardDiff, DiffListener, SnapshotStore
 from main.scraper.storage_manager import StorageManager
-from config.database_config import DATABASE_CONFIG
+from main.scraper.topic import Topic
 from main.database.database_manager import get_db_manager              
-from config.platform_config import PLATFORM_CONFIG, platform_categories, custom_params
-from main.scraper.utils import setup_logging
-setup_logging()
+from main.database.hash_cache import get_hash_cache
+from main.profiling.cycle import get_cycle_profiler
+from config.platform_config import FEED_CONFIG, PLATFORM_CONFIG, platform_categories, custom_params
+from main.scraper.log_setup import setup_logging
 logger = logging.getLogger(__name__)
 
 class RebangScraper:
@@ -21,8 +26,14 @@ class RebangScraper:
         self.api_fetcher = ApiFetcher(self.session, self.base_url)
         self.data_parser = DataParser()
         self.deduplicator = Deduplicator()
-        self.storage_manager = StorageManager()
+        self.storage_manager = StorageManager(self.deduplicator)
         self.platform_config = PLATFORM_CONFIG
+        self.lease_manager = None  # 多工作进程模式下由run_worker_scraping设置
+        self.circuit_breakers = CircuitBreakerRegistry()
+        self.snapshots = SnapshotStore()
+        self.diff_listeners: List[DiffListener] = []
+        if FEED_CONFIG['enabled']:
+            self.add_diff_listener(get_change_feed().publish)
     def should_stop_pagination(self, current_page: int, current_topics: List, config: Dict) -> bool:
         """判断是否应该停止翻页"""
         pagination = config.get('pagination', {})
@@ -40,8 +51,8 @@ class RebangScraper:
             return True
             
         return False
-    def scrape_platform_category(self, platform_code: str, category: str, extra_params: Optional[Dict] = None) -> Tuple[List[Dict], Dict[str, int]]:
-        """爬取单个平台的单个分类(支持多页和rank调整)"""
+    def scrape_platform_category(self, platform_code: str, category: str, extra_params: Optional[Dict] = None) -> Tuple[List[Topic], Dict[str, int]]:
+        """爬取单个平台的单个分类(支持多页和rank调整)，返回的话题为Topic对象，需要字典时调用to_dict()"""
         config = self.platform_config.get(platform_code)
         if not config:
             return [], {'total_count': 0, 'success_count': 0, 'error_count': 0, 'duplicate_count': 0}
@@ -56,6 +67,8 @@ class RebangScraper:
         total_stats = {'total_count': 0, 'success_count': 0, 'error_count': 0, 'duplicate_count': 0}
         
         page = start_page  # 从配置的起始页码开始
+        first_page_ok = False  # 首页是否成功获取，作为熔断器的成败依据
+        partial = False  # 中途翻页失败时本次榜单不完整，不据此判定掉榜
         while True:
             # 合并参数
             params = config['default_params'].copy()
@@ -68,30 +81,27 @@ class RebangScraper:
                 params['page']=page
                 # 获取数据
                 api_data = self.api_fetcher.fetch_data(config['base_url'], params)
+                if page == start_page:
+                    first_page_ok = api_data is not None
+                elif api_data is None:
+                    partial = True
                 if not api_data:
-                    logger.warning(f"平台 {platform_code} 分类 {category} 第 {page} 页无数据")
+                    logger.warning("平台 %s 分类 %s 第 %d 页无数据", platform_code, category, page)
                     break
                     
-                # 解析数据
-                topics = self.data_parser.parse_api_data(api_data, platform_code, category, config, page)
+                # 解析数据（排名按页码偏移，保证多页排名连续）
+                topics = self.data_parser.parse_batch(api_data, platform_code, category, config, page,
+                                                      rank_offset=(page - 1) * page_size)
+                # 页面未能完整解析时缺少的话题不能判定为掉榜
+                partial = partial or topics.truncated
                 if not topics:
-                    logger.info(f"平台 {platform_code} 分类 {category} 第 {page} 页无有效数据")
+                    logger.info("平台 %s 分类 %s 第 %d 页无有效数据", platform_code, category, page,
+                                extra={'sampled': True})
                     break
-                for topic in topics:
-                    topic['rank'] += (page - 1) * page_size
-                # 存储数据
-                current_hashes = [t['hash_id'] for t in topics]
-                self.storage_manager.mark_inactive_by_category(platform_code, current_hashes, category)
-                save_stats = self.storage_manager.save_topics(topics, self.deduplicator)
-                
-                # 更新统计
                 all_topics.extend(topics)
-                total_stats['total_count'] += save_stats['total_count']
-                total_stats['success_count'] += save_stats['success_count']
-                total_stats['error_count'] += save_stats['error_count']
-                total_stats['duplicate_count'] += save_stats['duplicate_count']
-                
-                logger.info(f"平台 {platform_code} 分类 {category} 第 {page} 页完成: 新增 {save_stats['success_count']} 条 (排名调整: +{(page-1)*page_size})")
+                logger.info("平台 %s 分类 %s 第 %d 页解析 %d 条 (排名调整: +%d)",
+                            platform_code, category, page, len(topics), (page - 1) * page_size,
+                            extra={'sampled': True})
                 
                 # 停止条件判断
                 if self.should_stop_pagination(page, topics, config):
@@ -100,10 +110,69 @@ class RebangScraper:
                 page += 1  # 递增页码
                 
             except Exception as e:
-                logger.error(f"平台 {platform_code} 分类 {category} 第 {page} 页异常: {e}")
+                logger.error("平台 %s 分类 %s 第 %d 页异常: %s", platform_code, category, page, e)
+                partial = True
                 break
         
+        self.circuit_breakers.record(platform_code, category, first_page_ok)
+        if all_topics:
+            total_stats = self.apply_board(platform_code, category, all_topics, partial)
         return all_topics, total_stats
+
+    def apply_board(self, platform_code: str, category: str, topics: List[Topic], partial: bool = False) -> Dict[str, int]:
+        """
+        将整个榜单与上次快照比对，按比对结果批量写库并通知下游
+        :param topics: 本次采集的全部话题（跨页，已按排名排列）
+        :param partial: 采集是否不完整（不完整时不判定掉榜）
+        :return: 写入统计
+        """
+        # 多工作进程模式下同一榜单可能由其他进程写入，每次从数据库重新加载快照
+        diff = self.snapshots.diff(platform_code, category, topics, partial=partial,
+                                   reload=self.lease_manager is not None)
+        db = self.storage_manager.db
+        try:
+            # 写入失败时回滚本榜单的全部写入，不影响外层事务
+            with db.savepoint():
+                stats = self.storage_manager.apply_diff(diff, self.deduplicator)
+        except Exception as e:
+            logger.error("平台 %s 分类 %s 写入异常: %s", platform_code, category, e)
+            self.snapshots.clear()  # 写入状态未知，下次从数据库重新加载
+            return {'total_count': len(topics), 'success_count': 0, 'error_count': len(topics), 'duplicate_count': 0}
+        # 快照更新和下游通知在事务提交后进行，回滚时不会发布未落库的变化
+        db.after_commit(lambda: self._board_committed(diff))
+        return stats
+
+    def _board_committed(self, diff: BoardDiff) -> None:
+        """榜单写入提交后更新快照并通知监听器"""
+        self.snapshots.commit(diff)
+        platform_code, category = diff.platform, diff.category
+        summary = diff.summary()
+        logger.info("平台 %s 分类 %s 榜单变化: 新上榜 %d, 掉榜 %d, 上升 %d, 下降 %d, 不变 %d",
+                    platform_code, category, summary['entered'], summary['exited'],
+                    summary['moved_up'], summary['moved_down'], summary['unchanged'])
+        for listener in self.diff_listeners:
+            try:
+                listener(diff)
+            except Exception as e:
+                logger.error("榜单变化监听器异常: %s", e)
+
+    def apply_config(self, change: ConfigChange) -> None:
+        """
+        在采集周期之间切换到新加载的平台配置
+        
+        未变化的平台保留快照、熔断器等状态；配置变化的平台重置熔断器（新配置可能已修复导致失败的问题），
+        被移除的榜单和平台丢弃快照与熔断器。
+        """
+        self.platform_config = change.settings.platforms
+        for platform_code in change.changed | change.removed:
+            self.circuit_breakers.discard(platform_code)
+        for platform_code, category in change.removed_boards:
+            self.snapshots.discard(platform_code, category)
+            self.circuit_breakers.discard(platform_code, category)
+
+    def add_diff_listener(self, listener: DiffListener) -> None:
+        """注册榜单变化监听器，每个榜单写库完成后以BoardDiff调用"""
+        self.diff_listeners.append(listener)
     
     def scrape_platform(self, platform_code: str, categories: List[str], extra_params: Optional[Dict] = None) -> Dict[str, Dict]:
         """
@@ -115,33 +184,73 @@ class RebangScraper:
         """
         category_results = {}
         for category in categories:
-            try:
-                start_time = datetime.now()
-                topics, stats = self.scrape_platform_category(platform_code, category, extra_params)
-                end_time = datetime.now()
-
-                status = 'success' if stats['success_count'] == stats['total_count'] else \
-                        'partial' if stats['success_count'] > 0 else 'failed'
-
-                # 保存日志
+            allowed, reason = self.circuit_breakers.allow(platform_code, category)
+            if not allowed:
+                # 熔断中的数据源直接跳过，不发请求，但记录失败日志便于排查
+                logger.warning("平台 %s 分类 %s 跳过: %s", platform_code, category, reason)
+                now = datetime.now().isoformat()
                 self.storage_manager.save_collection_log(
                     platform=platform_code,
                     category=category,
-                    status=status,
-                    stats=stats,
-                    start_time=start_time.isoformat(),
-                    end_time=end_time.isoformat()
+                    status='failed',
+                    stats={'total_count': 0, 'success_count': 0, 'error_count': 0, 'duplicate_count': 0},
+                    start_time=now,
+                    end_time=now,
+                    error_message=reason
                 )
+                category_results[category] = {'status': 'circuit_open', 'reason': reason}
+                continue
+            lease = None
+            if self.lease_manager:
+                lease = self.lease_manager.acquire(platform_code, category)
+                if lease is None:
+                    self.circuit_breakers.cancel(platform_code, category)
+                    category_results[category] = {'status': 'skipped', 'reason': '已由其他工作进程领取或本周期已运行'}
+                    continue
+            status = 'failed'
+            try:
+                start_time = datetime.now()
+                # 整个分类的写库（话题、掉榜、采集日志）在同一个事务中，结束时统一提交一次；
+                # 抓取期间尚未执行任何语句，不会长时间持有事务
+                with self.storage_manager.db.transaction(), get_cycle_profiler().span(platform_code, category):
+                    topics, stats = self.scrape_platform_category(platform_code, category, extra_params)
+                    end_time = datetime.now()
+
+                    status = 'success' if stats['success_count'] == stats['total_count'] else \
+                            'partial' if stats['success_count'] > 0 else 'failed'
+
+                    # 保存日志
+                    self.storage_manager.save_collection_log(
+                        platform=platform_code,
+                        category=category,
+                        status=status,
+                        stats=stats,
+                        start_time=start_time.isoformat(),
+                        end_time=end_time.isoformat()
+                    )
+                    if lease:
+                        # 提交前确认租约未被接管，否则整个榜单回滚，避免与接管的进程重复写入
+                        lease.confirm()
 
                 category_results[category] = {
                     'status': status,
                     'stats': stats,
                     'duration': (end_time - start_time).total_seconds()
                 }
-                logger.info(f"平台 {platform_code} 分类 {category} 完成: 成功 {stats['success_count']} 条")
+                logger.info("平台 %s 分类 %s 完成: 成功 %d 条", platform_code, category, stats['success_count'])
             except Exception as e:
-                logger.error(f"平台 {platform_code} 分类 {category} 异常: {e}")
-                category_results[category] = {'status': 'error', 'error': str(e)}
+                self.snapshots.clear()  # 事务已回滚，快照可能与数据库不一致
+                if lease and lease.lost:
+                    logger.warning("平台 %s 分类 %s 写入已回滚: %s", platform_code, category, e)
+                    category_results[category] = {'status': 'lease_lost', 'reason': str(e)}
+                    status = 'lease_lost'
+                else:
+                    logger.error("平台 %s 分类 %s 异常: %s", platform_code, category, e)
+                    category_results[category] = {'status': 'error', 'error': str(e)}
+                    status = 'error'
+            finally:
+                if lease:
+                    lease.release(status)
         return category_results
     
     def scrape_all_platforms(self, platform_categories: Dict[str, List[str]], platform_extra_params: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
@@ -153,21 +262,23 @@ class RebangScraper:
         """
         results = {}
         platform_extra_params = platform_extra_params or {}
+        self.api_fetcher.retry_budget.reset()  # 每个采集周期重新分配重试额度
         
         enabled_platforms = self.deduplicator.db.get_enabled_platforms()
         enabled_codes = {p['code'] for p in enabled_platforms}
         
         for platform_code, categories in platform_categories.items():
             if platform_code not in enabled_codes:
-                logger.info(f"平台 {platform_code} 已禁用，跳过所有分类")
+                logger.info("平台 %s 已禁用，跳过所有分类", platform_code)
                 continue
                 
             try:
                 extra_params = platform_extra_params.get(platform_code, {})
-                platform_result = self.scrape_platform(platform_code, categories, extra_params)
+                with get_cycle_profiler().span(platform_code):
+                    platform_result = self.scrape_platform(platform_code, categories, extra_params)
                 results[platform_code] = platform_result
             except Exception as e:
-                logger.error(f"平台 {platform_code} 整体异常: {e}")
+                logger.error("平台 %s 整体异常: %s", platform_code, e)
                 results[platform_code] = {'status': 'error', 'error': str(e)}
                 
         return results
@@ -195,9 +306,41 @@ def run_scheduled_scraping(platform_categories: Dict[str, List[str]],
             for category_result in platform_results.values():
                 if 'stats' in category_result:
                     total_success += category_result['stats']['success_count']
-    logger.info(f"定时采集完成，总成功数: {total_success}")
+    logger.info("定时采集完成，总成功数: %d", total_success)
+    fetch_stats = scraper.api_fetcher.get_stats()
+    for host, stats in fetch_stats['rate_limiter'].items():
+        logger.info("主机 %s 限流统计: 请求 %d 次, 被限流 %d 次, 累计等待 %.2f秒, 最长等待 %.2f秒",
+                    host, stats['requests'], stats['throttled'], stats['wait_seconds'], stats['max_wait_seconds'])
+    logger.info("本周期重试额度使用: %d/%d", fetch_stats['retry_budget']['used'], fetch_stats['retry_budget']['limit'])
+    for name, state in scraper.circuit_breakers.get_states().items():
+        if state['state'] != 'closed':
+            logger.warning("熔断器 %s 状态: %s, 失败率 %.0f%%, %.0f秒后探测",
+                           name, state['state'], state['failure_rate'] * 100, state['retry_in'])
+    hash_stats = get_hash_cache().get_stats()
+    logger.info("话题哈希缓存: %d 条, 命中率 %.1f%%", hash_stats['size'], hash_stats['hit_rate'] * 100)
+    if FEED_CONFIG['enabled']:
+        feed_stats = get_change_feed().get_stats()
+        logger.info("变更推送: 下一偏移量 %d, 已写入 %d 条, 丢弃 %d 条",
+                    feed_stats['next_offset'], feed_stats['published'], feed_stats['dropped'])
     return results
+
+def run_worker_scraping(platform_categories: Dict[str, List[str]],
+                        platform_extra_params: Optional[Dict[str, Dict]] = None):
+    """
+    多工作进程模式的定时采集：每个(平台, 分类)通过数据库租约领取，
+    多个进程/主机可同时运行本函数，同一任务每个周期只执行一次
+    """
+    from main.scraper.work_lease import LeaseManager
+    
+    scraper = get_scraper()
+    if scraper.lease_manager is None:
+        scraper.lease_manager = LeaseManager()
+        scraper.lease_manager.ensure_table()
+    scraper.lease_manager.register_jobs(platform_categories)
+    logger.info("工作进程 %s 开始领取采集任务", scraper.lease_manager.worker_id)
+    return run_scheduled_scraping(platform_categories, platform_extra_params)
 if __name__ == "__main__":
+    setup_logging()
     # 初始化打印
     print(f"\n{'='*60}")
     print(f"热榜今日爬虫 - 开始采集 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
@@ -0,0 +1,226 @@
+"""
+榜单快照差异模块 - 在内存中保存每个(平台, 分类)上一次的排名列表，与本次采集结果做O(n)比对
+
+比对结果(BoardDiff)同时驱动数据库批量写入和下游消费者：
+  entered   新上榜
+  exited    掉出榜单
+  moved     仍在榜，排名变化（rank_change = 旧排名 - 新排名，正数表示上升）
+  unchanged 仍在榜，排名不变（热度可能变化）
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from main.database.database_manager import DatabaseManager, get_db_manager
+from main.scraper.topic import Topic
+
+ENTERED = 'entered'
+EXITED = 'exited'
+MOVED = 'moved'
+UNCHANGED = 'unchanged'
+
+# 与get_board_topics中GROUP_CONCAT的分隔符一致
+TAG_SEPARATOR = '\x1f'
+
+
+class SnapshotEntry:
+    """快照中的一条话题"""
+
+    __slots__ = ('topic_id', 'rank', 'heat_value', 'title', 'tags')
+
+    def __init__(self, topic_id: Optional[int], rank: int, heat_value: Optional[int],
+                 title: str, tags: Optional[List[str]]):
+        self.topic_id = topic_id
+        self.rank = rank
+        self.heat_value = heat_value
+        self.title = title
+        self.tags = tags  # None表示未知（不据此判断标签是否变化）
+
+
+class TopicEvent:
+    """单条话题的变化事件"""
+
+    __slots__ = ('kind', 'hash_id', 'title', 'rank', 'old_rank', 'rank_change',
+                 'heat_value', 'heat_delta', 'topic_id', 'topic', 'tags_changed')
+
+    def __init__(self, kind: str, hash_id: str, title: str, rank: Optional[int], old_rank: Optional[int],
+                 heat_value: Optional[int], old_heat: Optional[int], topic_id: Optional[int] = None,
+                 topic: Optional[Topic] = None, tags_changed: bool = False):
+        self.kind = kind
+        self.hash_id = hash_id
+        self.title = title
+        self.rank = rank
+        self.old_rank = old_rank
+        self.rank_change = old_rank - rank if rank is not None and old_rank is not None else 0
+        self.heat_value = heat_value
+        self.heat_delta = heat_value - old_heat if heat_value is not None and old_heat is not None else None
+        self.topic_id = topic_id
+        self.topic = topic
+        self.tags_changed = tags_changed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典（供下游消费者使用）"""
+        return {
+            'kind': self.kind,
+            'hash_id': self.hash_id,
+            'title': self.title,
+            'rank': self.rank,
+            'old_rank': self.old_rank,
+            'rank_change': self.rank_change,
+            'heat_value': self.heat_value,
+            'heat_delta': self.heat_delta,
+            'topic_id': self.topic_id,
+        }
+
+
+class BoardDiff:
+    """一次采集与上一快照的比对结果"""
+
+    __slots__ = ('platform', 'category', 'scraped_at', 'partial', 'entered', 'moved', 'unchanged', 'exited')
+
+    def __init__(self, platform: str, category: str, scraped_at: datetime, partial: bool):
+        self.platform = platform
+        self.category = category
+        self.scraped_at = scraped_at
+        self.partial = partial  # 本次采集不完整时不产生exited事件
+        self.entered: List[TopicEvent] = []
+        self.moved: List[TopicEvent] = []
+        self.unchanged: List[TopicEvent] = []
+        self.exited: List[TopicEvent] = []
+
+    @property
+    def retained(self) -> List[TopicEvent]:
+        """仍在榜的话题（moved + unchanged）"""
+        return self.moved + self.unchanged
+
+    def events(self) -> List[TopicEvent]:
+        """所有事件，按新排名排列，掉榜事件在最后"""
+        current = sorted(self.entered + self.moved + self.unchanged, key=lambda event: event.rank)
+        return current + self.exited
+
+    def summary(self) -> Dict[str, int]:
+        """各类事件数量"""
+        return {
+            ENTERED: len(self.entered),
+            EXITED: len(self.exited),
+            MOVED: len(self.moved),
+            UNCHANGED: len(self.unchanged),
+            'moved_up': sum(1 for event in self.moved if event.rank_change > 0),
+            'moved_down': sum(1 for event in self.moved if event.rank_change < 0),
+        }
+
+
+class SnapshotStore:
+    """按(平台, 分类)保存上一次的排名快照，首次使用时从数据库中的活跃话题初始化"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None):
+        self.db = db or get_db_manager()
+        self._snapshots: Dict[Tuple[str, str], Dict[str, SnapshotEntry]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, platform_code: str, category: str) -> Dict[str, SnapshotEntry]:
+        """从数据库加载榜单当前活跃话题作为快照"""
+        snapshot = {}
+        for row in self.db.get_board_topics(platform_code, category):
+            snapshot[row['hash_id']] = SnapshotEntry(
+                topic_id=row['id'],
+                rank=row['rank'],
+                heat_value=row['heat_value'],
+                title=row['title'],
+                tags=row['tags'].split(TAG_SEPARATOR) if row['tags'] else [],
+            )
+        with self._lock:
+            self._snapshots[(platform_code, category)] = snapshot
+        return snapshot
+
+    def get(self, platform_code: str, category: str, reload: bool = False) -> Dict[str, SnapshotEntry]:
+        """
+        获取榜单快照
+
+        Args:
+            reload: 强制从数据库重新加载（多工作进程模式下同一榜单可能由其他进程写入）
+        """
+        with self._lock:
+            snapshot = self._snapshots.get((platform_code, category))
+        if snapshot is None or reload:
+            snapshot = self.load(platform_code, category)
+        return snapshot
+
+    def diff(self, platform_code: str, category: str, topics: List[Topic],
+             partial: bool = False, reload: bool = False) -> BoardDiff:
+        """
+        将本次采集的排名列表与快照比对
+
+        Args:
+            platform_code: 平台代码
+            category: 分类名称
+            topics: 本次采集的话题（已按排名排列，可跨多页）
+            partial: 本次采集是否不完整（中途翻页失败），不完整时不判定掉榜
+            reload: 比对前强制从数据库重新加载快照
+
+        Returns:
+            BoardDiff
+        """
+        previous = self.get(platform_code, category, reload=reload)
+        scraped_at = topics[0].scraped_at if topics else datetime.now()
+        result = BoardDiff(platform_code, category, scraped_at, partial)
+        seen = set()
+        for topic in topics:
+            hash_id = topic.hash_id
+            if hash_id in seen:
+                continue
+            seen.add(hash_id)
+            entry = previous.get(hash_id)
+            if entry is None:
+                result.entered.append(TopicEvent(ENTERED, hash_id, topic.title, topic.rank, None,
+                                                 topic.heat_value, None, topic=topic))
+                continue
+            event = TopicEvent(
+                MOVED if entry.rank != topic.rank else UNCHANGED, hash_id, topic.title,
+                topic.rank, entry.rank, topic.heat_value, entry.heat_value,
+                topic_id=entry.topic_id, topic=topic,
+                tags_changed=entry.tags is not None and set(entry.tags) != set(topic.tags)
+            )
+            (result.moved if event.kind == MOVED else result.unchanged).append(event)
+
+        if not partial:
+            for hash_id, entry in previous.items():
+                if hash_id not in seen:
+                    result.exited.append(TopicEvent(EXITED, hash_id, entry.title, None, entry.rank,
+                                                    None, entry.heat_value, topic_id=entry.topic_id))
+        return result
+
+    def commit(self, diff: BoardDiff) -> None:
+        """
+        数据库写入完成后，用比对结果更新快照
+
+        新上榜但写入失败（没有topic_id）的话题不进入快照，下次仍按新上榜处理；
+        不完整的采集保留未出现的旧话题。
+        """
+        key = (diff.platform, diff.category)
+        with self._lock:
+            previous = self._snapshots.get(key, {})
+            snapshot = dict(previous) if diff.partial else {}
+            for event in diff.entered + diff.moved + diff.unchanged:
+                if event.topic_id is None:
+                    continue
+                topic = event.topic
+                snapshot[event.hash_id] = SnapshotEntry(event.topic_id, topic.rank, topic.heat_value,
+                                                        topic.title, topic.tags)
+            for event in diff.exited:
+                snapshot.pop(event.hash_id, None)
+            self._snapshots[key] = snapshot
+
+    def clear(self) -> None:
+        """清空所有快照（下次使用时从数据库重新加载）"""
+        with self._lock:
+            self._snapshots.clear()
+
+    def discard(self, platform_code: str, category: str) -> None:
+        """丢弃单个榜单的快照（榜单不再采集时释放内存）"""
+        with self._lock:
+            self._snapshots.pop((platform_code, category), None)
+
+
+DiffListener = Callable[[BoardDiff], None]
@@ -1,58 +1,147 @@
+import logging
 from datetime import datetime
-from typing import List, Dict
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Union
+from config.platform_config import CACHE_CONFIG
+from main.database.hash_cache import get_hash_cache
 from main.database.database_manager import (
     mark_inactive_topics, 
     save_hot_topic, 
     save_collection_log,
-    get_db_manager
+    get_db_manager,
+    invalidate_platform_cache
 )
 from main.scraper.deduplicator import Deduplicator
+from main.scraper.snapshot_diff import BoardDiff
+from main.scraper.topic import Topic
+
+logger = logging.getLogger(__name__)
 
 class StorageManager:
-    def __init__(self):
+    def __init__(self, deduplicator: Optional[Deduplicator] = None):
         self.db = get_db_manager()
-        self.deduplicator = Deduplicator()
-    def save_topics(self, topics: List[Dict], deduplicator) -> Dict[str, int]:
+        # 由调用方注入共享的去重器，未注入时才自行创建
+        self.deduplicator = deduplicator or Deduplicator()
+    def save_topics(self, topics: Iterable[Union[Topic, Dict]], deduplicator: Optional[Deduplicator] = None) -> Dict[str, int]:
+        deduplicator = deduplicator or self.deduplicator
+        # 兼容外部传入的话题字典，流水线内部直接传TopicBatch/Topic
+        topics = [Topic.from_dict(t) if isinstance(t, dict) else t for t in topics]
         stats = {'total_count': len(topics), 'success_count': 0, 'error_count': 0, 'duplicate_count': 0}
-        for topic in topics:
-            try:
-                is_duplicate, existing_id = deduplicator.is_duplicate(topic)
-                if is_duplicate and existing_id:
-                    update_data = {
-                        'rank': topic['rank'],
-                        'heat_value': topic['heat_value'],
-                        'last_seen_at': datetime.now().isoformat(),
-                        'is_active': True
-                    }
-                    if 'tags' in topic and topic['tags']:
-                        update_data['tags'] = topic['tags']
-                    if self.db.update_hot_topic(existing_id, update_data):
-                        stats['success_count'] += 1
-                    stats['duplicate_count'] += 1
+        now = datetime.now()
+        # 整批一个事务、统一提交一次；每条话题一个保存点，单条失败只回滚该条
+        with self.db.transaction():
+            for topic in topics:
+                try:
+                    with self.db.savepoint():
+                        is_duplicate, existing_id = deduplicator.is_duplicate(topic)
+                        if is_duplicate and existing_id:
+                            update_data = {
+                                'rank': topic.rank,
+                                'heat_value': topic.heat_value,
+                                'last_seen_at': now,
+                                'is_active': True
+                            }
+                            if topic.tags:
+                                update_data['tags'] = topic.tags
+                            if self.db.update_hot_topic(existing_id, update_data):
+                                stats['success_count'] += 1
+                            stats['duplicate_count'] += 1
+                        else:
+                            topic_data = topic.to_dict()
+                            topic_data['first_seen_at'] = now
+                            topic_data['last_seen_at'] = now
+                            if save_hot_topic(topic_data):
+                                stats['success_count'] += 1
+                            else:
+                                stats['error_count'] += 1
+                except Exception as e:
+                    stats['error_count'] += 1
+                    logger.error("保存话题失败 %s/%s #%s %s: %s", topic.platform, topic.category,
+                                 topic.rank, topic.title, e, exc_info=True)
+            # 事务提交后再使相关平台的热榜读缓存失效
+            if stats['success_count'] > 0:
+                for platform_code in {topic.platform for topic in topics}:
+                    self.db.after_commit(partial(invalidate_platform_cache, platform_code))
+        return stats
+    
+    def apply_diff(self, diff: BoardDiff, deduplicator: Optional[Deduplicator] = None) -> Dict[str, int]:
+        """按榜单比对结果批量写库：仍在榜的一次批量更新，掉榜的一次批量置为失效，新上榜的逐条入库"""
+        deduplicator = deduplicator or self.deduplicator
+        retained = diff.retained
+        now = datetime.now()
+        stats = {'total_count': len(diff.entered) + len(retained), 'success_count': 0,
+                 'error_count': 0, 'duplicate_count': len(retained)}
+
+        with self.db.transaction():
+            if retained:
+                affected = self.db.update_topic_positions([
+                    (event.rank, event.rank_change, event.heat_value, event.topic.url, event.topic_id)
+                    for event in retained
+                ])
+                if affected > 0:
+                    stats['success_count'] += len(retained)
+                    # 与数据库保持一致：这些话题的last_seen_at刚被刷新（事务回滚时缓存会被清空）
+                    if CACHE_CONFIG['hash_cache_enabled']:
+                        hash_cache = get_hash_cache()
+                        for event in retained:
+                            hash_cache.mark_seen(event.hash_id, event.topic_id, event.rank, now)
                 else:
-                    topic_data = {**topic,
-                        'first_seen_at': datetime.now().isoformat(),
-                        'last_seen_at': datetime.now().isoformat(),
-                        'tags': topic.get('tags', [])
-                    }
-                    if save_hot_topic(topic_data):
-                        stats['success_count'] += 1
-                    else:
-                        stats['error_count'] += 1
-            except Exception as e:
-                stats['error_count'] += 1
+                    stats['error_count'] += len(retained)
+                # 标签有变化的话题按差异一次性同步
+                changed_tags = {event.topic_id: event.topic.tags for event in retained if event.tags_changed}
+                if changed_tags:
+                    self.db.sync_topic_tags(changed_tags)
+
+            for event in diff.entered:
+                topic = event.topic
+                try:
+                    with self.db.savepoint():
+                        is_duplicate, existing_id = deduplicator.is_duplicate(topic)
+                        if is_duplicate and existing_id:
+                            update_data = {'rank': topic.rank, 'heat_value': topic.heat_value,
+                                           'last_seen_at': now, 'is_active': True}
+                            if topic.tags:
+                                update_data['tags'] = topic.tags
+                            if self.db.update_hot_topic(existing_id, update_data):
+                                stats['success_count'] += 1
+                            stats['duplicate_count'] += 1
+                            event.topic_id = existing_id
+                        else:
+                            topic_data = topic.to_dict()
+                            topic_data['first_seen_at'] = now
+                            topic_data['last_seen_at'] = now
+                            topic_id = save_hot_topic(topic_data)
+                            if topic_id:
+                                stats['success_count'] += 1
+                                event.topic_id = topic_id
+                            else:
+                                stats['error_count'] += 1
+                except Exception as e:
+                    stats['error_count'] += 1
+                    logger.error("保存新上榜话题失败 %s/%s #%s %s: %s", topic.platform, topic.category,
+                                 topic.rank, topic.title, e, exc_info=True)
+
+            exited_ids = [event.topic_id for event in diff.exited if event.topic_id]
+            deactivated = self.db.deactivate_topics(exited_ids)
+            if deactivated > 0 and CACHE_CONFIG['hash_cache_enabled']:
+                get_hash_cache().mark_inactive(event.hash_id for event in diff.exited)
+
+            if stats['success_count'] > 0 or deactivated > 0:
+                self.db.after_commit(partial(invalidate_platform_cache, diff.platform))
         return stats
     
     def mark_inactive_by_category(self, platform_code: str, current_hashes: List[str], category: str):
         mark_inactive_topics(platform_code, current_hashes, category=category)
     
     def save_collection_log(self, platform: str, category: str, status: str, 
-                        stats: Dict, start_time: str, end_time: str):
+                        stats: Dict, start_time: str, end_time: str,
+                        error_message: str = None):
         save_collection_log(
             platform=platform,
             category=category,
             status=status,
             stats=stats,
             start_time=start_time,
-            end_time=end_time
+            end_time=end_time,
+            error_message=error_message
         )
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+话题记录模块 - 采集流水线内部使用的紧凑话题类型
+
+解析、去重、入库各环节之间传递Topic对象（__slots__，无实例字典），
+同一页的话题共享一个采集时间；仅在对外接口处通过to_dict转换为原有的字典结构。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Topic:
+    """单条热搜话题"""
+
+    __slots__ = ('platform', 'category', 'page', 'rank', 'title', 'heat_value',
+                 'url', 'tags', 'hash_id', 'scraped_at')
+
+    def __init__(self, platform: str, category: str, page: int, rank: int, title: str,
+                 heat_value: Optional[int], url: str, tags: List[str], hash_id: str,
+                 scraped_at: datetime):
+        self.platform = platform
+        self.category = category
+        self.page = page
+        self.rank = rank
+        self.title = title
+        self.heat_value = heat_value
+        self.url = url
+        self.tags = tags
+        self.hash_id = hash_id
+        self.scraped_at = scraped_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为原有的话题字典结构（DataParser.parse_api_data的返回格式）
+
+        Returns:
+            话题字典
+        """
+        return {
+            "platform": self.platform,
+            "category": self.category,
+            "page": self.page,
+            "rank": self.rank,
+            "timestamp": self.scraped_at.isoformat(),
+            "title": self.title,
+            "heat_value": self.heat_value,
+            "url": self.url,
+            "tags": self.tags,
+            "hash_id": self.hash_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Topic':
+        """
+        由话题字典构造（兼容外部传入的字典）
+
+        Args:
+            data: 话题字典，timestamp可为ISO字符串或datetime
+
+        Returns:
+            Topic对象
+        """
+        timestamp = data.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return cls(
+            platform=data['platform'],
+            category=data.get('category'),
+            page=data.get('page', 1),
+            rank=data['rank'],
+            title=data['title'],
+            heat_value=data.get('heat_value'),
+            url=data.get('url', ''),
+            tags=data.get('tags', []),
+            hash_id=data['hash_id'],
+            scraped_at=timestamp or datetime.now(),
+        )
+
+    def __repr__(self) -> str:
+        return f"Topic({self.platform}/{self.category} #{self.rank} {self.title!r})"
+
+
+class TopicBatch:
+    """同一平台、分类、页码的一批话题（truncated表示页面数据未能完整解析，本批只含部分话题）"""
+
+    __slots__ = ('platform', 'category', 'page', 'scraped_at', 'topics', 'truncated')
+
+    def __init__(self, platform: str, category: str, page: int,
+                 scraped_at: Optional[datetime] = None, topics: Optional[List[Topic]] = None):
+        self.platform = platform
+        self.category = category
+        self.page = page
+        self.scraped_at = scraped_at or datetime.now()
+        self.topics = topics if topics is not None else []
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Topic]:
+        return iter(self.topics)
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    def hashes(self) -> List[str]:
+        """本批话题的hash_id列表"""
+        return [topic.hash_id for topic in self.topics]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """转换为话题字典列表"""
+        return [topic.to_dict() for topic in self.topics]
@@ -4,12 +4,11 @@
 
 import re
 import hashlib
-import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
-from logging.handlers import RotatingFileHandler
-from config.platform_config import TAG_PATTERNS, CATEGORY_KEYWORDS, PROCESSING_CONFIG
+from main.scraper import json_codec
+from config.platform_config import TAG_PATTERNS, CATEGORY_KEYWORDS, PROCESSING_CONFIG, HASH_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -64,11 +63,21 @@ def extract_tags(text: str) -> List[str]:
     max_tags = PROCESSING_CONFIG['max_tags_count']
     return tags[:max_tags]
 
+def _get_hash_func(algorithm: str):
+    """根据配置选择128位哈希函数"""
+    if algorithm == 'md5':
+        return hashlib.md5
+    if algorithm == 'blake2b':
+        return lambda data: hashlib.blake2b(data, digest_size=16)
+    raise ValueError(f"不支持的哈希算法: {algorithm}")
+
+_hash_func = _get_hash_func(HASH_CONFIG['algorithm'])
+
 def generate_hash(content: str) -> str:
     """
-    生成内容哈希值
+    生成内容哈希值（32位十六进制字符串，入库时以BINARY(16)存储）
     """
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
+    return _hash_func(content.encode('utf-8')).hexdigest()
 
 def categorize_topic(title: str) -> str:
     """
@@ -150,9 +159,9 @@ def safe_json_loads(data: str, default: Any = None) -> Any:
     安全的JSON解析
     """
     try:
-        return json.loads(data)
-    except (json.JSONDecodeError, TypeError):
-        logger.warning(f"JSON解析失败: {data}")
+        return json_codec.loads(data)
+    except (json_codec.JSONDecodeError, TypeError):
+        logger.warning("JSON解析失败: %s", data)
         return default
 
 def safe_parse_datetime(date_value: Any) -> Optional[datetime]:
@@ -181,11 +190,11 @@ def safe_parse_datetime(date_value: Any) -> Optional[datetime]:
                 except ValueError:
                     continue
                     
-        logger.warning(f"无法解析日期字符串: {date_value}")
+        logger.warning("无法解析日期字符串: %s", date_value)
         return None
         
     # 其他类型
-    logger.warning(f"不支持的日期类型: {type(date_value)}")
+    logger.warning("不支持的日期类型: %s", type(date_value))
     return None
 def process_tags(tags, max_length=100):
     """
@@ -216,9 +225,9 @@ def process_tags(tags, max_length=100):
 def parse_json_string(s: str) -> Optional[List[Dict]]:
     """将JSON字符串解析为数组（处理可能的格式错误）"""
     try:
-        return json.loads(s)
-    except json.JSONDecodeError as e:
-        logger.warning(f"JSON字符串解析失败: {e}, 原始字符串: {s[:100]}")
+        return json_codec.loads(s)
+    except json_codec.JSONDecodeError as e:
+        logger.warning("JSON字符串解析失败: %s, 原始字符串: %s", e, s[:100])
         return None
     
 def safe_fromisoformat(date_str: Any) -> Optional[datetime]:
@@ -232,7 +241,7 @@ def safe_fromisoformat(date_str: Any) -> Optional[datetime]:
         datetime对象或None（转换失败时）
     """
     if not isinstance(date_str, str):
-        logger.warning(f"尝试将非字符串类型转换为datetime: {type(date_str)}")
+        logger.warning("尝试将非字符串类型转换为datetime: %s", type(date_str))
         return None
         
     try:
@@ -245,7 +254,7 @@ def safe_fromisoformat(date_str: Any) -> Optional[datetime]:
             except ValueError:
                 continue
                 
-        logger.warning(f"无法解析日期字符串: {date_str}")
+        logger.warning("无法解析日期字符串: %s", date_str)
         return None
     
 def safe_get(data, key, default=None):
@@ -255,18 +264,3 @@ def safe_get(data, key, default=None):
     elif isinstance(data, list) and isinstance(key, int) and 0 <= key < len(data):
         return data[key]
     return default
-
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            RotatingFileHandler(
-                'logs/hot_topic.log', 
-                maxBytes=10*1024*1024,  # 10MB
-                backupCount=5,
-                encoding='utf-8'  # 明确指定编码
-            ),
-            logging.StreamHandler()
-        ]
-    )
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+工作租约模块 - 多进程/多主机通过数据库租约表分摊(平台, 分类)采集任务
+"""
+
+import logging
+import os
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from mysql.connector import Error
+
+from config.platform_config import WORKER_CONFIG
+from main.database.database_manager import DatabaseManager, get_db_manager
+
+logger = logging.getLogger(__name__)
+
+LEASE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS scrape_leases (
+        platform_code VARCHAR(20) NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        owner VARCHAR(100) NULL,
+        lease_until TIMESTAMP NULL,
+        heartbeat_at TIMESTAMP NULL,
+        claimed_at TIMESTAMP NULL,
+        last_run_at TIMESTAMP NULL,
+        last_status VARCHAR(20) NULL,
+        PRIMARY KEY (platform_code, category)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+
+class LeaseLostError(RuntimeError):
+    """租约已过期并被其他工作进程接管，本进程不能再写入该任务的数据"""
+
+
+class Lease:
+    """已领取的任务租约，持有期间由后台线程定期续约"""
+
+    def __init__(self, manager: 'LeaseManager', platform_code: str, category: str):
+        self.manager = manager
+        self.platform_code = platform_code
+        self.category = category
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._heartbeat_loop,
+            name=f"lease-heartbeat-{platform_code}-{category}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        # 心跳线程使用独立连接，避免与采集线程争用同一个连接
+        db = DatabaseManager(self.manager.db.config)
+        try:
+            while not self._stop.wait(self.manager.config['heartbeat_seconds']):
+                if not self.manager.heartbeat(self.platform_code, self.category, db=db):
+                    self.lost = True
+                    logger.warning("租约 %s/%s 已失效，可能已被其他工作进程接管", self.platform_code, self.category)
+                    break
+        finally:
+            db.disconnect()
+
+    def confirm(self) -> None:
+        """
+        在任务事务提交前确认租约仍归本进程所有
+
+        在调用方的事务内续约：续约语句锁住租约行直到事务提交，提交前其他进程无法接管；
+        租约已被接管（或心跳线程已发现失效）时抛出异常，调用方的事务随之整体回滚。
+
+        Raises:
+            LeaseLostError: 租约已不归本进程所有
+        """
+        if not self.lost and self.manager.heartbeat(self.platform_code, self.category):
+            return
+        self.lost = True
+        raise LeaseLostError(f"租约 {self.platform_code}/{self.category} 已被其他工作进程接管")
+
+    def release(self, status: str) -> None:
+        """
+        停止续约并释放租约，记录本次运行时间和状态
+
+        Args:
+            status: 本次采集状态
+        """
+        self._stop.set()
+        self._thread.join()
+        self.manager.release(self.platform_code, self.category, status)
+
+
+class LeaseManager:
+    """基于MySQL租约表的任务分配：每个(平台, 分类)每个周期只被一个工作进程执行"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, worker_id: Optional[str] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        """
+        初始化租约管理器
+
+        Args:
+            db: 数据库管理器，默认使用全局单例
+            worker_id: 工作进程标识，默认为"主机名:进程号"
+            config: 工作模式配置，默认使用WORKER_CONFIG
+        """
+        self.db = db or get_db_manager()
+        self.config = config or WORKER_CONFIG
+        self.worker_id = worker_id or self.config.get('worker_id') or f"{socket.gethostname()}:{os.getpid()}"
+
+    def ensure_table(self) -> None:
+        """创建租约表（已存在则跳过）"""
+        self.db.execute_update(LEASE_TABLE_DDL)
+
+    def register_jobs(self, platform_categories: Dict[str, List[str]]) -> int:
+        """
+        登记所有(平台, 分类)任务，已存在的任务保持不变
+
+        Returns:
+            新登记的任务数
+        """
+        params_list = [
+            (platform_code, category)
+            for platform_code, categories in platform_categories.items()
+            for category in categories
+        ]
+        if not params_list:
+            return 0
+        return self.db.execute_many(
+            "INSERT IGNORE INTO scrape_leases (platform_code, category) VALUES (%s, %s)",
+            params_list
+        )
+
+    def try_claim(self, platform_code: str, category: str) -> bool:
+        """
+        尝试领取任务：空闲且本周期未运行过，或原持有者租约已过期
+
+        Returns:
+            是否领取成功
+        """
+        min_interval = self.config['interval_seconds'] - self.config['interval_slack_seconds']
+        affected = self.db.execute_update("""
+            UPDATE scrape_leases
+            SET owner = %s,
+                lease_until = NOW() + INTERVAL %s SECOND,
+                heartbeat_at = NOW(),
+                claimed_at = NOW()
+            WHERE platform_code = %s AND category = %s
+            AND (
+                (owner IS NULL AND (claimed_at IS NULL OR claimed_at <= NOW() - INTERVAL %s SECOND))
+                OR (owner IS NOT NULL AND lease_until < NOW())
+            )
+        """, (self.worker_id, self.config['lease_seconds'], platform_code, category, min_interval))
+        return affected == 1
+
+    def acquire(self, platform_code: str, category: str) -> Optional[Lease]:
+        """
+        领取任务并启动心跳
+
+        Returns:
+            租约对象，未领取到时返回None
+        """
+        if not self.try_claim(platform_code, category):
+            return None
+        logger.info("工作进程 %s 领取任务 %s/%s", self.worker_id, platform_code, category)
+        return Lease(self, platform_code, category)
+
+    def heartbeat(self, platform_code: str, category: str, db: Optional[DatabaseManager] = None) -> bool:
+        """
+        续约：仅当租约仍归本进程所有时延长过期时间
+
+        先加锁读取持有者再更新：同一秒内重复续约时NOW()不变，UPDATE不修改任何行，
+        影响行数为0，不能据此判断租约是否仍归本进程所有。
+        在调用方的事务内执行时并入该事务，行锁保持到事务结束。
+
+        Returns:
+            续约是否成功
+        """
+        db = db or self.db
+        try:
+            with db.transaction():
+                rows = db.execute_query("""
+                    SELECT owner FROM scrape_leases
+                    WHERE platform_code = %s AND category = %s
+                    FOR UPDATE
+                """, (platform_code, category))
+                if not rows or rows[0]['owner'] != self.worker_id:
+                    return False
+                db.execute_update("""
+                    UPDATE scrape_leases
+                    SET lease_until = NOW() + INTERVAL %s SECOND, heartbeat_at = NOW()
+                    WHERE platform_code = %s AND category = %s AND owner = %s
+                """, (self.config['lease_seconds'], platform_code, category, self.worker_id))
+        except Error as e:
+            logger.error("续约 %s/%s 失败: %s", platform_code, category, e)
+            return False
+        return True
+
+    def release(self, platform_code: str, category: str, status: str) -> bool:
+        """
+        释放租约并记录运行结果
+
+        Returns:
+            是否释放成功（租约已被接管时返回False）
+        """
+        affected = self.db.execute_update("""
+            UPDATE scrape_leases
+            SET owner = NULL, lease_until = NULL, last_run_at = NOW(), last_status = %s
+            WHERE platform_code = %s AND category = %s AND owner = %s
+        """, (status, platform_code, category, self.worker_id))
+        return affected == 1
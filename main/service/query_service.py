@@ -0,0 +1,406 @@
+"""
+只读查询服务 - 基于asyncio的轻量HTTP服务，以JSON接口提供热榜、搜索和统计查询
+
+  GET /api/hot-topics?limit=20             各平台热榜（get_all_platform_hot_topics）
+  GET /api/hot-topics/<platform>?limit=50  单个平台热榜
+  GET /api/search?q=关键词&limit=50         搜索话题（search_topics）
+  GET /api/statistics                      统计信息（get_statistics）
+  GET /api/health                          服务与缓存统计（不缓存）
+
+数据库查询在固定大小的线程池中执行，每个线程持有独立连接；响应缓存保存编码后的JSON
+及其gzip版本和ETag，命中时在事件循环中直接返回，不经过线程池；相同查询并发到达时只查询一次。
+跟随变更推送日志按平台失效缓存，数据更新后无需等待TTL过期。查询失败时返回500，失败结果不进入缓存。
+开启配置热加载时定期检查外部配置文件，单个平台接口按当前生效的平台列表校验，与采集器一致。
+
+用法:
+    python -m main.service.query_service [--host 127.0.0.1] [--port 8080]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from config.platform_config import FEED_CONFIG, HOT_RELOAD_CONFIG, SERVICE_CONFIG
+from main.database.database_manager import DatabaseManager
+from main.database.query_cache import ALL_PLATFORMS, QueryCache
+from main.scraper import json_codec
+from main.scraper.change_feed import FeedReader
+from main.scraper.config_loader import ConfigLoader, get_config_loader
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[str, str]]
+
+
+class CachedResponse:
+    """编码后的响应体（含预压缩的gzip版本和ETag）"""
+
+    __slots__ = ('body', 'gzip_body', 'etag')
+
+    def __init__(self, body: bytes, gzip_level: int, gzip_min_bytes: int):
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        if len(body) >= gzip_min_bytes:
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip格式
+            self.gzip_body = compressor.compress(body) + compressor.flush()
+        else:
+            self.gzip_body = None
+
+
+class HttpError(Exception):
+    """请求参数错误等可直接返回给客户端的错误"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QueryService:
+    """只读查询服务"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 db_factory: Callable[[], DatabaseManager] = partial(DatabaseManager, raise_errors=True),
+                 config_loader: Optional[ConfigLoader] = None):
+        """
+        初始化查询服务
+
+        Args:
+            config: 服务配置，默认使用SERVICE_CONFIG
+            db_factory: 为每个查询线程创建数据库管理器的工厂（查询出错时应抛出异常，失败的结果不会被缓存）
+            config_loader: 平台配置加载器，默认使用全局实例（未开启热加载时即内置配置）
+        """
+        self.config = {**SERVICE_CONFIG, **(config or {})}
+        self.cache = QueryCache(max_size=self.config['cache_max_size'],
+                                ttl_seconds=self.config['cache_ttl_seconds'])
+        self._db_factory = db_factory
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.config['db_pool_size'],
+                                            thread_name_prefix='query-db')
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._feed_task: Optional[asyncio.Task] = None
+        self._config_task: Optional[asyncio.Task] = None
+        self.config_loader = config_loader or get_config_loader()
+        self.stats = {'requests': 0, 'not_modified': 0, 'coalesced': 0, 'db_queries': 0, 'errors': 0}
+
+    # ---- 数据库查询（在线程池中执行） ----
+
+    def _db(self) -> DatabaseManager:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._db_factory()
+        return db
+
+    def _query_all_platforms(self, limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        db = self._db()
+        return {
+            platform['code']: db.get_hot_topics_by_platform(platform['code'], limit)
+            for platform in db.get_enabled_platforms()
+        }
+
+    def _query_platform(self, platform_code: str, limit: int) -> List[Dict[str, Any]]:
+        return self._db().get_hot_topics_by_platform(platform_code, limit)
+
+    def _query_search(self, keyword: str, limit: int) -> List[Dict[str, Any]]:
+        return self._db().search_hot_topics(keyword, limit)
+
+    def _query_statistics(self) -> Dict[str, Any]:
+        db = self._db()
+        return {
+            'platforms': db.get_platform_statistics(),
+            'categories': db.get_category_statistics(),
+            'tags': db.get_tag_statistics(),
+            'collections': db.get_collection_statistics(7)
+        }
+
+    def _run_query(self, func: Callable, args: Tuple) -> CachedResponse:
+        try:
+            data = func(*args)
+        finally:
+            # 线程长期持有连接，每次查询后结束读事务，否则一直读到该线程第一次查询时的快照
+            self._db().end_snapshot()
+        # 编码和压缩也在线程中完成，避免大响应阻塞事件循环
+        return CachedResponse(json_codec.dumps(data), self.config['gzip_level'], self.config['gzip_min_bytes'])
+
+    # ---- 缓存与请求合并 ----
+
+    async def fetch(self, key: Hashable, func: Callable, args: Tuple = (),
+                    platforms: Iterable[str] = (ALL_PLATFORMS,)) -> CachedResponse:
+        """
+        获取查询的编码结果：先查缓存，再合并进行中的相同查询，最后提交到线程池
+
+        Args:
+            key: 缓存键
+            func: 查询函数
+            args: 查询参数
+            platforms: 结果依赖的平台（用于按平台失效）
+
+        Returns:
+            CachedResponse
+        """
+        hit, response = self.cache.get(key)
+        if hit:
+            return response
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            self.stats['db_queries'] += 1
+            response = await loop.run_in_executor(self._executor, self._run_query, func, args)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有合并的等待者时避免"exception was never retrieved"
+            raise
+        finally:
+            del self._inflight[key]
+        self.cache.set(key, response, platforms=platforms)
+        future.set_result(response)
+        return response
+
+    # ---- 路由 ----
+
+    def _limit(self, query: Dict[str, List[str]], default: int) -> int:
+        raw = query.get('limit', [None])[0]
+        if raw is None:
+            return default
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "limit必须是整数")
+        if not 1 <= limit <= self.config['max_limit']:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"limit取值范围为1-{self.config['max_limit']}")
+        return limit
+
+    async def route(self, path: str, query: Dict[str, List[str]]) -> Optional[CachedResponse]:
+        """
+        按路径分发查询
+
+        Returns:
+            CachedResponse，健康检查返回None
+        """
+        if path == '/api/hot-topics':
+            limit = self._limit(query, 20)
+            return await self.fetch(('all', limit), self._query_all_platforms, (limit,))
+        if path.startswith('/api/hot-topics/'):
+            platform_code = unquote(path[len('/api/hot-topics/'):])
+            # 与采集器一样读取当前生效的配置，热加载新增或移除的平台立即生效
+            if platform_code not in self.config_loader.current.platform_categories:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"未知平台: {platform_code}")
+            limit = self._limit(query, 50)
+            return await self.fetch(('platform', platform_code, limit), self._query_platform,
+                                    (platform_code, limit), platforms=(platform_code,))
+        if path == '/api/search':
+            keyword = query.get('q', [''])[0].strip()
+            if not keyword:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "缺少参数q")
+            limit = self._limit(query, 50)
+            return await self.fetch(('search', keyword, limit), self._query_search, (keyword, limit))
+        if path == '/api/statistics':
+            return await self.fetch(('statistics',), self._query_statistics)
+        if path == '/api/health':
+            return None
+        raise HttpError(HTTPStatus.NOT_FOUND, "接口不存在")
+
+    async def handle_request(self, method: str, target: str,
+                             headers: Dict[str, str]) -> Tuple[HTTPStatus, Headers, bytes]:
+        """
+        处理单个请求
+
+        Args:
+            method: 请求方法
+            target: 请求路径（含查询字符串）
+            headers: 请求头（键为小写）
+
+        Returns:
+            (状态码, 响应头列表, 响应体)
+        """
+        self.stats['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "只支持GET请求")
+        url = urlsplit(target)
+        try:
+            response = await self.route(url.path, parse_qs(url.query))
+        except HttpError as e:
+            return self._error(e.status, e.message)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error("处理请求 %s 失败: %s", target, e)
+            return self._error(HTTPStatus.INTERNAL_SERVER_ERROR, "查询失败")
+
+        if response is None:
+            return HTTPStatus.OK, [('Content-Type', 'application/json'), ('Cache-Control', 'no-store')], \
+                json_codec.dumps(self.get_stats())
+
+        response_headers = [
+            ('Content-Type', 'application/json; charset=utf-8'),
+            ('ETag', response.etag),
+            ('Cache-Control', 'max-age=%d' % min(self.config['cache_ttl_seconds'], 60)),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if_none_match = headers.get('if-none-match')
+        if if_none_match and (if_none_match == '*' or response.etag in
+                              [tag.strip() for tag in if_none_match.split(',')]):
+            self.stats['not_modified'] += 1
+            return HTTPStatus.NOT_MODIFIED, response_headers, b''
+        if response.gzip_body is not None and 'gzip' in headers.get('accept-encoding', ''):
+            response_headers.append(('Content-Encoding', 'gzip'))
+            return HTTPStatus.OK, response_headers, response.gzip_body
+        return HTTPStatus.OK, response_headers, response.body
+
+    @staticmethod
+    def _error(status: HTTPStatus, message: str) -> Tuple[HTTPStatus, Headers, bytes]:
+        return status, [('Content-Type', 'application/json; charset=utf-8')], \
+            json_codec.dumps({'error': message})
+
+    # ---- HTTP连接 ----
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个HTTP/1.1连接（支持长连接，按顺序处理请求）"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  self.config['keepalive_timeout'])
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        asyncio.TimeoutError, ConnectionError):
+                    break
+                request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+                parts = request_line.split(' ')
+                if len(parts) != 3:
+                    self._write(writer, 'HTTP/1.1', *self._error(HTTPStatus.BAD_REQUEST, "请求行格式错误"),
+                                keep_alive=False)
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get('content-length')
+                if length and length.isdigit() and int(length):
+                    await reader.readexactly(int(length))  # 只读接口，丢弃请求体
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, response_headers, body = await self.handle_request(method, target, headers)
+                self._write(writer, version, status, response_headers,
+                            b'' if method == 'HEAD' else body, keep_alive, content_length=len(body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, version: str, status: HTTPStatus, headers: Headers,
+               body: bytes, keep_alive: bool, content_length: Optional[int] = None) -> None:
+        lines = ['%s %d %s' % (version, status.value, status.phrase)]
+        lines.extend('%s: %s' % header for header in headers)
+        lines.append('Content-Length: %d' % (len(body) if content_length is None else content_length))
+        lines.append('Connection: %s' % ('keep-alive' if keep_alive else 'close'))
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+    # ---- 缓存失效 ----
+
+    async def _follow_feed(self, poll_seconds: float) -> None:
+        """跟随变更推送日志，按平台失效缓存"""
+        loop = asyncio.get_running_loop()
+        reader = FeedReader(FEED_CONFIG['log_dir'])
+        offset = await loop.run_in_executor(None, reader.end_offset)
+        while True:
+            await asyncio.sleep(poll_seconds)
+            try:
+                events = await loop.run_in_executor(None, reader.read, offset, 10000)
+            except Exception as e:
+                logger.warning("读取变更推送日志失败: %s", e)
+                continue
+            if not events:
+                continue
+            offset = events[-1]['offset'] + 1
+            for platform_code in {event['platform'] for event in events}:
+                self.cache.invalidate_platform(platform_code)
+
+    async def _watch_config(self, poll_seconds: float) -> None:
+        """定期检查外部平台配置文件，变化时切换到新配置"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.config_loader.poll)
+            except Exception as e:
+                logger.warning("检查平台配置失败: %s", e)
+            await asyncio.sleep(poll_seconds)
+
+    # ---- 生命周期 ----
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None) -> asyncio.AbstractServer:
+        """启动监听、缓存失效和配置热加载任务"""
+        self._server = await asyncio.start_server(
+            self.handle_connection, host or self.config['host'],
+            self.config['port'] if port is None else port, backlog=1024
+        )
+        if FEED_CONFIG['enabled'] and self.config['feed_poll_seconds']:
+            self._feed_task = asyncio.create_task(self._follow_feed(self.config['feed_poll_seconds']))
+        if HOT_RELOAD_CONFIG['enabled'] and self.config['config_poll_seconds']:
+            self._config_task = asyncio.create_task(self._watch_config(self.config['config_poll_seconds']))
+        addresses = ', '.join(str(sock.getsockname()) for sock in self._server.sockets)
+        logger.info("查询服务已启动: %s", addresses)
+        return self._server
+
+    async def close(self) -> None:
+        """停止服务并关闭线程池"""
+        for task in (self._feed_task, self._config_task):
+            if task is not None:
+                task.cancel()
+        self._feed_task = self._config_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """服务统计（请求数、304次数、合并次数、数据库查询次数和缓存命中率）"""
+        return {**self.stats, 'inflight': len(self._inflight), 'cache': self.cache.get_stats(),
+                'time': time.time()}
+
+
+async def serve(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    """启动查询服务并一直运行"""
+    service = QueryService()
+    server = await service.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    from main.scraper.log_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description="热榜只读查询服务")
+    parser.add_argument('--host', default=None, help="监听地址")
+    parser.add_argument('--port', type=int, default=None, help="监听端口")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -2,8 +2,13 @@ import schedule
 import time
 from datetime import datetime
 from main.database.database_manager import get_db_manager
+from main.database.slow_query import get_slow_query_log
 from main.scraper import rebang_scraper
-from config.platform_config import platform_categories, custom_params
+from main.scraper.config_loader import get_config_loader
+from main.scraper.log_setup import setup_logging
+from main.profiling.cycle import get_cycle_profiler
+from main.profiling.memory import get_memory_profiler
+from config.platform_config import platform_categories, custom_params, WORKER_CONFIG, MEMORY_PROFILE_CONFIG, HOT_RELOAD_CONFIG
 
 def scheduled_job():
     """定时任务执行的函数"""
@@ -17,11 +22,24 @@ def scheduled_job():
         return
     
     try:
-        # 执行爬取任务
-        results = rebang_scraper.run_scheduled_scraping(
-            platform_categories=platform_categories,
-            platform_extra_params=custom_params
-        )
+        categories, extra_params = platform_categories, custom_params
+        if HOT_RELOAD_CONFIG['enabled']:
+            # 周期之间检查外部配置文件，变化时切换到新配置（未变化平台的状态保留）
+            loader = get_config_loader()
+            change = loader.poll()
+            if change:
+                rebang_scraper.get_scraper().apply_config(change)
+                print(f"平台配置已更新（版本 {change.settings.version}）: {change.describe()}")
+            categories, extra_params = loader.current.platform_categories, loader.current.custom_params
+        
+        # 执行爬取任务（多工作进程模式下通过数据库租约领取任务）
+        run = rebang_scraper.run_worker_scraping if WORKER_CONFIG['enabled'] else rebang_scraper.run_scheduled_scraping
+        # 收到分析请求（信号/标记文件/配置）时对本周期做CPU分析
+        with get_cycle_profiler().cycle():
+            results = run(
+                platform_categories=categories,
+                platform_extra_params=extra_params
+            )
         
         print("\n采集结果详情:")
         total_success = 0
@@ -64,18 +82,51 @@ def scheduled_job():
         print(f"采集过程中发生错误: {str(e)}")
     finally:
         db.disconnect()
+        # 导出本进程累计的SQL耗时统计，可用 python -m main.database.slow_query 查看
+        get_slow_query_log().dump()
+        if MEMORY_PROFILE_CONFIG['enabled']:
+            get_memory_profiler().on_cycle()
         print(f"\n{'='*50}")
         print(f"任务完成 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
         print(f"{'='*50}\n")
 
+def retention_job():
+    """每日执行的数据保留任务：迁出长期失效话题并清理过期日志"""
+    print(f"\n开始数据保留任务 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
+    
+    db = get_db_manager()
+    if not db.connect():
+        print("数据库连接失败")
+        return
+    
+    try:
+        # 每日任务按需导入，不拖慢服务启动
+        from main.database.retention import run_retention
+        report = run_retention()
+        print(f"迁出话题: {report['topics_removed']}, "
+              f"迁出标签: {report['tags_removed']}, "
+              f"清理日志: {report['logs_removed']}, "
+              f"约回收空间: {report['bytes_reclaimed'] / 1024 / 1024:.2f} MB")
+    except Exception as e:
+        print(f"数据保留任务发生错误: {str(e)}")
+    finally:
+        db.disconnect()
+
 if __name__ == "__main__":
+    setup_logging()
+    if MEMORY_PROFILE_CONFIG['enabled']:
+        get_memory_profiler().start()
+    get_cycle_profiler().install()
     # 设置定时任务
     schedule.every(2).minutes.do(scheduled_job)
+    schedule.every().day.at("03:30").do(retention_job)
     # 立即执行一次
     scheduled_job()
     # 保持程序运行
     print("定时采集服务已启动，等待执行...")
     while True:
         schedule.run_pending()
+        if MEMORY_PROFILE_CONFIG['enabled']:
+            get_memory_profiler().poll()
         time.sleep(1)
         
\ No newline at end of file
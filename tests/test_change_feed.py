@@ -0,0 +1,207 @@
+"""
+变更推送测试文件 - 测试偏移量的连续与恢复、按偏移量读取、分段滚动、队列满时不阻塞，
+以及崩溃留下的残缺行、写入失败、多个进程共用日志目录时偏移量不重复和进程退出前写完队列
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+from main.scraper.change_feed import ChangeFeed, FeedReader
+from main.scraper.snapshot_diff import ENTERED, EXITED, MOVED, BoardDiff, TopicEvent
+
+NOW = datetime(2025, 8, 1, 12)
+
+
+def _diff(entered=0, moved=0, exited=0):
+    diff = BoardDiff('weibo', 'hot', NOW, partial=False)
+    diff.entered = [TopicEvent(ENTERED, f'n{i}', f'新话题{i}', i + 1, None, 100, None) for i in range(entered)]
+    diff.moved = [TopicEvent(MOVED, f'm{i}', f'话题{i}', i + 1, i + 3, 200, 150, topic_id=i) for i in range(moved)]
+    diff.exited = [TopicEvent(EXITED, f'x{i}', f'旧话题{i}', None, i + 1, None, 50, topic_id=100 + i)
+                   for i in range(exited)]
+    return diff
+
+
+def _feed(tmp_path, **config):
+    return ChangeFeed({'log_dir': str(tmp_path / 'feed'), **config})
+
+
+def test_offsets_are_sequential_and_typed(tmp_path):
+    feed = _feed(tmp_path)
+    assert feed.publish(_diff(entered=2, moved=1, exited=1)) == 4
+    feed.close()
+
+    events = FeedReader(str(tmp_path / 'feed')).read()
+    assert [event['offset'] for event in events] == [0, 1, 2, 3]
+    assert [event['type'] for event in events] == ['topic_inserted', 'topic_inserted',
+                                                   'rank_changed', 'topic_deactivated']
+    assert events[2]['rank_change'] == 2
+    assert events[3]['platform'] == 'weibo' and events[3]['category'] == 'hot'
+
+
+def test_offsets_resume_after_restart(tmp_path):
+    feed = _feed(tmp_path)
+    feed.publish(_diff(entered=3))
+    feed.close()
+
+    feed = _feed(tmp_path)
+    assert feed.next_offset == 3
+    feed.publish(_diff(exited=2))
+    feed.close()
+
+    reader = FeedReader(str(tmp_path / 'feed'))
+    assert [event['offset'] for event in reader.read()] == [0, 1, 2, 3, 4]
+    assert [event['offset'] for event in reader.read(from_offset=3)] == [3, 4]
+    assert [event['offset'] for event in reader.read(from_offset=1, limit=2)] == [1, 2]
+
+
+def test_segments_roll_and_prune(tmp_path):
+    feed = _feed(tmp_path, segment_max_bytes=600, max_segments=2)
+    for _ in range(5):
+        feed.publish(_diff(entered=2))
+    feed.close()
+
+    segments = sorted(name for name in os.listdir(tmp_path / 'feed') if name.endswith('.jsonl'))
+    assert len(segments) == 2
+    events = FeedReader(str(tmp_path / 'feed')).read()
+    offsets = [event['offset'] for event in events]
+    # 旧分段被清理，剩余事件仍连续且以最大偏移量结束
+    assert offsets == list(range(offsets[0], 10))
+    # 已清理的偏移量从最早保留的分段开始读
+    assert FeedReader(str(tmp_path / 'feed')).read(from_offset=0)[0]['offset'] == offsets[0]
+
+
+def test_subscribers_receive_events_and_errors_are_isolated(tmp_path):
+    feed = _feed(tmp_path)
+    received = []
+    feed.subscribe(lambda event: 1 / 0)
+    feed.subscribe(received.append)
+    feed.publish(_diff(entered=1, moved=1))
+    feed.close()
+
+    assert [event['offset'] for event in received] == [0, 1]
+
+
+def test_full_queue_drops_without_blocking(tmp_path):
+    feed = _feed(tmp_path, queue_max_size=2)
+    gate = threading.Event()
+    # 阻塞后台线程，让队列保持满
+    feed.subscribe(lambda event: gate.wait(5))
+    feed.publish(_diff(entered=1))
+    while feed.get_stats()['pending']:
+        pass
+
+    queued = feed.publish(_diff(entered=5))
+    assert queued == 2
+    assert feed.get_stats()['dropped'] == 3
+    gate.set()
+    feed.close()
+    assert feed.get_stats()['published'] == 3
+
+
+def _segment_paths(tmp_path):
+    return sorted(str(path) for path in (tmp_path / 'feed').glob('*.jsonl'))
+
+
+def test_torn_line_is_truncated_on_recovery(tmp_path):
+    feed = _feed(tmp_path)
+    feed.publish(_diff(entered=3))
+    feed.close()
+    # 模拟写入中途崩溃：最后一行只写了一半
+    with open(_segment_paths(tmp_path)[-1], 'ab') as f:
+        f.write('{"hash_id": "n9", "title": "残缺'.encode('utf-8'))
+
+    reader = FeedReader(str(tmp_path / 'feed'))
+    assert reader.end_offset() == 3
+    feed = _feed(tmp_path)
+    assert feed.next_offset == 3
+    feed.publish(_diff(moved=2))
+    feed.close()
+    assert [event['offset'] for event in reader.read()] == [0, 1, 2, 3, 4]
+
+
+def test_read_skips_undecodable_lines(tmp_path):
+    feed = _feed(tmp_path)
+    feed.publish(_diff(entered=1))
+    feed.close()
+    # 旧版本在残缺行后继续追加留下的坏行
+    with open(_segment_paths(tmp_path)[-1], 'ab') as f:
+        f.write(b'{"offset": 1, "ti{"offset": 1}\n')
+    feed = _feed(tmp_path)
+    feed.publish(_diff(entered=1))
+    feed.close()
+
+    assert [event['offset'] for event in FeedReader(str(tmp_path / 'feed')).read()] == [0, 1]
+
+
+def test_failed_write_does_not_consume_offsets(tmp_path, monkeypatch):
+    feed = _feed(tmp_path)
+    received = []
+    feed.subscribe(received.append)
+    append = ChangeFeed._append
+    calls = []
+
+    def flaky_append(path, size, data):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("磁盘已满")
+        append(path, size, data)
+
+    monkeypatch.setattr(feed, '_append', flaky_append)
+    feed.publish(_diff(entered=2))
+    feed.close()
+    assert received == [] and feed.get_stats()['dropped'] == 2 and feed.next_offset == 0
+
+    feed = _feed(tmp_path)
+    feed.publish(_diff(moved=2))
+    feed.close()
+    assert [event['offset'] for event in FeedReader(str(tmp_path / 'feed')).read()] == [0, 1]
+
+
+def test_shared_log_dir_has_unique_offsets(tmp_path):
+    # 两个实例模拟共用日志目录的两个工作进程，写锁保证偏移量不重复
+    first, second = _feed(tmp_path), _feed(tmp_path)
+    for _ in range(20):
+        first.publish(_diff(entered=2))
+        second.publish(_diff(exited=1))
+    first.close()
+    second.close()
+
+    events = FeedReader(str(tmp_path / 'feed')).read()
+    assert [event['offset'] for event in events] == list(range(60))
+    assert sum(event['type'] == 'topic_deactivated' for event in events) == 20
+
+
+EXIT_SCRIPT = """
+import sys, time
+from config.platform_config import FEED_CONFIG
+FEED_CONFIG['log_dir'] = sys.argv[1]
+from main.scraper import change_feed
+from tests.test_change_feed import _diff
+
+write = change_feed.ChangeFeed._write
+def slow_write(self, records):
+    time.sleep(0.2)
+    return write(self, records)
+change_feed.ChangeFeed._write = slow_write
+
+feed = change_feed.get_change_feed()
+feed.publish(_diff(entered=3))
+feed.publish(_diff(moved=2))
+assert feed.get_stats()['published'] == 0  # 退出时事件仍在队列中
+"""
+
+
+def test_close_and_exit_flush_queued_events(tmp_path):
+    """测试close()及进程正常退出时，队列中尚未写入的事件都已落盘"""
+    feed = _feed(tmp_path)
+    feed.publish(_diff(entered=2))
+    feed.close()
+    assert len(FeedReader(str(tmp_path / 'feed')).read()) == 2
+
+    log_dir = str(tmp_path / 'exit')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', EXIT_SCRIPT, log_dir], cwd=root, check=True, timeout=30)
+    assert [event['offset'] for event in FeedReader(log_dir).read()] == [0, 1, 2, 3, 4]
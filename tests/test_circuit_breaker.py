@@ -0,0 +1,84 @@
+"""
+熔断器测试文件 - 测试失败率熔断、到期探测与平台/分类两级熔断
+"""
+
+from main.scraper.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+
+CONFIG = {
+    'enabled': True,
+    'window_size': 4,
+    'min_calls': 3,
+    'failure_rate_threshold': 0.5,
+    'open_seconds': 60,
+    'max_open_seconds': 200,
+    'half_open_max_calls': 1,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_trips_after_failure_rate_exceeded():
+    """测试达到最小调用数且失败率超阈值后熔断"""
+    breaker = CircuitBreaker('demo', CONFIG, FakeClock())
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # 未达到min_calls
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_probe_recovers_or_backs_off():
+    """测试熔断到期后放行一次探测，探测失败时熔断时长翻倍"""
+    clock = FakeClock()
+    breaker = CircuitBreaker('demo', CONFIG, clock)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 60
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # 同时只放行一个探测
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 120
+
+    clock.now = 180
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failure_rate() == 0.0
+
+
+def test_registry_platform_and_category_levels():
+    """测试分类熔断不影响同平台其他分类，平台熔断影响全部分类"""
+    config = dict(CONFIG, window_size=10)
+    registry = CircuitBreakerRegistry(config, FakeClock())
+    for _ in range(4):
+        registry.record('weibo', 'news', True)
+    for _ in range(3):
+        registry.record('weibo', 'hot', False)
+
+    allowed, reason = registry.allow('weibo', 'hot')
+    assert not allowed and 'weibo/hot' in reason
+    assert registry.allow('weibo', 'news') == (True, None)
+
+    for _ in range(4):
+        registry.record('zhihu', 'hot', False)
+    allowed, reason = registry.allow('zhihu', 'other')
+    assert not allowed and '平台 zhihu' in reason
+
+
+def test_registry_disabled():
+    """测试关闭熔断时始终放行"""
+    registry = CircuitBreakerRegistry(dict(CONFIG, enabled=False), FakeClock())
+    for _ in range(5):
+        registry.record('weibo', 'hot', False)
+    assert registry.allow('weibo', 'hot') == (True, None)
@@ -0,0 +1,81 @@
+"""
+配置热加载测试文件 - 测试外部配置的校验、整体替换以及未变化平台状态的保留
+"""
+
+import json
+import logging
+import os
+
+from main.scraper.circuit_breaker import CircuitBreakerRegistry
+from main.scraper.config_loader import ConfigLoader, build_settings
+from main.scraper.rebang_scraper import RebangScraper
+from main.scraper.snapshot_diff import SnapshotStore
+
+
+def _write(path, data, mtime):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def _builtin():
+    settings = build_settings({})
+    return settings.platforms, settings.platform_categories
+
+
+def test_reload_swaps_changed_platforms_and_keeps_unchanged(tmp_path):
+    path = str(tmp_path / 'platforms.json')
+    loader = ConfigLoader(path)
+    assert loader.poll() is None  # 文件不存在时使用内置配置
+    before = loader.current
+    zhihu = before.platforms['zhihu']
+
+    platforms, categories = _builtin()
+    weibo = dict(platforms['weibo'], field_mapping=dict(platforms['weibo']['field_mapping'], heat='hot_num'))
+    categories['weibo'] = ['ent', 'search']
+    _write(path, {'platforms': {'weibo': weibo}, 'platform_categories': categories}, 1_000_000_000)
+
+    change = loader.poll()
+    assert change.changed == {'weibo'} and not change.added and not change.removed
+    assert change.removed_boards == [('weibo', 'news')]
+    assert loader.current.platforms['weibo']['field_mapping']['heat'] == 'hot_num'
+    assert loader.current.platforms['zhihu'] is zhihu
+    assert loader.current.version != before.version
+
+    # 只改修改时间、内容不变时不重新加载
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert loader.poll() is None
+
+
+def test_invalid_file_keeps_current_config(tmp_path, caplog):
+    path = str(tmp_path / 'platforms.json')
+    loader = ConfigLoader(path)
+    current = loader.current
+    broken = {'platforms': {'new': {'base_url': 'https://api.rebang.today/v1/items', 'data_path': []}},
+              'platform_categories': {'new': ['hot'], 'missing': ['hot']}}
+    _write(path, broken, 1_000_000_000)
+
+    with caplog.at_level(logging.ERROR, logger='main.scraper.config_loader'):
+        assert loader.poll() is None
+    assert loader.current is current
+    assert 'field_mapping' in caplog.text and 'missing' in caplog.text
+
+
+def test_apply_config_discards_only_removed_state(tmp_path):
+    path = str(tmp_path / 'platforms.json')
+    loader = ConfigLoader(path)
+    scraper = RebangScraper.__new__(RebangScraper)
+    scraper.platform_config = loader.current.platforms
+    scraper.snapshots = SnapshotStore(db=object())
+    scraper.circuit_breakers = CircuitBreakerRegistry()
+    for board in (('weibo', 'news'), ('weibo', 'ent'), ('zhihu', 'hot')):
+        scraper.snapshots._snapshots[board] = {}
+        scraper.circuit_breakers.get(*board)
+
+    platforms, categories = _builtin()
+    categories['weibo'] = ['ent', 'search']
+    _write(path, {'platform_categories': categories}, 1_000_000_000)
+    scraper.apply_config(loader.poll())
+
+    assert set(scraper.snapshots._snapshots) == {('weibo', 'ent'), ('zhihu', 'hot')}
+    assert set(scraper.circuit_breakers.get_states()) == {'weibo/ent', 'zhihu/hot'}
@@ -0,0 +1,59 @@
+"""
+周期分析测试文件 - 测试按需触发的周期CPU分析、平台/分类标签和折叠栈输出
+"""
+
+import os
+import time
+
+from main.profiling.cycle import CycleProfiler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def _profiler(tmp_path, **config):
+    return CycleProfiler({'cycles': 0, 'trigger_cycles': 1, 'signal': None, 'sample_interval_ms': 1,
+                          'flag_file': str(tmp_path / 'profile.flag'), 'output_dir': str(tmp_path / 'out'),
+                          **config})
+
+
+def test_idle_cycle_writes_nothing(tmp_path):
+    profiler = _profiler(tmp_path)
+    with profiler.cycle():
+        with profiler.span('weibo', 'hot'):
+            assert not profiler.active
+    assert not os.path.exists(tmp_path / 'out')
+
+
+def test_profiled_cycle_tags_stacks_with_spans(tmp_path):
+    profiler = _profiler(tmp_path, cycles=1)
+    with profiler.cycle():
+        with profiler.span('weibo'):
+            with profiler.span('weibo', 'hot'):
+                _busy(0.1)
+    assert profiler.pending == 0
+
+    files = sorted(os.listdir(tmp_path / 'out'))
+    assert [os.path.splitext(name)[1] for name in files] == ['.collapsed', '.prof', '.txt']
+    with open(tmp_path / 'out' / files[0], encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    busy = [line for line in lines if '_busy@test_cycle_profile.py' in line]
+    assert busy and all(line.startswith('weibo/hot;') for line in busy)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    with open(tmp_path / 'out' / files[2], encoding='utf-8') as f:
+        assert 'weibo/hot' in f.read()
+
+
+def test_flag_file_triggers_requested_cycles(tmp_path):
+    profiler = _profiler(tmp_path, cprofile=False)
+    with open(tmp_path / 'profile.flag', 'w', encoding='utf-8') as f:
+        f.write('2')
+    for _ in range(3):
+        with profiler.cycle():
+            _busy(0.01)
+    assert not os.path.exists(tmp_path / 'profile.flag')
+    assert profiler.cycles_profiled == 2
+    assert len(os.listdir(tmp_path / 'out')) == 4
@@ -0,0 +1,54 @@
+"""
+数据导出测试文件 - 测试过滤条件拼接和各格式写出（不依赖数据库）
+"""
+
+import csv
+import json
+from datetime import datetime
+
+from main.database.database_manager import DatabaseManager
+from main.database.exporter import TopicExporter, TAG_SEPARATOR
+
+ROW = (1, 'weibo', '微博', '测试话题', 3, 12000, 'https://rebang.today/item/1', 'a' * 32,
+       'search', datetime(2025, 8, 1, 12), datetime(2025, 8, 1, 13), 2, 1, f'热{TAG_SEPARATOR}新')
+
+
+def _chunks():
+    yield [TopicExporter._normalize_row(ROW)]
+    yield [TopicExporter._normalize_row(ROW[:-1] + (None,))]
+
+
+def test_build_query_filters():
+    """测试时间范围与平台过滤条件"""
+    exporter = TopicExporter(db=DatabaseManager())
+    query, params = exporter._build_query(
+        datetime(2025, 8, 1), datetime(2025, 8, 2), ['weibo', 'zhihu'], 'first_seen_at'
+    )
+    assert "t.first_seen_at >= %s" in query
+    assert "t.first_seen_at < %s" in query
+    assert "p.code IN (%s, %s)" in query
+    assert query.rstrip().endswith("ORDER BY t.id")
+    assert params == (datetime(2025, 8, 1), datetime(2025, 8, 2), 'weibo', 'zhihu')
+
+
+def test_write_jsonl(tmp_path):
+    """测试JSONL输出"""
+    path = tmp_path / 'topics.jsonl'
+    assert TopicExporter._write_jsonl(str(path), _chunks()) == 2
+
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert lines[0]['title'] == '测试话题'
+    assert lines[0]['tags'] == ['热', '新']
+    assert lines[1]['tags'] == []
+
+
+def test_write_csv(tmp_path):
+    """测试CSV输出"""
+    path = tmp_path / 'topics.csv'
+    assert TopicExporter._write_csv(str(path), _chunks()) == 2
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['platform_code'] == 'weibo'
+    assert rows[0]['tags'] == '热|新'
+    assert rows[1]['tags'] == ''
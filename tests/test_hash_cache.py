@@ -0,0 +1,111 @@
+"""
+话题哈希缓存测试文件 - 测试LRU/TTL行为，以及去重和保存话题在缓存命中时不访问数据库
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from main.database import database_manager
+from main.database.hash_cache import HashCache, TopicState, get_hash_cache
+from main.scraper.deduplicator import Deduplicator
+from main.scraper.topic import Topic
+
+HASH = 'a' * 32
+
+
+class FakeDb:
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.lookups = 0
+        self.updates = []
+        self.inserts = []
+
+    def get_topic_state_by_hash(self, hash_id):
+        self.lookups += 1
+        return self.rows.get(hash_id)
+
+    def get_platform_by_code(self, code):
+        return {'id': 1, 'code': code}
+
+    def execute_update(self, query, params):
+        self.updates.append(params)
+        return 1
+
+    def execute_query(self, query, params):
+        return []
+
+    def insert_hot_topic(self, topic_data, platform_id=None, rank_change=None, is_active=None):
+        self.inserts.append(topic_data['hash_id'])
+        return 42
+
+    def sync_topic_tags(self, topic_tags):
+        return 0, 0
+
+
+@pytest.fixture(autouse=True)
+def clear_hash_cache():
+    get_hash_cache().clear()
+    yield
+    get_hash_cache().clear()
+
+
+def test_lru_eviction_and_ttl():
+    cache = HashCache(max_size=2, ttl_seconds=60)
+    cache.mark_seen('a', 1, 1)
+    cache.mark_seen('b', 2, 2)
+    assert cache.get('a').id == 1      # a变为最近使用
+    cache.mark_seen('c', 3, 3)
+    assert cache.get('b') is None      # b被淘汰
+    assert cache.get('c').rank == 3
+
+    cache.mark_inactive(['c'])
+    assert cache.get('c').is_active is False
+
+    expired = HashCache(ttl_seconds=0)
+    expired.put('a', TopicState(1, 1, datetime.now(), True))
+    assert expired.get('a') is None
+    assert expired.get_stats()['expired'] == 1
+
+
+def test_lookup_populates_cache_from_lean_query():
+    db = FakeDb({HASH: {'id': 7, 'rank': 3, 'last_seen_at': datetime.now(), 'is_active': 1}})
+    state = database_manager.lookup_topic_state(HASH, db)
+    assert (state.id, state.rank, state.is_active) == (7, 3, True)
+    assert database_manager.lookup_topic_state(HASH, db) is state
+    assert db.lookups == 1
+
+    # 不存在的话题不缓存，下次仍回源查询
+    assert database_manager.lookup_topic_state('b' * 32, db) is None
+    assert database_manager.lookup_topic_state('b' * 32, db) is None
+    assert db.lookups == 3
+
+
+def test_save_then_dedup_needs_no_db_lookup(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(database_manager, 'get_db_manager', lambda: db)
+    topic = Topic('weibo', 'hot', 1, 5, '话题', 100, 'https://rebang.today/item/1', [], HASH, datetime.now())
+
+    assert database_manager.save_hot_topic(topic.to_dict()) == 42
+    assert db.inserts == [HASH] and db.lookups == 1
+
+    deduplicator = Deduplicator.__new__(Deduplicator)
+    deduplicator.db = db
+    deduplicator.config = {'title_similarity_threshold': 0.85, 'time_window_minutes': 30}
+    assert deduplicator.is_duplicate(topic) == (True, 42)
+
+    # 排名变化按缓存中的旧排名计算，且不再查询
+    topic.rank = 2
+    assert database_manager.save_hot_topic(topic.to_dict()) == 42
+    assert db.updates[-1][:2] == (2, 3)
+    assert db.lookups == 1
+
+
+def test_dedup_ignores_stale_cached_entry():
+    db = FakeDb()
+    get_hash_cache().put(HASH, TopicState(9, 1, datetime.now() - timedelta(hours=2), True))
+    deduplicator = Deduplicator.__new__(Deduplicator)
+    deduplicator.db = db
+    deduplicator.config = {'title_similarity_threshold': 0.85, 'time_window_minutes': 30}
+    topic = Topic('weibo', 'hot', 1, 1, '话题', 100, '', [], HASH, datetime.now())
+    assert deduplicator.is_duplicate(topic) == (False, None)
@@ -0,0 +1,80 @@
+"""
+热度解析测试文件 - 测试批量解析与逐条解析结果一致、按平台规则、无法解析值的报告以及页面解析走批量路径
+"""
+
+import json
+import logging
+
+import pytest
+
+from config.platform_config import PLATFORM_CONFIG
+from main.scraper.data_parser import DataParser
+from main.scraper.heat import normalize_heat_batch, parse_heat
+
+SAMPLES = ['123.4万', '2亿', '1.5w', '987', ' 45 万热度', '热度 12', '暂无', '', None, 3600, '7.', 12.5, '0万']
+
+
+def test_batch_matches_scalar():
+    """测试批量结果与parse_heat逐条结果完全一致"""
+    result = normalize_heat_batch(SAMPLES)
+    assert result.to_list() == [parse_heat(value) for value in SAMPLES]
+    assert result.values.dtype.name == 'int64'
+    assert result.to_list()[:4] == [1234000, 200000000, 15000, 987]
+
+
+@pytest.mark.parametrize('platform_code', sorted(PLATFORM_CONFIG))
+def test_batch_matches_scalar_per_platform(platform_code):
+    """测试每个平台的规则下（含xueqiu严格模式）批量与逐条结果一致"""
+    values = SAMPLES + ['3家公司发布公告', ' 8 ', '12.3万']
+    assert normalize_heat_batch(values, platform_code).to_list() == [parse_heat(v, platform_code) for v in values]
+
+
+def test_batch_reports_unparseable_values():
+    """测试报告无法解析的值（空值不计入）"""
+    result = normalize_heat_batch(SAMPLES)
+    assert result.unparseable == [(6, '暂无'), (11, 12.5)]
+    assert not result.valid[6] and result.values[6] == 0
+
+
+def test_scalar_matches_legacy_extract_heat_value():
+    """测试DataParser.extract_heat_value保持原有行为"""
+    assert DataParser.extract_heat_value('123.4万') == 1234000
+    assert DataParser.extract_heat_value('abc') is None
+    assert DataParser.extract_heat_value(42) == 42
+
+
+def test_strict_platform_rule_rejects_free_text():
+    """测试严格规则的平台不从自由文本中提取数字"""
+    values = ['3家公司发布公告', '12.3万', ' 8 ']
+    assert [parse_heat(value, 'xueqiu') for value in values] == [None, 123000, 8]
+    assert normalize_heat_batch(values, 'xueqiu').to_list() == [None, 123000, 8]
+    assert parse_heat(values[0]) == 3
+
+
+def test_platform_unit_override(monkeypatch):
+    """测试按平台覆盖单位表"""
+    from main.scraper import heat
+    monkeypatch.setitem(heat.HEAT_CONFIG['platform_rules'], 'demo', {'units': {'k': 1000, '千': 1000}})
+    monkeypatch.setattr(heat, '_rule_cache', {})
+    values = ['2.5k', '3千', '4万']
+    assert [parse_heat(value, 'demo') for value in values] == [2500, 3000, 4]
+    assert normalize_heat_batch(values, 'demo').to_list() == [2500, 3000, 4]
+
+
+def test_batch_overflow_is_reported():
+    """测试超出int64范围的值被报告为无法解析"""
+    result = normalize_heat_batch(['99999999999999亿', 2 ** 70])
+    assert result.to_list() == [None, None]
+    assert [idx for idx, _ in result.unparseable] == [0, 1]
+
+
+def test_parse_batch_uses_batch_normalizer(caplog):
+    """测试页面解析整页批量换算热度值，并报告无法解析的值"""
+    rows = [{'title': '话题一', 'reason': '12.3万'}, {'title': '话题二', 'reason': '3家公司发布公告'},
+            {'title': '话题三', 'reason': 8}]
+    config = {'data_path': ['data'], 'list_type': 'string',
+              'field_mapping': {'title': 'title', 'heat': 'reason', 'url': 'id', 'tag': 'label'}}
+    with caplog.at_level(logging.DEBUG, logger='main.scraper.data_parser'):
+        batch = DataParser.parse_batch({'data': json.dumps(rows, ensure_ascii=False)}, 'xueqiu', 'hot', config, page=1)
+    assert [topic.heat_value for topic in batch] == [123000, None, 8]
+    assert '1 个热度值无法解析' in caplog.text and '3家公司发布公告' in caplog.text
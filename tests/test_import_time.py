@@ -0,0 +1,51 @@
+"""
+启动开销测试文件 - 用python -X importtime约束采集入口的导入耗时，并检查导入时无文件I/O和重型依赖
+"""
+
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 采集入口模块的累计导入耗时上限（微秒），留有余量以适应较慢的CI机器
+IMPORT_BUDGET_US = 1_500_000
+
+# 常规采集路径不应加载的重型依赖
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'bs4')
+
+
+def _run_import(module: str, cwd: str, code: str = '') -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}\n{code}"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def _cumulative_us(stderr: str, module: str) -> int:
+    """从importtime输出中取出指定模块的累计耗时"""
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise AssertionError(f"importtime输出中没有 {module}")
+
+
+def test_scraper_import_within_budget(tmp_path):
+    """测试采集入口导入耗时在预算内且不加载重型依赖"""
+    module = 'main.scraper.rebang_scraper'
+    check = f"import sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = _run_import(module, str(tmp_path), check)
+
+    assert result.stdout.strip() == ''
+    assert _cumulative_us(result.stderr, module) < IMPORT_BUDGET_US
+
+
+def test_import_has_no_file_io(tmp_path):
+    """测试导入入口模块不会创建日志目录或添加日志处理器"""
+    check = "import logging; print(len(logging.getLogger().handlers))"
+    for module in ('main.scraper.rebang_scraper', 'runtime_execute'):
+        result = _run_import(module, str(tmp_path), check)
+        assert result.stdout.strip() == '0'
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,120 @@
+"""
+流式查询测试文件 - 使用伪连接测试iter_query的分批读取与连接复用
+"""
+
+import pytest
+from mysql.connector import Error
+
+from main.database.database_manager import DatabaseManager
+from main.database.exporter import TopicExporter
+
+
+class FakeCursor:
+    def __init__(self, rows, log):
+        self.rows = list(rows)
+        self.log = log
+
+    def execute(self, query, params):
+        self.log.append(('execute', query, params))
+
+    def fetchmany(self, size):
+        self.log.append(('fetchmany', size))
+        if self.rows and self.rows[0] in ({'n': 'FAIL'}, ('FAIL',)):
+            raise Error("模拟读取中断")
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.log.append(('close',))
+
+
+class FakeConnection:
+    def __init__(self, rows, log, options):
+        self.rows = rows
+        self.log = log
+        self.options = options
+        self.connected = True
+
+    def cursor(self, dictionary=False, buffered=True):
+        self.log.append(('cursor', dictionary, buffered))
+        rows = [{'n': n} for n in self.rows] if dictionary else [(n,) for n in self.rows]
+        return FakeCursor(rows, self.log)
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+        self.log.append(('conn_close',))
+
+
+def _make_db(rows):
+    log = []
+    opened = []
+    db = DatabaseManager({'host': 'localhost'})
+
+    def open_connection(**options):
+        conn = FakeConnection(rows, log, options)
+        opened.append(conn)
+        return conn
+
+    db._open_connection = open_connection
+    return db, log, opened
+
+
+def test_iter_query_reads_in_batches():
+    """测试按batch_size分批读取且使用非缓冲游标"""
+    db, log, opened = _make_db(range(5))
+    rows = list(db.iter_query("SELECT n FROM t", batch_size=2))
+
+    assert rows == [{'n': n} for n in range(5)]
+    assert ('cursor', True, False) in log
+    assert [entry for entry in log if entry[0] == 'fetchmany'] == [('fetchmany', 2)] * 4
+    assert len(opened) == 1
+    assert not db._stream_busy
+
+
+def test_iter_query_tuples_and_connection_reuse():
+    """测试元组行变体，以及流式连接在多次查询间复用"""
+    db, log, opened = _make_db(range(3))
+    assert list(db.iter_query_tuples("SELECT n FROM t")) == [(0,), (1,), (2,)]
+    assert list(db.iter_query_tuples("SELECT n FROM t")) == [(0,), (1,), (2,)]
+    assert len(opened) == 1
+
+
+def test_nested_iteration_uses_temporary_connection():
+    """测试嵌套迭代时使用临时连接，并在结束后关闭"""
+    db, log, opened = _make_db(range(2))
+    pairs = [(outer['n'], inner['n'])
+             for outer in db.iter_query("SELECT n FROM a")
+             for inner in db.iter_query("SELECT n FROM b")]
+
+    assert pairs == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert len(opened) == 3
+    assert opened[0].connected
+    assert not opened[1].connected and not opened[2].connected
+
+
+def test_stream_connection_autocommits():
+    """测试流式连接以自动提交打开，每次查询都能读到最新数据"""
+    db, log, opened = _make_db(range(2))
+    list(db.iter_query("SELECT n FROM a"))
+    [list(db.iter_query("SELECT n FROM b")) for _ in db.iter_query("SELECT n FROM a")]
+    assert all(conn.options.get('autocommit') for conn in opened)
+
+
+def test_stream_error_is_raised(tmp_path):
+    """测试读取中途失败时抛出异常，导出不会写出截断的文件"""
+    db, log, opened = _make_db([0, 1, 'FAIL'])
+    rows = db.iter_query("SELECT n FROM t", batch_size=2)
+    assert next(rows) == {'n': 0}
+    with pytest.raises(Error):
+        list(rows)
+    assert not db._stream_busy
+
+    output = tmp_path / 'topics.jsonl'
+    exporter = TopicExporter(db=db, chunk_size=2)
+    exporter._normalize_row = lambda row: row + ([],)
+    with pytest.raises(Error):
+        exporter.export(str(output), 'jsonl')
+    assert not output.exists()
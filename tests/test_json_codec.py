@@ -0,0 +1,113 @@
+"""
+JSON解码测试文件 - 测试后端切换、逐项解码以及大页面的增量解析
+"""
+
+import json
+
+import pytest
+
+from main.scraper import json_codec
+from main.scraper.circuit_breaker import CircuitBreakerRegistry
+from main.scraper.data_parser import DataParser
+from main.scraper.rebang_scraper import RebangScraper
+
+ROWS = [{'title': f'话题{i}', 'heat': f'{i}万', 'id': i, 'label': '热'} for i in range(1, 6)]
+CONFIG = {
+    'data_path': ['data', 'list'],
+    'list_type': 'string',
+    'field_mapping': {'title': 'title', 'heat': 'heat', 'url': 'id', 'tag': 'label'},
+}
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def backend(request):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    previous = json_codec.get_backend()
+    yield json_codec.set_backend(request.param)
+    json_codec.set_backend(previous)
+
+
+def test_loads_accepts_str_and_bytes(backend):
+    """测试两种后端都能解码字符串和原始字节"""
+    text = json.dumps({'data': {'list': json.dumps(ROWS, ensure_ascii=False)}}, ensure_ascii=False)
+    assert json_codec.loads(text) == json_codec.loads(text.encode('utf-8'))
+    with pytest.raises(json_codec.JSONDecodeError):
+        json_codec.loads(b'{broken')
+
+
+def test_iter_json_array_matches_full_decode():
+    """测试逐项解码结果与整体解码一致"""
+    text = ' [ ' + ', '.join(json.dumps(row, ensure_ascii=False) for row in ROWS) + ' ] '
+    assert list(json_codec.iter_json_array(text)) == ROWS
+    assert list(json_codec.iter_json_array('[]')) == []
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}', '[1, 2', '[1 2]', '[1,]'])
+def test_iter_json_array_rejects_invalid(text):
+    """测试非法数组抛出JSONDecodeError"""
+    with pytest.raises(json_codec.JSONDecodeError):
+        list(json_codec.iter_json_array(text))
+
+
+def test_decode_list_switches_to_incremental():
+    """测试超过阈值时返回迭代器"""
+    text = json.dumps(ROWS)
+    assert json_codec.decode_list(text, incremental_threshold=len(text) + 1) == ROWS
+    assert not isinstance(json_codec.decode_list(text, incremental_threshold=10), list)
+
+
+def test_parse_batch_incremental_keeps_parsed_items_on_error(monkeypatch):
+    """测试大页面逐项解析，中途出错时保留已解析的话题"""
+    monkeypatch.setitem(json_codec.FETCH_CONFIG, 'incremental_decode_chars', 10)
+    text = json.dumps(ROWS, ensure_ascii=False)
+    batch = DataParser.parse_batch({'data': {'list': text}}, 'weibo', 'hot', CONFIG, page=1)
+    assert [t.title for t in batch] == [row['title'] for row in ROWS]
+    assert not batch.truncated
+
+    truncated = text[:text.index('话题4') - 10]
+    batch = DataParser.parse_batch({'data': {'list': truncated}}, 'weibo', 'hot', CONFIG, page=1)
+    assert [t.rank for t in batch] == [1, 2, 3]
+    assert batch.truncated
+
+    batch = DataParser.parse_batch({'data': {'list': '{broken'}}, 'weibo', 'hot', CONFIG, page=1)
+    assert not batch and batch.truncated
+
+
+class StubFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch_data(self, url, params):
+        return self.pages.get(params['page'])
+
+
+@pytest.mark.parametrize('cut', [False, True])
+def test_truncated_page_marks_board_partial(monkeypatch, cut):
+    """测试页面未完整解析时整个榜单按不完整处理，不据此判定掉榜"""
+    monkeypatch.setitem(json_codec.FETCH_CONFIG, 'incremental_decode_chars', 10)
+    text = json.dumps(ROWS, ensure_ascii=False)
+    config = dict(CONFIG, base_url='https://example.invalid', default_params={},
+                  pagination={'max_pages': 2, 'page_size': len(ROWS)})
+    second = text[:text.index('话题4') - 10] if cut else text
+    scraper = RebangScraper.__new__(RebangScraper)
+    scraper.platform_config = {'weibo': config}
+    scraper.api_fetcher = StubFetcher({1: {'data': {'list': text}}, 2: {'data': {'list': second}}})
+    scraper.data_parser = DataParser()
+    scraper.circuit_breakers = CircuitBreakerRegistry()
+    boards = []
+    scraper.apply_board = lambda platform_code, category, topics, partial: boards.append((len(topics), partial)) or {}
+
+    scraper.scrape_platform_category('weibo', 'hot')
+    assert boards == [(len(ROWS) + (3 if cut else len(ROWS)), cut)]
+
+
+def test_dumps_handles_database_types(backend):
+    """测试两种后端对datetime、Decimal和中文的编码一致"""
+    from datetime import datetime
+    from decimal import Decimal
+
+    raw = json_codec.dumps({'title': '话题', 'at': datetime(2025, 8, 1, 12, 30), 'rate': Decimal('12.5')})
+    assert isinstance(raw, bytes)
+    assert json.loads(raw) == {'title': '话题', 'at': '2025-08-01T12:30:00', 'rate': 12.5}
+    assert '话题'.encode('utf-8') in raw
@@ -0,0 +1,83 @@
+"""
+日志配置测试文件 - 测试逐页日志采样、JSON格式以及队列模式下的延迟格式化
+"""
+
+import json
+import logging
+import queue
+
+from main.scraper import log_setup
+from main.scraper.log_setup import DeferredQueueHandler, JsonFormatter, SamplingFilter
+
+
+def _record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord('main.scraper.rebang_scraper', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter_keeps_one_in_n_per_template():
+    """测试同一模板的采样日志每N条保留1条，未标记和WARNING日志不受影响"""
+    sampler = SamplingFilter(3)
+    kept = [sampler.filter(_record("第 %d 页完成", page, sampled=True)) for page in range(7)]
+    assert kept == [True, False, False, True, False, False, True]
+
+    assert sampler.filter(_record("另一条模板 %d", 1, sampled=True))
+    assert all(sampler.filter(_record("未标记 %d", i)) for i in range(5))
+    assert all(sampler.filter(_record("告警 %d", i, level=logging.WARNING, sampled=True)) for i in range(5))
+
+
+def test_json_formatter_includes_extra_fields():
+    """测试JSON格式输出消息及extra字段，不输出采样标记"""
+    line = JsonFormatter().format(_record("平台 %s 完成", '微博', sampled=True, platform='weibo'))
+    entry = json.loads(line)
+    assert entry['message'] == '平台 微博 完成'
+    assert entry['level'] == 'INFO'
+    assert entry['platform'] == 'weibo'
+    assert 'sampled' not in entry
+
+
+def test_queue_handler_defers_formatting():
+    """测试入队时不格式化消息"""
+    log_queue = queue.SimpleQueue()
+    record = _record("第 %d 页", 2)
+    DeferredQueueHandler(log_queue).handle(record)
+    queued = log_queue.get_nowait()
+    assert queued.msg == "第 %d 页" and queued.args == (2,)
+
+
+def test_queue_handler_merges_mutable_args():
+    """测试参数含可变对象时入队前合并消息，之后修改对象不影响日志内容"""
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    hashes = ['a1', 'b2']
+    record = _record("平台 %s 活跃哈希 %s", 'weibo', hashes)
+    handler.handle(record)
+    hashes.clear()
+
+    queued = log_queue.get_nowait()
+    assert queued.getMessage() == "平台 weibo 活跃哈希 ['a1', 'b2']"
+    assert queued.args is None and queued is not record
+    assert record.args[1] is hashes  # 原记录保持不变
+
+    handler.handle(_record("统计 %(stats)s", {'stats': {'ok': 1}}))
+    assert log_queue.get_nowait().getMessage() == "统计 {'ok': 1}"
+
+
+def test_setup_logging_queue_mode_writes_file(tmp_path, monkeypatch):
+    """测试队列模式下日志由后台线程写入文件"""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    monkeypatch.setattr(root, 'level', root.level)
+    log_file = tmp_path / 'logs' / 'app.log'
+
+    log_setup.setup_logging({'log_file': str(log_file), 'format': 'json', 'sample_every': 1})
+    try:
+        logging.getLogger('demo').info("采集 %d 条", 5)
+    finally:
+        log_setup.shutdown_logging()
+        for handler in root.handlers:
+            handler.close()
+
+    entries = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+    assert entries[-1]['message'] == '采集 5 条'
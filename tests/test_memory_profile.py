@@ -0,0 +1,53 @@
+"""
+内存分析测试文件 - 测试按周期对比快照、增长告警定位到分配位置以及报告输出
+"""
+
+import logging
+import os
+import signal
+
+import pytest
+
+from main.profiling.memory import MemoryProfiler
+
+_leak = []
+
+
+def _leaky_cycle():
+    _leak.append(bytearray(256 * 1024))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = MemoryProfiler({'snapshot_every_cycles': 2, 'growth_warn_bytes': 64 * 1024,
+                               'report_dir': str(tmp_path), 'signal': None})
+    profiler.start()
+    yield profiler
+    profiler.stop()
+    _leak.clear()
+
+
+def test_growth_is_attributed_to_allocation_site(profiler, caplog, tmp_path):
+    _leaky_cycle()
+    assert profiler.on_cycle() is None  # 未到对比周期
+
+    with caplog.at_level(logging.WARNING, logger='main.profiling.memory'):
+        _leaky_cycle()
+        top = profiler.on_cycle()
+
+    assert top[0]['site'].endswith(f"test_memory_profile.py:{_leaky_cycle.__code__.co_firstlineno + 1}")
+    assert top[0]['size_diff'] >= 2 * 256 * 1024
+    assert '内存持续增长' in caplog.text
+    assert os.path.exists(tmp_path / 'latest.txt')
+
+
+def test_signal_requests_report(profiler, tmp_path):
+    if not hasattr(signal, 'SIGUSR1'):
+        pytest.skip("当前平台不支持SIGUSR1")
+    assert profiler.poll() is None
+    profiler._request_report(signal.SIGUSR1, None)
+    path = profiler.poll()
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    assert '相对基线增长最多的位置' in content
+    assert profiler.poll() is None
@@ -0,0 +1,60 @@
+"""
+查询缓存测试文件 - 测试LRU淘汰、TTL过期和按平台失效
+"""
+
+import time
+
+from main.database.query_cache import QueryCache
+
+
+def test_hit_and_miss_statistics():
+    """测试命中统计"""
+    cache = QueryCache(max_size=4, ttl_seconds=60)
+    hit, _ = cache.get('k')
+    assert not hit
+
+    cache.set('k', [1, 2, 3], platforms=('weibo',))
+    hit, value = cache.get('k')
+    assert hit and value == [1, 2, 3]
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_lru_eviction():
+    """测试超出容量时淘汰最久未使用的条目"""
+    cache = QueryCache(max_size=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # a 变为最近使用
+    cache.set('c', 3)
+
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.get('c') == (True, 3)
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_ttl_expiry():
+    """测试条目过期"""
+    cache = QueryCache(max_size=4, ttl_seconds=60)
+    cache.set('k', 'v', ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get('k') == (False, None)
+    assert cache.get_stats()['expired'] == 1
+
+
+def test_invalidate_platform():
+    """测试按平台失效，依赖全部平台的条目一并失效"""
+    cache = QueryCache(max_size=8, ttl_seconds=60)
+    cache.set(('platform', 'weibo'), 'w', platforms=('weibo',))
+    cache.set(('platform', 'zhihu'), 'z', platforms=('zhihu',))
+    cache.set(('all',), 'all')
+
+    assert cache.invalidate_platform('weibo') == 2
+    assert cache.get(('platform', 'weibo')) == (False, None)
+    assert cache.get(('all',)) == (False, None)
+    assert cache.get(('platform', 'zhihu')) == (True, 'z')
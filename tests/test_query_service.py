@@ -0,0 +1,229 @@
+"""
+查询服务测试文件 - 测试响应缓存、ETag/304、gzip、相同查询合并、HTTP长连接，以及每次查询后结束读事务、查询失败不缓存、按热加载的平台配置校验路由
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+
+from mysql.connector import Error
+
+from main.database.database_manager import DatabaseManager
+from main.scraper.config_loader import ConfigLoader, build_settings
+from main.service.query_service import QueryService
+
+TOPICS = [{'id': i, 'title': f'话题{i}' * 20, 'rank': i, 'last_seen_at': datetime(2025, 8, 1, 12)}
+          for i in range(1, 21)]
+
+
+class FakeDb:
+    calls = []
+    gate = None
+
+    def get_enabled_platforms(self):
+        return [{'code': 'weibo'}, {'code': 'zhihu'}]
+
+    def get_hot_topics_by_platform(self, platform_code, limit):
+        FakeDb.calls.append((platform_code, limit))
+        if FakeDb.gate is not None:
+            FakeDb.gate.wait(5)
+        return TOPICS[:limit]
+
+    def search_hot_topics(self, keyword, limit):
+        FakeDb.calls.append(('search', keyword))
+        if FakeDb.gate is not None:
+            FakeDb.gate.wait(5)
+        return [topic for topic in TOPICS if keyword in topic['title']][:limit]
+
+    def end_snapshot(self):
+        pass
+
+
+def _service(**config):
+    FakeDb.calls = []
+    FakeDb.gate = None
+    return QueryService({'feed_poll_seconds': 0, **config}, db_factory=FakeDb)
+
+
+def test_cache_etag_and_gzip():
+    service = _service()
+
+    async def run():
+        status, headers, plain = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5', {})
+        assert status == 200
+        assert [topic['id'] for topic in json.loads(plain)] == [1, 2, 3, 4, 5]
+        assert json.loads(plain)[0]['last_seen_at'] == '2025-08-01T12:00:00'
+        etag = dict(headers)['ETag']
+
+        # 第二次命中缓存，不访问数据库
+        status, _, _ = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5', {})
+        assert status == 200 and FakeDb.calls == [('weibo', 5)]
+
+        status, _, body = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5',
+                                                       {'if-none-match': etag})
+        assert status == 304 and body == b''
+
+        status, headers, zipped = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5',
+                                                               {'accept-encoding': 'gzip, br'})
+        assert dict(headers)['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(zipped) == plain
+
+        # 平台数据更新后缓存失效
+        service.cache.invalidate_platform('weibo')
+        await service.handle_request('GET', '/api/hot-topics/weibo?limit=5', {})
+        assert FakeDb.calls == [('weibo', 5), ('weibo', 5)]
+
+    asyncio.run(run())
+    asyncio.run(service.close())
+
+
+def test_bad_requests():
+    service = _service()
+
+    async def run():
+        assert (await service.handle_request('GET', '/api/hot-topics?limit=abc', {}))[0] == 400
+        assert (await service.handle_request('GET', '/api/hot-topics?limit=100000', {}))[0] == 400
+        assert (await service.handle_request('GET', '/api/hot-topics/unknown', {}))[0] == 404
+        assert (await service.handle_request('GET', '/api/search', {}))[0] == 400
+        assert (await service.handle_request('POST', '/api/statistics', {}))[0] == 405
+
+    asyncio.run(run())
+    assert FakeDb.calls == []
+
+
+def test_identical_concurrent_queries_are_coalesced():
+    service = _service()
+    FakeDb.gate = threading.Event()
+
+    async def run():
+        tasks = [asyncio.create_task(service.handle_request('GET', '/api/search?q=话题1', {}))
+                 for _ in range(10)]
+        await asyncio.sleep(0.05)
+        FakeDb.gate.set()
+        results = await asyncio.gather(*tasks)
+        await service.close()
+        return results
+
+    results = asyncio.run(run())
+    assert {result[2] for result in results} == {results[0][2]}
+    assert FakeDb.calls == [('search', '话题1')]
+    assert service.stats['coalesced'] == 9
+
+
+def test_http_keep_alive_roundtrip():
+    service = _service()
+
+    async def run():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for path in ('/api/hot-topics?limit=2', '/api/health'):
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            responses.append((head, json.loads(await reader.readexactly(length))))
+        writer.close()
+        await service.close()
+        return responses
+
+    (head, topics), (_, health) = asyncio.run(run())
+    assert head.startswith(b'HTTP/1.1 200 OK')
+    assert b'Connection: keep-alive' in head
+    assert set(topics) == {'weibo', 'zhihu'} and len(topics['zhihu']) == 2
+    assert health['requests'] == 2 and health['db_queries'] == 1
+
+
+class FlakyCursor:
+    """第一次查询失败，之后返回一个带标签的话题"""
+
+    def __init__(self):
+        self.calls = 0
+        self.query = ''
+
+    def execute(self, query, params=()):
+        self.calls += 1
+        self.query = query
+        if self.calls == 1:
+            raise Error("Lost connection to MySQL server during query")
+
+    def fetchall(self):
+        if 'tg.name' in self.query:
+            return [{'name': '热'}]
+        return [{'id': 1, 'title': '话题'}]
+
+
+class CountingConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_db_errors_return_500_and_are_not_cached():
+    dbs = []
+
+    def factory():
+        db = DatabaseManager(config={}, raise_errors=True)
+        db.connection, db.cursor = CountingConnection(), FlakyCursor()
+        dbs.append(db)
+        return db
+
+    service = QueryService({'feed_poll_seconds': 0, 'db_pool_size': 1}, db_factory=factory)
+
+    async def run():
+        first = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5', {})
+        second = await service.handle_request('GET', '/api/hot-topics/weibo?limit=5', {})
+        await service.close()
+        return first, second
+
+    (status, headers, body), (status2, _, body2) = asyncio.run(run())
+    assert status == 500 and 'ETag' not in dict(headers)
+    assert status2 == 200 and json.loads(body2) == [{'id': 1, 'title': '话题', 'tags': ['热']}]
+    # 失败和成功的查询之后都结束了读事务，下一次查询读取最新快照
+    assert len(dbs) == 1 and dbs[0].cursor.calls == 3 and dbs[0].connection.commits == 2
+
+
+def test_routes_follow_reloaded_platform_config(tmp_path):
+    """测试热加载新增的平台可以查询，从配置中移除的平台返回404"""
+    path = str(tmp_path / 'platforms.json')
+    loader = ConfigLoader(path)
+    service = QueryService({'feed_poll_seconds': 0}, db_factory=FakeDb, config_loader=loader)
+    FakeDb.calls, FakeDb.gate = [], None
+
+    builtin = build_settings({})
+    categories = {code: names for code, names in builtin.platform_categories.items() if code != 'weibo'}
+    categories['demo'] = ['hot']
+    demo = dict(builtin.platforms['zhihu'], default_params={'tab': 'demo'})
+
+    async def request(platform_code):
+        status, _, _ = await service.handle_request('GET', f'/api/hot-topics/{platform_code}', {})
+        return status
+
+    async def run():
+        before = (await request('weibo'), await request('demo'))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'platforms': {'demo': demo}, 'platform_categories': categories}, f)
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        version = loader.current.version
+        task = asyncio.create_task(service._watch_config(60))
+        for _ in range(100):
+            if loader.current.version != version:
+                break
+            await asyncio.sleep(0.01)
+        after = (await request('weibo'), await request('demo'))
+        task.cancel()
+        await service.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before == (200, 404)
+    assert after == (404, 200)
@@ -0,0 +1,130 @@
+"""
+限流与退避测试文件 - 测试令牌桶、重试预算以及ApiFetcher对429/Retry-After的处理
+"""
+
+import json
+
+import requests
+
+from main.scraper.api_fetcher import ApiFetcher
+from main.scraper.rate_limiter import RateLimiter, RetryBudget, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_throttles():
+    """测试突发额度用尽后按速率等待"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.5
+    assert bucket.acquire() == 0.5
+    assert clock.sleeps == [0.5, 0.5]
+
+
+def test_rate_limiter_records_wait_per_host():
+    """测试按主机统计等待时间"""
+    limiter = RateLimiter({'requests_per_second': 1000.0, 'burst': 1,
+                           'host_overrides': {'slow.example': {'requests_per_second': 100.0}}})
+    limiter.acquire('fast.example')
+    limiter.acquire('slow.example')
+    limiter.acquire('slow.example')
+
+    stats = limiter.get_stats()
+    assert stats['fast.example']['requests'] == 1
+    assert stats['fast.example']['throttled'] == 0
+    assert stats['slow.example']['throttled'] == 1
+    assert stats['slow.example']['wait_seconds'] > 0
+
+
+def test_retry_budget():
+    """测试重试额度用尽与重置"""
+    budget = RetryBudget(2)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    assert budget.exhausted == 1
+    budget.reset()
+    assert budget.try_spend()
+
+
+def test_parse_retry_after():
+    """测试Retry-After的秒数与HTTP日期格式"""
+    assert ApiFetcher.parse_retry_after('7') == 7.0
+    assert ApiFetcher.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert ApiFetcher.parse_retry_after('garbage') is None
+    assert ApiFetcher.parse_retry_after(None) is None
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode('utf-8')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.headers = {}
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _make_fetcher(responses, monkeypatch, sleeps):
+    fetcher = ApiFetcher(FakeSession(responses), 'https://rebang.today')
+    fetcher.config = dict(fetcher.config, backoff_base_seconds=0.01, backoff_max_seconds=5)
+    fetcher.rate_limiter = RateLimiter({'requests_per_second': 1000.0, 'burst': 100})
+    monkeypatch.setattr('main.scraper.api_fetcher.time.sleep', sleeps.append)
+    return fetcher
+
+
+def test_fetch_honors_retry_after(monkeypatch):
+    """测试429时按Retry-After等待后重试成功"""
+    sleeps = []
+    fetcher = _make_fetcher(
+        [FakeResponse(429, headers={'Retry-After': '2'}), FakeResponse(200, {'data': {}})],
+        monkeypatch, sleeps
+    )
+    assert fetcher.fetch_data('https://api.rebang.today/v1/items', {}, max_retries=2) == {'data': {}}
+    assert len(sleeps) == 1 and 2 <= sleeps[0] <= 2.01
+    assert fetcher.retry_budget.used == 1
+
+
+def test_fetch_does_not_retry_client_errors(monkeypatch):
+    """测试404等客户端错误不重试"""
+    sleeps = []
+    fetcher = _make_fetcher([FakeResponse(404)], monkeypatch, sleeps)
+    assert fetcher.fetch_data('https://api.rebang.today/v1/items', {}, max_retries=3) is None
+    assert fetcher.session.calls == 1 and sleeps == []
+
+
+def test_fetch_stops_when_retry_after_too_long(monkeypatch):
+    """测试Retry-After超过退避上限时放弃重试"""
+    sleeps = []
+    fetcher = _make_fetcher([FakeResponse(503, headers={'Retry-After': '60'})], monkeypatch, sleeps)
+    assert fetcher.fetch_data('https://api.rebang.today/v1/items', {}, max_retries=3) is None
+    assert sleeps == []
@@ -0,0 +1,208 @@
+"""
+数据保留测试文件 - 测试分批迁出的批次边界、归档与导出两种模式、失败批次回滚以及采集日志分批删除（不依赖数据库）
+"""
+
+import copy
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from mysql.connector import Error
+
+from main.database.retention import RetentionEngine
+
+NOW = datetime.now()
+OLD = NOW - timedelta(days=60)
+RECENT = NOW - timedelta(days=1)
+
+
+class FakeCursor:
+    """在连接的暂存状态上执行写语句，提交后才生效"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        state = self.connection.staged()
+        ids = list(params)
+        if 'INTO topic_tags_archive' in query:
+            for topic_id in ids:
+                for name in state['tags'].get(topic_id, []):
+                    state['archived_tags'].append((topic_id, name))
+        elif 'INTO hot_topics_archive' in query:
+            for topic_id in ids:
+                state['archived_topics'][topic_id] = dict(state['topics'][topic_id])
+        elif query.startswith('DELETE FROM topic_tags'):
+            self.rowcount = sum(len(state['tags'].pop(topic_id, [])) for topic_id in ids)
+        elif query.startswith('DELETE FROM hot_topics'):
+            if self.connection.fail_on_batch == self.connection.batches + 1:
+                raise Error("模拟删除失败")
+            self.rowcount = sum(state['topics'].pop(topic_id, None) is not None for topic_id in ids)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.pending = None
+        self.commits = 0
+        self.rollbacks = 0
+        self.batches = 0
+        self.fail_on_batch = None
+
+    def staged(self):
+        if self.pending is None:
+            self.pending = copy.deepcopy(self.db.state)
+        return self.pending
+
+    def is_connected(self):
+        return True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.db.state = self.pending
+        self.pending = None
+        self.commits += 1
+        self.batches += 1
+
+    def rollback(self):
+        self.pending = None
+        self.rollbacks += 1
+        self.batches += 1
+
+
+class FakeDB:
+    """按SQL文本分派的内存数据库，只实现保留引擎用到的语句"""
+
+    def __init__(self, topics, tags=None, logs=()):
+        self.state = {
+            'topics': {topic['id']: topic for topic in topics},
+            'tags': {topic_id: list(names) for topic_id, names in (tags or {}).items()},
+            'archived_topics': {},
+            'archived_tags': [],
+        }
+        self.logs = list(logs)
+        self.connection = FakeConnection(self)
+        self.fetched_batches = []
+        self.log_deletes = []
+
+    def get_all_platforms(self):
+        return [{'id': 1, 'code': 'weibo'}]
+
+    def execute_query(self, query, params=None):
+        topics = self.state['topics']
+        if 'SELECT id FROM hot_topics' in query:
+            platform_id, cutoff, limit = params
+            ids = sorted(topic_id for topic_id, topic in topics.items()
+                         if topic['platform_id'] == platform_id and not topic['is_active']
+                         and topic['last_seen_at'] < cutoff)[:limit]
+            self.fetched_batches.append(len(ids))
+            return [{'id': topic_id} for topic_id in ids]
+        if 'FROM topic_tags tt' in query:
+            return [{'topic_id': topic_id, 'tag_name': name}
+                    for topic_id in params for name in self.state['tags'].get(topic_id, [])]
+        if 'FROM hot_topics WHERE id IN' in query:
+            return [dict(topics[topic_id]) for topic_id in params if topic_id in topics]
+        if 'information_schema' in query:
+            return [{'table_name': 'hot_topics', 'avg_row_length': 100},
+                    {'table_name': 'topic_tags', 'avg_row_length': 10},
+                    {'table_name': 'collection_logs', 'avg_row_length': 50}]
+        raise AssertionError(f"未预期的查询: {query}")
+
+    def execute_update(self, query, params=None):
+        if query.startswith('DELETE FROM collection_logs'):
+            cutoff, limit = params
+            expired = [created_at for created_at in self.logs if created_at < cutoff][:limit]
+            for created_at in expired:
+                self.logs.remove(created_at)
+            self.log_deletes.append(len(expired))
+            return len(expired)
+        return 0  # 建归档表
+
+
+def _topic(topic_id, last_seen_at=OLD, is_active=0, platform_id=1):
+    return {'id': topic_id, 'platform_id': platform_id, 'title': f'话题{topic_id}',
+            'last_seen_at': last_seen_at, 'is_active': is_active}
+
+
+def _engine(db, tmp_path, mode='archive', batch_size=2):
+    return RetentionEngine(db=db, config={
+        'default_policy': {'inactive_days': 30, 'mode': mode},
+        'platform_policies': {},
+        'batch_size': batch_size,
+        'batch_pause_seconds': 0,
+        'collection_log_days': 90,
+        'export_dir': str(tmp_path),
+    })
+
+
+@pytest.mark.parametrize('expired, fetched, commits', [
+    (5, [2, 2, 1], 3),   # 最后一批不满，不再查询
+    (4, [2, 2, 0], 2),   # 恰好整批时多查一次确认已清空
+    (0, [0], 0),
+])
+def test_archive_batch_boundaries(tmp_path, expired, fetched, commits):
+    topics = [_topic(i) for i in range(1, expired + 1)]
+    topics += [_topic(100, is_active=1), _topic(101, last_seen_at=RECENT), _topic(102, platform_id=2)]
+    db = FakeDB(topics, tags={1: ['热', '新']} if expired else {})
+    result = _engine(db, tmp_path).purge_platform({'id': 1, 'code': 'weibo'})
+
+    assert db.fetched_batches == fetched
+    assert db.connection.commits == commits
+    assert result['topics'] == expired and result['file'] is None
+    assert set(db.state['topics']) == {100, 101, 102}
+    assert set(db.state['archived_topics']) == set(range(1, expired + 1))
+    if expired:
+        assert result['tags'] == 2
+        assert db.state['archived_tags'] == [(1, '热'), (1, '新')]
+
+
+def test_export_mode_writes_file_before_delete(tmp_path):
+    db = FakeDB([_topic(i) for i in range(1, 4)] + [_topic(100, is_active=1)], tags={2: ['科技']})
+    result = _engine(db, tmp_path, mode='export').purge_platform({'id': 1, 'code': 'weibo'})
+
+    assert result['topics'] == 3 and result['tags'] == 1
+    assert set(db.state['topics']) == {100}
+    assert not db.state['archived_topics']
+    with gzip.open(result['file'], 'rt', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    assert rows[1]['tags'] == ['科技'] and rows[0]['tags'] == []
+
+
+def test_failed_batch_rolls_back(tmp_path):
+    db = FakeDB([_topic(i) for i in range(1, 6)], tags={3: ['热']})
+    db.connection.fail_on_batch = 2
+
+    with pytest.raises(Error):
+        _engine(db, tmp_path).purge_platform({'id': 1, 'code': 'weibo'})
+
+    # 第一批已提交，第二批的归档和删除全部撤销
+    assert db.connection.commits == 1 and db.connection.rollbacks == 1
+    assert set(db.state['archived_topics']) == {1, 2}
+    assert set(db.state['topics']) == {3, 4, 5}
+    assert db.state['tags'] == {3: ['热']} and db.state['archived_tags'] == []
+
+
+@pytest.mark.parametrize('expired, deletes', [(5, [2, 2, 1]), (4, [2, 2, 0]), (0, [0])])
+def test_collection_logs_deleted_in_limited_batches(tmp_path, expired, deletes):
+    db = FakeDB([], logs=[NOW - timedelta(days=120)] * expired + [RECENT] * 2)
+
+    assert _engine(db, tmp_path).purge_collection_logs() == expired
+    assert db.log_deletes == deletes
+    assert db.logs == [RECENT] * 2
+
+
+def test_run_reports_totals(tmp_path):
+    db = FakeDB([_topic(1), _topic(2)], tags={1: ['热']}, logs=[NOW - timedelta(days=120)])
+    report = _engine(db, tmp_path).run()
+
+    assert report['platforms']['weibo']['topics'] == 2
+    assert (report['topics_removed'], report['tags_removed'], report['logs_removed']) == (2, 1, 1)
+    assert report['bytes_reclaimed'] == 2 * 100 + 1 * 10 + 1 * 50
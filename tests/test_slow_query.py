@@ -0,0 +1,118 @@
+"""
+慢查询记录测试文件 - 测试SQL指纹归一化、按指纹聚合耗时以及慢查询的EXPLAIN捕获
+"""
+
+import json
+import time
+
+from main.database.database_manager import DatabaseManager
+from main.database.slow_query import SlowQueryLog, main, normalize_sql, param_shape
+
+
+def test_normalize_sql_groups_batches_and_literals():
+    a = normalize_sql("SELECT id FROM hot_topics\n  WHERE id IN (%s, %s, %s) AND rank < 10")
+    b = normalize_sql("SELECT id FROM hot_topics WHERE id IN (%s, %s) AND rank < 50")
+    assert a == b == "SELECT id FROM hot_topics WHERE id IN (%s, ...) AND rank < ?"
+
+    rows = normalize_sql("INSERT IGNORE INTO topic_tags (topic_id, tag_id) VALUES (%s, %s), (%s, %s), (%s, %s)")
+    assert rows == "INSERT IGNORE INTO topic_tags (topic_id, tag_id) VALUES (%s, %s), ..."
+    assert normalize_sql("SELECT * FROM platforms WHERE code = 'weibo'") == "SELECT * FROM platforms WHERE code = ?"
+
+    assert param_shape(('weibo', 3, [1, 2])) == ['str', 'int', 'list[2]']
+
+
+def test_stats_aggregated_by_fingerprint():
+    log = SlowQueryLog({'threshold_ms': 1000})
+    for i in range(1, 21):
+        log.observe("SELECT * FROM t WHERE id IN (%s, %s)" if i % 2 else "SELECT * FROM t WHERE id IN (%s)",
+                    (i,), i / 1000, 1)
+    stats = log.summary()
+    assert [s['count'] for s in stats] == [10, 10]
+    odd = next(s for s in stats if 'IN (%s, ...)' in s['sql'])
+    assert odd['max_ms'] == 19.0 and odd['p50_ms'] == 9.0 and odd['p95_ms'] == 19.0 and odd['slow_count'] == 0
+    assert log.recent() == []
+
+
+class SlowCursor:
+    """与C扩展的游标一样，每次execute都会重置lastrowid"""
+
+    def __init__(self, queries=None):
+        self.queries = [] if queries is None else queries
+        self.rowcount = 0
+        self.lastrowid = 0
+        self.closed = False
+
+    def execute(self, query, params=()):
+        self.queries.append(query)
+        self.lastrowid = 0
+        if not query.startswith('EXPLAIN'):
+            time.sleep(0.02)
+            if query.lstrip().startswith('INSERT'):
+                self.rowcount, self.lastrowid = 1, 42
+
+    def close(self):
+        self.closed = True
+
+    def fetchall(self):
+        if self.queries[-1].startswith('EXPLAIN'):
+            return [{'table': 'hot_topics', 'type': 'ALL', 'key': None, 'rows': 5000, 'Extra': 'Using filesort'}]
+        return [{'id': 1}]
+
+
+class FakeConnection:
+    def __init__(self, queries):
+        self.queries = queries
+        self.cursors = []
+
+    def is_connected(self):
+        return True
+
+    def cursor(self, dictionary=False):
+        cursor = SlowCursor(self.queries)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        pass
+
+
+def test_slow_query_captures_explain_once(tmp_path):
+    db = DatabaseManager(config={})
+    db.cursor = SlowCursor()
+    db.connection = FakeConnection(db.cursor.queries)
+    db._slow_queries = SlowQueryLog({'threshold_ms': 10})
+
+    def get_rank_changes():
+        return db.execute_query("SELECT * FROM hot_topics WHERE platform_id = %s ORDER BY rank_change", (1,))
+
+    get_rank_changes()
+    get_rank_changes()
+    assert db.cursor.queries.count(
+        "EXPLAIN SELECT * FROM hot_topics WHERE platform_id = %s ORDER BY rank_change") == 1
+
+    recent = db._slow_queries.recent()
+    assert len(recent) == 2
+    assert recent[0]['caller'].startswith('get_rank_changes') and recent[0]['params'] == ['int']
+    stats = db._slow_queries.summary()[0]
+    assert stats['slow_count'] == 2 and stats['explain'][0]['type'] == 'ALL'
+
+    path = db._slow_queries.dump(str(tmp_path / 'slow.json'))
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['fingerprints'][0]['count'] == 2
+    assert main([path, '--sort', 'p95']) == 0
+
+
+def test_slow_insert_keeps_last_insert_id():
+    """测试慢INSERT的EXPLAIN在临时游标上执行，不覆盖随后读取的插入ID"""
+    db = DatabaseManager(config={})
+    db.cursor = SlowCursor()
+    db.connection = FakeConnection(db.cursor.queries)
+    db._slow_queries = SlowQueryLog({'threshold_ms': 10})
+
+    log_id = db.insert_collection_log({'platform_id': 1, 'category': 'hot', 'total_count': 1,
+                                       'success_count': 1, 'error_count': 0, 'duplicate_count': 0,
+                                       'status': 'success', 'start_time': None, 'end_time': None})
+    assert log_id == 42
+    explain = db.cursor.queries[-1]
+    assert explain.startswith('EXPLAIN') and 'INSERT INTO collection_logs' in explain
+    assert len(db.connection.cursors) == 1 and db.connection.cursors[0].closed
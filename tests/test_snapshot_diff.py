@@ -0,0 +1,120 @@
+"""
+榜单快照差异测试文件 - 测试新上榜/掉榜/排名变化的比对、快照更新以及按比对结果写库
+"""
+
+from contextlib import nullcontext
+from datetime import datetime
+
+from main.scraper.snapshot_diff import SnapshotStore
+from main.scraper.storage_manager import StorageManager
+from main.scraper.topic import Topic
+
+NOW = datetime(2025, 8, 1, 12)
+
+
+def _topic(hash_id, rank, heat=100, tags=None):
+    return Topic('weibo', 'hot', 1, rank, f'话题{hash_id}', heat, f'https://rebang.today/item/{hash_id}',
+                 tags or [], hash_id, NOW)
+
+
+class FakeDb:
+    def __init__(self, board=None):
+        self.board = board or []
+        self.position_updates = []
+        self.deactivated = []
+        self.tag_writes = []
+
+    def transaction(self):
+        return nullcontext(self)
+
+    def savepoint(self):
+        return nullcontext()
+
+    def after_commit(self, callback):
+        callback()
+
+    def get_board_topics(self, platform_code, category):
+        return self.board
+
+    def update_topic_positions(self, params_list):
+        self.position_updates.extend(params_list)
+        return len(params_list)
+
+    def deactivate_topics(self, topic_ids):
+        self.deactivated.extend(topic_ids)
+        return len(topic_ids)
+
+    def sync_topic_tags(self, topic_tags):
+        self.tag_writes.append(topic_tags)
+        return 0, 0
+
+
+BOARD = [
+    {'id': 1, 'hash_id': 'a', 'rank': 1, 'heat_value': 500, 'title': '话题a', 'tags': '热'},
+    {'id': 2, 'hash_id': 'b', 'rank': 2, 'heat_value': 400, 'title': '话题b', 'tags': None},
+    {'id': 3, 'hash_id': 'c', 'rank': 3, 'heat_value': 300, 'title': '话题c', 'tags': None},
+]
+
+
+def test_diff_classifies_events():
+    """测试比对结果：新上榜、掉榜、上升/下降、不变及热度变化"""
+    store = SnapshotStore(FakeDb(BOARD))
+    diff = store.diff('weibo', 'hot', [_topic('b', 1, 450), _topic('d', 2), _topic('a', 3, 500, ['热'])])
+
+    assert [e.hash_id for e in diff.entered] == ['d']
+    assert [e.hash_id for e in diff.exited] == ['c'] and diff.exited[0].topic_id == 3
+    moved = {e.hash_id: e for e in diff.moved}
+    assert moved['b'].rank_change == 1 and moved['b'].heat_delta == 50
+    assert moved['a'].rank_change == -2 and not moved['a'].tags_changed
+    assert diff.summary()['moved_up'] == 1 and diff.summary()['moved_down'] == 1
+    assert [e.hash_id for e in diff.events()] == ['b', 'd', 'a', 'c']
+
+
+def test_partial_scrape_does_not_exit_and_keeps_snapshot():
+    """测试不完整采集不判定掉榜，提交后保留未出现的旧话题"""
+    store = SnapshotStore(FakeDb(BOARD))
+    diff = store.diff('weibo', 'hot', [_topic('a', 1, 500)], partial=True)
+    assert diff.exited == [] and [e.kind for e in diff.unchanged] == ['unchanged']
+    store.commit(diff)
+    assert set(store.get('weibo', 'hot')) == {'a', 'b', 'c'}
+
+
+def test_commit_skips_failed_inserts():
+    """测试写入失败的新话题不进入快照，下次仍为新上榜"""
+    store = SnapshotStore(FakeDb([]))
+    diff = store.diff('weibo', 'hot', [_topic('x', 1), _topic('y', 2)])
+    diff.entered[0].topic_id = 10
+    store.commit(diff)
+    assert set(store.get('weibo', 'hot')) == {'x'}
+    assert [e.hash_id for e in store.diff('weibo', 'hot', [_topic('x', 1), _topic('y', 2)]).entered] == ['y']
+
+
+class NoDuplicates:
+    def is_duplicate(self, topic):
+        return False, None
+
+
+def test_apply_diff_batches_writes(monkeypatch):
+    """测试按比对结果一次批量更新在榜话题、一次批量置失效，仅新话题逐条入库"""
+    saved = []
+    monkeypatch.setattr('main.scraper.storage_manager.save_hot_topic', lambda data: saved.append(data) or 99)
+    monkeypatch.setattr('main.scraper.storage_manager.invalidate_platform_cache', lambda code: None)
+
+    db = FakeDb(BOARD)
+    store = SnapshotStore(db)
+    diff = store.diff('weibo', 'hot', [_topic('b', 1, 450, ['新']), _topic('d', 2), _topic('a', 3, 500, ['热'])])
+
+    manager = StorageManager.__new__(StorageManager)
+    manager.db = db
+    manager.deduplicator = NoDuplicates()
+    stats = manager.apply_diff(diff)
+
+    assert stats == {'total_count': 3, 'success_count': 3, 'error_count': 0, 'duplicate_count': 2}
+    assert sorted(db.position_updates) == [(1, 1, 450, 'https://rebang.today/item/b', 2),
+                                           (3, -2, 500, 'https://rebang.today/item/a', 1)]
+    assert db.deactivated == [3]
+    assert db.tag_writes == [{2: ['新']}]
+    assert [data['hash_id'] for data in saved] == ['d'] and diff.entered[0].topic_id == 99
+
+    store.commit(diff)
+    assert {h: e.topic_id for h, e in store.get('weibo', 'hot').items()} == {'b': 2, 'd': 99, 'a': 1}
@@ -0,0 +1,149 @@
+"""
+标签同步测试文件 - 测试标签字典的进程内缓存及回滚后失效，以及按差异批量同步话题标签
+"""
+
+import re
+
+import pytest
+
+from main.database.database_manager import DatabaseManager
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class SavepointCursor:
+    def __init__(self):
+        self.log = []
+
+    def execute(self, query, params=()):
+        self.log.append(query)
+
+
+class RecordingDb(DatabaseManager):
+    """在内存中模拟tags和topic_tags两张表，并记录执行的语句"""
+
+    def __init__(self, links=None):
+        super().__init__(config={})
+        self.tags = {}
+        self.links = set(links or ())
+        self.statements = []
+        self.connection = FakeConnection()
+
+    def execute_query(self, query, params=None):
+        self.statements.append(('query', ' '.join(query.split())))
+        if 'FROM tags' in query:
+            return [{'id': self.tags[name], 'name': name} for name in params if name in self.tags]
+        if 'FROM topic_tags' in query:
+            return [{'topic_id': topic_id, 'tag_id': tag_id}
+                    for topic_id, tag_id in sorted(self.links) if topic_id in params]
+        raise AssertionError(query)
+
+    def execute_update(self, query, params=None):
+        self.statements.append(('update', ' '.join(query.split())))
+        pairs = list(zip(params[::2], params[1::2]))
+        if query.startswith('INSERT INTO tags'):
+            for name in params:
+                self.tags.setdefault(name, len(self.tags) + 1)
+            return len(params)
+        if query.startswith('INSERT INTO topic_tags'):
+            self.links.update(pairs)
+            return len(pairs)
+        if query.startswith('DELETE FROM topic_tags'):
+            self.links.difference_update(pairs)
+            return len(pairs)
+        raise AssertionError(query)
+
+
+def test_tag_ids_are_created_once_and_cached():
+    db = RecordingDb()
+    assert db.get_tag_ids(['热', '新', '热', '']) == {'热': 1, '新': 2}
+    db.statements.clear()
+    assert db.get_tag_ids(['新', '热']) == {'新': 2, '热': 1}
+    assert db.statements == []
+
+
+def test_sync_only_writes_changed_links_in_one_batch():
+    db = RecordingDb()
+    db.get_tag_ids(['热', '新', '爆'])  # 1, 2, 3
+    db.links = {(10, 1), (10, 2), (11, 1), (12, 3)}
+    db.statements.clear()
+
+    inserted, deleted = db.sync_topic_tags({10: ['热', '新'], 11: ['热', '爆'], 12: []})
+
+    assert (inserted, deleted) == (1, 1)
+    assert db.links == {(10, 1), (10, 2), (11, 1), (11, 3)}
+    # 一次查询现有关联 + 一条批量DELETE + 一条批量INSERT
+    assert [kind for kind, _ in db.statements] == ['query', 'update', 'update']
+    assert re.search(r'IN \(\(%s, %s\)\)', db.statements[1][1])
+
+
+def test_sync_unchanged_tags_writes_nothing():
+    db = RecordingDb()
+    db.get_tag_ids(['热'])
+    db.links = {(10, 1)}
+    db.statements.clear()
+
+    assert db.sync_topic_tags({10: ['热', '热']}) == (0, 0)
+    assert [kind for kind, _ in db.statements] == ['query']
+
+
+def test_tag_ids_read_with_lock_and_released():
+    """测试标签ID用加锁读取获得（可见其他进程新提交的标签），事务外单独提交"""
+    db = RecordingDb()
+    db.get_tag_ids(['热'])
+    insert, select = (statement for _, statement in db.statements)
+    assert 'ON DUPLICATE KEY UPDATE' in insert and 'IGNORE' not in insert
+    assert select.endswith('LOCK IN SHARE MODE')
+    assert db.connection.commits == 1
+
+
+def test_rollback_clears_tag_ids():
+    """测试事务回滚后不再使用其中新分配的标签ID"""
+    db = RecordingDb()
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            assert db.get_tag_ids(['热']) == {'热': 1}
+            raise RuntimeError("批次失败")
+    assert db.connection.rollbacks == 1
+    del db.tags['热']  # 服务器上已回滚
+    db.tags['新'] = 5
+    assert db.get_tag_ids(['新', '热']) == {'新': 5, '热': 2}
+
+
+def test_savepoint_rollback_clears_tag_ids():
+    """测试回滚到保存点后同样清空标签ID缓存"""
+    db = RecordingDb()
+    db.cursor = SavepointCursor()
+    with db.transaction():
+        with pytest.raises(RuntimeError):
+            with db.savepoint():
+                assert db.get_tag_ids(['热']) == {'热': 1}
+                raise RuntimeError("单条失败")
+        assert db.cursor.log[-1] == 'ROLLBACK TO SAVEPOINT sp_1'
+        del db.tags['热']
+        assert db.get_tag_ids(['热']) == {'热': 1}
+        assert len(db.statements) == 4  # 重新写入并查询
+
+
+def test_topic_tags_insert_surfaces_errors():
+    """测试关联写入只容忍重复键，不用IGNORE吞掉外键等错误"""
+    db = RecordingDb()
+    db.get_tag_ids(['热'])
+    db.statements.clear()
+    db.insert_topic_tags(10, ['热'])
+    db.sync_topic_tags({11: ['热']})
+    inserts = [statement for _, statement in db.statements if statement.startswith('INSERT')]
+    assert len(inserts) == 2
+    assert all('IGNORE' not in statement and 'ON DUPLICATE KEY UPDATE' in statement for statement in inserts)
@@ -0,0 +1,119 @@
+"""
+话题记录测试文件 - 测试Topic/TopicBatch的解析、字典转换及入库前的处理
+"""
+
+import logging
+import sys
+from contextlib import nullcontext
+from datetime import datetime
+
+from main.scraper.data_parser import DataParser
+from main.scraper.storage_manager import StorageManager
+from main.scraper.topic import Topic, TopicBatch
+
+CONFIG = {
+    'data_path': ['data', 'list'],
+    'list_type': 'list',
+    'field_mapping': {'title': 'title', 'heat': 'heat', 'url': 'id', 'tag': 'label'},
+}
+
+API_DATA = {'data': {'list': [
+    {'title': '话题一', 'heat': '12.5万', 'id': 11, 'label': '热'},
+    {'title': '', 'heat': '1', 'id': 12},
+    {'title': '话题二', 'heat': 300, 'id': None, 'label': ''},
+]}}
+
+
+def test_parse_batch_shares_timestamp_and_applies_offset():
+    """测试同批话题共享采集时间，排名按页偏移"""
+    batch = DataParser.parse_batch(API_DATA, 'weibo', 'hot', CONFIG, page=2, rank_offset=20)
+    assert isinstance(batch, TopicBatch) and len(batch) == 2
+    first, second = batch
+    assert (first.rank, second.rank) == (21, 23)
+    assert first.scraped_at is second.scraped_at is batch.scraped_at
+    assert first.heat_value == 125000 and first.url == 'https://rebang.today/item/11'
+    assert second.url == ''
+    assert batch.hashes() == [first.hash_id, second.hash_id]
+
+
+def test_parse_api_data_keeps_dict_shape():
+    """测试对外接口仍返回原有字典结构"""
+    topics = DataParser.parse_api_data(API_DATA, 'weibo', 'hot', CONFIG, page=1)
+    assert [t['rank'] for t in topics] == [1, 3]
+    assert set(topics[0]) == {'platform', 'category', 'page', 'rank', 'timestamp', 'title',
+                              'heat_value', 'url', 'tags', 'hash_id'}
+    assert isinstance(topics[0]['timestamp'], str)
+
+
+def test_topic_round_trip_and_size():
+    """测试字典往返转换，且Topic没有实例字典"""
+    topic = DataParser.parse_batch(API_DATA, 'weibo', 'hot', CONFIG, page=1).topics[0]
+    data = topic.to_dict()
+    restored = Topic.from_dict(data)
+    assert restored.to_dict() == data
+    assert not hasattr(topic, '__dict__')
+    assert sys.getsizeof(topic) < sys.getsizeof(data)
+
+
+class FakeDeduplicator:
+    def __init__(self, existing):
+        self.existing = existing
+
+    def is_duplicate(self, topic):
+        return (True, self.existing[topic.hash_id]) if topic.hash_id in self.existing else (False, None)
+
+
+class FakeDb:
+    def __init__(self):
+        self.updates = []
+
+    def transaction(self):
+        return nullcontext(self)
+
+    def savepoint(self):
+        return nullcontext()
+
+    def after_commit(self, callback):
+        callback()
+
+    def update_hot_topic(self, topic_id, data):
+        self.updates.append((topic_id, data))
+        return True
+
+
+def test_save_topics_accepts_batches_and_dicts(monkeypatch):
+    """测试save_topics同时接受TopicBatch和话题字典，新话题入库时转换为字典"""
+    saved = []
+    monkeypatch.setattr('main.scraper.storage_manager.save_hot_topic', lambda data: saved.append(data) or 1)
+    monkeypatch.setattr('main.scraper.storage_manager.invalidate_platform_cache', lambda code: None)
+
+    batch = DataParser.parse_batch(API_DATA, 'weibo', 'hot', CONFIG, page=1)
+    manager = StorageManager.__new__(StorageManager)
+    manager.db = FakeDb()
+    manager.deduplicator = FakeDeduplicator({batch.topics[0].hash_id: 7})
+
+    stats = manager.save_topics(batch)
+    assert stats == {'total_count': 2, 'success_count': 2, 'error_count': 0, 'duplicate_count': 1}
+    assert manager.db.updates[0][0] == 7
+    assert saved[0]['title'] == '话题二' and isinstance(saved[0]['first_seen_at'], datetime)
+
+    stats = manager.save_topics([batch.topics[1].to_dict()])
+    assert stats['success_count'] == 1 and saved[1]['hash_id'] == batch.topics[1].hash_id
+
+
+def test_save_topics_logs_failed_topic(monkeypatch, caplog):
+    """测试单条话题入库异常时计入错误数并记录话题与异常"""
+    def fail(data):
+        raise ValueError("标题过长")
+
+    monkeypatch.setattr('main.scraper.storage_manager.save_hot_topic', fail)
+    batch = DataParser.parse_batch(API_DATA, 'weibo', 'hot', CONFIG, page=1)
+    manager = StorageManager.__new__(StorageManager)
+    manager.db = FakeDb()
+    manager.deduplicator = FakeDeduplicator({})
+
+    with caplog.at_level(logging.ERROR, logger='main.scraper.storage_manager'):
+        stats = manager.save_topics(batch)
+    assert stats['error_count'] == 2 and stats['success_count'] == 0
+    record = caplog.records[0]
+    assert '话题一' in record.getMessage() and '标题过长' in record.getMessage() and record.exc_info
@@ -0,0 +1,160 @@
+"""
+事务测试文件 - 测试工作单元事务只提交一次、保存点隔离单条失败、提交后回调，以及服务器已回滚事务时不再提交
+"""
+
+import pytest
+from mysql.connector import Error
+
+from main.database.database_manager import DatabaseManager
+from main.database.hash_cache import get_hash_cache
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def execute(self, query, params=()):
+        self.log.append(query)
+        if 'FAIL' in query:
+            raise Error("模拟写入失败")
+        self.rowcount = 1
+
+    def executemany(self, query, params_list):
+        self.log.append(query)
+        self.rowcount = len(params_list)
+
+
+class AbortingCursor(FakeCursor):
+    """模拟服务器已回滚整个事务：保存点失效，回滚到保存点失败"""
+
+    def __init__(self, log, failure):
+        super().__init__(log)
+        self.failure = failure
+
+    def execute(self, query, params=()):
+        if query.startswith('ROLLBACK TO SAVEPOINT'):
+            self.log.append(query)
+            raise Error("SAVEPOINT does not exist", errno=1305)
+        if 'DEADLOCK' in query:
+            self.log.append(query)
+            raise self.failure
+        super().execute(query, params)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.pings = 0
+
+    def is_connected(self):
+        self.pings += 1
+        return True
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _db():
+    db = DatabaseManager(config={})
+    db.connection = FakeConnection()
+    db.cursor = FakeCursor(db.connection.log)
+    return db
+
+
+def test_statements_in_transaction_commit_once():
+    db = _db()
+    db.execute_update("UPDATE a")
+    assert db.connection.commits == 1
+
+    with db.transaction():
+        db.execute_update("UPDATE b")
+        db.execute_many("INSERT c", [(1,), (2,)])
+        with db.transaction():  # 嵌套并入外层
+            db.execute_update("UPDATE d")
+        assert db.connection.commits == 1
+    assert db.connection.commits == 2
+    # 事务内不再逐条语句ping服务器
+    assert db.connection.pings == 2
+
+
+def test_savepoint_isolates_failed_item():
+    db = _db()
+    results = []
+    with db.transaction():
+        for query in ("INSERT ok1", "INSERT FAIL", "INSERT ok2"):
+            try:
+                with db.savepoint():
+                    results.append(db.execute_update(query))
+            except Error:
+                results.append('error')
+    assert results == [1, 'error', 1]
+    assert db.connection.commits == 1 and db.connection.rollbacks == 0
+    assert 'ROLLBACK TO SAVEPOINT sp_2' in db.connection.log
+    assert db.connection.log.count('RELEASE SAVEPOINT sp_1') == 1
+
+
+def test_failed_update_outside_transaction_is_swallowed():
+    db = _db()
+    assert db.execute_update("UPDATE FAIL") == 0
+    assert db.connection.rollbacks == 1
+
+
+def test_after_commit_runs_only_on_commit():
+    db = _db()
+    calls = []
+    db.after_commit(lambda: calls.append('now'))
+    assert calls == ['now']
+
+    with db.transaction():
+        db.after_commit(lambda: calls.append('committed'))
+        try:
+            with db.savepoint():
+                db.after_commit(lambda: calls.append('rolled back'))
+                raise ValueError
+        except ValueError:
+            pass
+        assert calls == ['now']
+    assert calls == ['now', 'committed']
+
+    get_hash_cache().mark_seen('a' * 32, 1, 1)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.after_commit(lambda: calls.append('discarded'))
+            raise RuntimeError
+    assert calls == ['now', 'committed']
+    assert db.connection.rollbacks == 1
+    # 回滚后哈希缓存可能含有未落库的话题ID，须清空
+    assert get_hash_cache().get('a' * 32) is None
+
+
+@pytest.mark.parametrize('query', ["INSERT FAIL", "INSERT DEADLOCK"])
+def test_aborted_transaction_is_not_committed(query):
+    """测试回滚到保存点失败或发生死锁后，最外层事务回滚并抛出，不提交也不执行提交后回调"""
+    db = _db()
+    db.cursor = AbortingCursor(db.connection.log, Error("Deadlock found", errno=1213))
+    calls = []
+    with pytest.raises(Error):
+        with db.transaction():
+            db.after_commit(lambda: calls.append('before'))
+            try:
+                with db.savepoint():
+                    db.execute_update(query)
+            except Error:
+                pass
+            db.execute_update("INSERT ok")
+            db.after_commit(lambda: calls.append('after'))
+    assert db.connection.commits == 0 and db.connection.rollbacks == 1
+    assert calls == []
+    assert ('ROLLBACK TO SAVEPOINT sp_1' in db.connection.log) == (query == "INSERT FAIL")
+
+    # 状态已复位，之后的事务正常提交
+    with db.transaction():
+        db.execute_update("INSERT ok")
+    assert db.connection.commits == 1
@@ -0,0 +1,219 @@
+"""
+工作租约测试文件 - 使用伪连接模拟租约表，测试领取竞争、过期接管、释放，以及租约被接管时榜单写入回滚
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from main.database.database_manager import DatabaseManager
+from main.scraper.circuit_breaker import CircuitBreakerRegistry
+from main.scraper.rebang_scraper import RebangScraper
+from main.scraper.snapshot_diff import SnapshotStore
+from main.scraper.work_lease import LeaseLostError, LeaseManager
+
+CONFIG = {'lease_seconds': 300, 'heartbeat_seconds': 3600, 'interval_seconds': 120, 'interval_slack_seconds': 10}
+
+
+class LeaseTable:
+    """多个工作进程共享的租约表，NOW()取now属性"""
+
+    def __init__(self):
+        self.now = datetime(2025, 8, 1, 12)
+        self.rows = {}
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+class FakeCursor:
+    """按语句特征模拟租约表上的查询和UPDATE，其余语句只记录
+
+    与未设置FOUND_ROWS的MySQL连接一样，UPDATE的rowcount只统计值确实发生变化的行。
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.rowcount = 0
+        self.rows = []
+        self.log = []
+
+    def execute(self, query, params=()):
+        self.log.append(query)
+        self.rowcount = 0
+        self.rows = []
+        now = self.table.now
+        if 'SELECT owner FROM scrape_leases' in query:
+            row = self.table.rows.get(params)
+            self.rows = [{'owner': row['owner']}] if row else []
+        elif 'SET owner = %s' in query:
+            owner, lease_seconds, platform_code, category, min_interval = params
+            row = self.table.rows.get((platform_code, category))
+            if row and ((row['owner'] is None and (row['claimed_at'] is None
+                                                   or row['claimed_at'] <= now - timedelta(seconds=min_interval)))
+                        or (row['owner'] is not None and row['lease_until'] < now)):
+                row.update(owner=owner, lease_until=now + timedelta(seconds=lease_seconds), claimed_at=now)
+                self.rowcount = 1
+        elif 'SET lease_until' in query:
+            lease_seconds, platform_code, category, owner = params
+            row = self.table.rows.get((platform_code, category))
+            lease_until = now + timedelta(seconds=lease_seconds)
+            if row and row['owner'] == owner and row['lease_until'] != lease_until:
+                row['lease_until'] = lease_until
+                self.rowcount = 1
+        elif 'SET owner = NULL' in query:
+            status, platform_code, category, owner = params
+            row = self.table.rows.get((platform_code, category))
+            if row and row['owner'] == owner:
+                row.update(owner=None, lease_until=None, last_status=status)
+                self.rowcount = 1
+        elif query.startswith('UPDATE'):
+            self.rowcount = 1
+
+    def executemany(self, query, params_list):
+        self.rowcount = 0
+        for key in params_list:
+            if key not in self.table.rows:
+                self.table.rows[key] = {'owner': None, 'lease_until': None, 'claimed_at': None, 'last_status': None}
+                self.rowcount += 1
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+
+def _worker(table, worker_id):
+    db = DatabaseManager(config={})
+    db.cursor = FakeCursor(table)
+    db.connection = FakeConnection(db.cursor.log)
+    return LeaseManager(db=db, worker_id=worker_id, config=CONFIG)
+
+
+@pytest.fixture
+def table():
+    table = LeaseTable()
+    _worker(table, 'setup').register_jobs({'weibo': ['hot']})
+    return table
+
+
+def test_only_one_worker_claims(table):
+    a, b = _worker(table, 'a'), _worker(table, 'b')
+    assert a.try_claim('weibo', 'hot')
+    assert not b.try_claim('weibo', 'hot')
+    assert not a.try_claim('weibo', 'hot')  # 自己持有期间也不会重复领取
+    assert table.rows[('weibo', 'hot')]['owner'] == 'a'
+    assert not a.try_claim('weibo', 'news')  # 未登记的任务
+
+
+def test_release_waits_for_next_interval(table):
+    a, b = _worker(table, 'a'), _worker(table, 'b')
+    assert a.try_claim('weibo', 'hot')
+    assert a.release('weibo', 'hot', 'success')
+    assert table.rows[('weibo', 'hot')]['last_status'] == 'success'
+
+    # 本周期已运行过，间隔（扣除容差）之后才能再次领取
+    assert not b.try_claim('weibo', 'hot')
+    table.advance(CONFIG['interval_seconds'] - CONFIG['interval_slack_seconds'])
+    assert b.try_claim('weibo', 'hot')
+
+
+def test_expired_lease_taken_over(table):
+    a, b = _worker(table, 'a'), _worker(table, 'b')
+    assert a.try_claim('weibo', 'hot')
+    table.advance(CONFIG['lease_seconds'] - 1)
+    assert a.heartbeat('weibo', 'hot')
+    table.advance(CONFIG['lease_seconds'] - 1)
+    assert not b.try_claim('weibo', 'hot')  # 续约后未过期
+
+    table.advance(2)
+    assert b.try_claim('weibo', 'hot')
+    assert not a.heartbeat('weibo', 'hot')
+    assert not a.release('weibo', 'hot', 'success')  # 不会释放已被接管的租约
+    assert table.rows[('weibo', 'hot')]['owner'] == 'b'
+
+
+def test_heartbeat_in_same_second(table):
+    """测试同一秒内重复续约：UPDATE未修改任何行，租约仍归本进程所有"""
+    a = _worker(table, 'a')
+    lease = a.acquire('weibo', 'hot')
+    try:
+        assert a.heartbeat('weibo', 'hot')
+        assert a.heartbeat('weibo', 'hot')
+        assert a.db.cursor.rowcount == 0
+        lease.confirm()
+        assert not lease.lost
+    finally:
+        lease.release('success')
+
+
+def test_confirm_raises_after_takeover(table):
+    a, b = _worker(table, 'a'), _worker(table, 'b')
+    lease = a.acquire('weibo', 'hot')
+    try:
+        lease.confirm()
+        table.advance(CONFIG['lease_seconds'] + 1)
+        assert b.try_claim('weibo', 'hot')
+        with pytest.raises(LeaseLostError):
+            lease.confirm()
+        assert lease.lost
+    finally:
+        lease.release('error')
+
+
+class StubStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def save_collection_log(self, **kwargs):
+        self.db.execute_update("INSERT INTO collection_logs")
+
+
+@pytest.mark.parametrize('taken_over', [False, True])
+def test_board_commit_requires_lease(table, taken_over):
+    a, b = _worker(table, 'a'), _worker(table, 'b')
+    scraper = RebangScraper.__new__(RebangScraper)
+    scraper.circuit_breakers = CircuitBreakerRegistry()
+    scraper.snapshots = SnapshotStore(db=object())
+    scraper.storage_manager = StubStorage(a.db)
+    scraper.lease_manager = a
+    committed = []
+
+    def scrape_platform_category(platform_code, category, extra_params):
+        a.db.execute_update("UPDATE hot_topics SET is_active = 0")
+        a.db.after_commit(lambda: committed.append(category))
+        if taken_over:
+            # 采集耗时超过租约期，其他进程已接管
+            table.advance(CONFIG['lease_seconds'] + 1)
+            assert b.try_claim(platform_code, category)
+        return [], {'total_count': 1, 'success_count': 1, 'error_count': 0, 'duplicate_count': 0}
+
+    scraper.scrape_platform_category = scrape_platform_category
+    result = scraper.scrape_platform('weibo', ['hot'])['hot']
+
+    log = a.db.cursor.log
+    board = log[log.index("UPDATE hot_topics SET is_active = 0"):]
+    if taken_over:
+        assert result['status'] == 'lease_lost'
+        # 采集日志写入后、提交前发现租约已被接管，整个榜单回滚
+        assert 'FOR UPDATE' in board[2]
+        assert board[3] == 'ROLLBACK' and 'COMMIT' not in board[:4]
+        assert committed == []
+        assert table.rows[('weibo', 'hot')]['owner'] == 'b'
+    else:
+        assert result['status'] == 'success'
+        assert 'SET lease_until' in board[3]
+        assert board[4] == 'COMMIT' and committed == ['hot']
+        assert table.rows[('weibo', 'hot')]['owner'] is None